@@ -1,11 +1,386 @@
 import streamlit as st
-from src.models.vehicle_generator import VehicleImageGenerator
-from src.models.aerodynamic_analyzer import AerodynamicAnalyzer, get_additional_kpis
-from src.visual.flow_visualization import FlowVisualization, create_flow_visualization
-from src.utils.feature_extraction import create_feature_visualization
-from src.analysis.expert_analysis import get_expert_analysis,  display_expert_analysis
-import cv2
-import numpy as np
+import importlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+from src.utils.extraction_methods import EXTRACTION_METHODS
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.task_graph import script_run_context_initializer
+from src.utils.telemetry import get_telemetry, summarize_spans
+
+if TYPE_CHECKING:
+    from src.models.aerodynamic_analyzer import AerodynamicAnalyzer
+    from src.models.vehicle_generator import PreviewOptions, VehicleImageGenerator
+
+# Modules pulling in boto3, OpenCV, numpy and matplotlib. They are imported at
+# first use so the page shell renders before they load.
+HEAVY_MODULES = (
+    'src.models.vehicle_generator',
+    'src.models.aerodynamic_analyzer',
+    'src.utils.feature_extraction',
+    'src.visual.flow_visualization',
+    'src.visual.interactive_flow',
+    'src.analysis.expert_analysis',
+    'src.analysis.design_sweep',
+)
+
+# Designs shown side by side in each row of the results page
+GRID_COLUMNS = 4
+
+def _grid(count: int, per_row: int = GRID_COLUMNS) -> list:
+    """One column per item, ``per_row`` to a row"""
+    columns = []
+    for start in range(0, count, per_row):
+        columns.extend(st.columns(min(per_row, count - start)))
+    return columns
+
+def _format_delta(percent: Optional[float]) -> Optional[str]:
+    return None if percent is None else f"{percent:.1f}%"
+
+def _render_metrics(slot, results: list, baseline: int):
+    """Render each design's Cd/Cl, with its change from the baseline, into a placeholder"""
+    from src.analysis.comparison import comparison_table
+
+    rows = comparison_table(results, baseline)
+    with slot.container():
+        for index, (col, row) in enumerate(zip(_grid(len(rows)), rows)):
+            with col:
+                if row['cd'] is None:
+                    st.metric(f"{row['design']} Cd", "N/A")
+                    continue
+                st.metric(f"{row['design']} Cd", f"{row['cd']:.3f}",
+                          _format_delta(row['cd_delta_pct']) if index != baseline else None)
+                st.metric(f"{row['design']} Cl", f"{row['cl']:.3f}",
+                          _format_delta(row['cl_delta_pct']) if index != baseline else None)
+        st.dataframe(rows, use_container_width=True)
+
+def _render_kpis(slot, kpis: dict):
+    """Render a vehicle's KPI metrics into a placeholder"""
+    with slot.container():
+        for kpi, value in kpis.items():
+            st.metric(kpi, value)
+
+# Comparisons kept per session, most recent last
+MAX_STORED_COMPARISONS = 5
+
+@st.cache_resource
+def _get_generator() -> "VehicleImageGenerator":
+    """One generator (and Bedrock client) shared by every session and rerun"""
+    from src.models.vehicle_generator import VehicleImageGenerator
+    return VehicleImageGenerator()
+
+@st.cache_resource
+def _get_analyzer() -> "AerodynamicAnalyzer":
+    """One analyzer (and Bedrock client) shared by every session and rerun"""
+    from src.models.aerodynamic_analyzer import AerodynamicAnalyzer
+    return AerodynamicAnalyzer()
+
+def _prewarm():
+    """Import the heavy modules and build the Bedrock client ahead of the first comparison"""
+    try:
+        with get_telemetry().span('prewarm'):
+            for module in HEAVY_MODULES:
+                importlib.import_module(module)
+            from src.utils.bedrock import get_bedrock_client
+            get_bedrock_client()
+    except Exception:
+        # Any real problem is reported when the comparison needs the module
+        pass
+
+@st.cache_resource
+def _start_prewarm() -> threading.Thread:
+    """Start warming up once per process, in the background"""
+    thread = threading.Thread(target=_prewarm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def _comparison_key(designs: list, seed: int, extraction_method: str,
+                    preview: Optional[tuple] = None) -> tuple:
+    """Session-state key for a comparison: everything that changes its results"""
+    return (tuple(designs), int(seed), extraction_method, preview)
+
+def _preview_options(preview: Optional[tuple]) -> Optional["PreviewOptions"]:
+    """PreviewOptions for the sidebar's (candidates, refine) setting, or None when off"""
+    if preview is None:
+        return None
+    from src.models.vehicle_generator import PreviewOptions
+    candidates, refine = preview
+    return PreviewOptions(candidates=candidates, refine=refine)
+
+def _store_comparison(comparisons: OrderedDict, key: tuple, comparison: dict):
+    """Remember a finished comparison, dropping the oldest beyond MAX_STORED_COMPARISONS"""
+    comparisons[key] = comparison
+    comparisons.move_to_end(key)
+    while len(comparisons) > MAX_STORED_COMPARISONS:
+        comparisons.popitem(last=False)
+
+def _render_timing_panel(rows):
+    """Show where a run's time went, slowest stage first"""
+    with st.expander("Timing", expanded=True):
+        st.dataframe([
+            {**row, 'total_s': round(row['total_s'], 3), 'max_s': round(row['max_s'], 3)}
+            for row in rows
+        ], use_container_width=True)
+
+def _layout_results(designs: list) -> dict:
+    """
+    Draw the results page with an empty slot for everything that depends on
+    a design's results, to be filled as they arrive.
+    """
+    slots = {}
+
+    # Display generated images side by side
+    slots["images"] = []
+    for col in _grid(len(designs)):
+        with col:
+            slots["images"].append(st.empty())
+
+    #st.subheader("Comparative Aerodynamic Analysis")
+    st.markdown("<h1 style='color: #9370DB;'>Comparative Aerodynamic Analysis</h1>", unsafe_allow_html=True)
+    slots["metrics"] = st.empty()
+
+    # Additional KPIs
+    #st.subheader("Detailed Aerodynamic KPIs")
+    st.markdown("<h1 style='color: #9370DB;'>Detailed Aerodynamic KPIs</h1>", unsafe_allow_html=True)
+    slots["kpis"] = []
+    for col, design in zip(_grid(len(designs)), designs):
+        with col:
+            st.markdown(f"### {design.label} KPIs")
+            slots["kpis"].append(st.empty())
+    
+    # Comparative Analysis
+    st.subheader("Analysis Justification")
+    slots["analysis"] = []
+    for col, design in zip(_grid(len(designs)), designs):
+        with col:
+            st.markdown(f"### {design.label} Analysis")
+            slots["analysis"].append(st.empty())
+    
+    # Feature Detection Visualization (drawn while other designs are in flight)
+    st.subheader("Feature Detection Comparison")
+    slots["features"] = []
+    for col in _grid(len(designs)):
+        with col:
+            slots["features"].append(st.empty())
+    
+    # Flow visualization, once every design's silhouette is known
+    slots["flow"] = st.empty()
+           
+    # Expert Analysis using LLM
+    #st.subheader("Expert Comparative Analysis")
+    st.markdown("<h1 style='color: #FFA500;'>Expert Comparative Analysis</h1>", unsafe_allow_html=True)
+    slots["expert_analysis"] = st.empty()
+    return slots
+
+def _render_design(slots: dict, index: int, result):
+    """Fill one design's image, justification and feature plot"""
+    from src.utils.feature_extraction import create_feature_visualization
+
+    label = result.design.label
+    if result.image is not None:
+        caption = f"Generated {label}"
+        if result.score is not None:
+            caption += f" (best preview, silhouette score {result.score.total:.2f})"
+        slots["images"][index].image(result.image.bgr, channels="BGR", caption=caption,
+                                     use_container_width=True)
+    if not result.ok:
+        slots["analysis"][index].error(f"Error analyzing {label}: {result.error}")
+        return
+    slots["analysis"][index].write(result.analysis['justification'])
+    slots["features"][index].image(create_feature_visualization(result.image, result.extraction),
+                                   caption=f"{label} Features", use_container_width=True)
+
+def _render_flow(slot, results: list):
+    """Flow plots for every design that has a silhouette"""
+    from src.visual.flow_visualization import create_flow_visualization
+
+    with slot.container():
+        try:
+            create_flow_visualization([(result.design.label, result.extraction)
+                                       for result in results if result.ok])
+        except Exception as viz_error:
+            st.error(f"Error generating flow visualization: {str(viz_error)}")
+
+def _render_expert_analysis(slot, analyzer: "AerodynamicAnalyzer", results: list, baseline: int) -> str:
+    """Stream one expert summary of the whole comparison table"""
+    from src.analysis.comparison import comparison_table
+    from src.analysis.expert_analysis import display_expert_analysis_stream, stream_expert_analysis
+
+    with slot.container():
+        return display_expert_analysis_stream(
+            stream_expert_analysis(analyzer, comparison_table(results, baseline),
+                                   results[baseline].design.label))
+
+def _run_comparison(generator: "VehicleImageGenerator", analyzer: "AerodynamicAnalyzer",
+                    designs: list, baseline: int, seed: int,
+                    extraction_method: str, preview: Optional[tuple] = None) -> Optional[dict]:
+    """
+    Generate and analyze every design in parallel, filling the page as results
+    arrive. Returns everything needed to redraw the page, or None on failure.
+    """
+    from src.analysis.comparison import iter_comparison
+
+    slots = _layout_results(designs)
+    results = [None] * len(designs)
+    kpis = [None] * len(designs)
+    expert_analysis = None
+    try:
+        for stage, index, result in iter_comparison(
+                designs, generator, analyzer, seed=seed or None,
+                extraction_method=extraction_method,
+                initializer=script_run_context_initializer(),
+                preview=_preview_options(preview)):
+            if stage == "kpis":
+                kpis[index] = result
+                _render_kpis(slots["kpis"][index], result)
+                continue
+
+            results[index] = result
+            _render_design(slots, index, result)
+            if all(done is not None for done in results):
+                _render_metrics(slots["metrics"], results, baseline)
+                _render_flow(slots["flow"], results)
+                # KPI calls keep running in the pool while the analysis streams in
+                if any(done.ok for done in results):
+                    expert_analysis = _render_expert_analysis(slots["expert_analysis"], analyzer,
+                                                              results, baseline)
+    except Exception as e:
+        st.error(f"Error extracting features or analyzing vehicles: {str(e)}")
+        return None
+
+    if not any(result.ok for result in results):
+        return None
+    return {
+        "results": results,
+        "kpis": kpis,
+        "expert_analysis": expert_analysis,
+        "expert_baseline": results[baseline].design.label,
+    }
+
+def _render_stored_comparison(comparison: dict, baseline: int):
+    """Redraw a finished comparison without any Bedrock calls"""
+    from src.analysis.expert_analysis import display_expert_analysis_stream
+
+    results = comparison["results"]
+    slots = _layout_results([result.design for result in results])
+    for index, result in enumerate(results):
+        _render_design(slots, index, result)
+        if comparison["kpis"][index]:
+            _render_kpis(slots["kpis"][index], comparison["kpis"][index])
+    _render_metrics(slots["metrics"], results, baseline)
+    _render_flow(slots["flow"], results)
+    with slots["expert_analysis"].container():
+        if comparison["expert_baseline"] != results[baseline].design.label:
+            st.caption(f"Written with {comparison['expert_baseline']} as the baseline")
+        display_expert_analysis_stream([comparison["expert_analysis"]])
+
+# Default designs: the original pair of an everyday EV and its aero variant
+DEFAULT_DESIGNS = (
+    ("Initial", "A photorealistic 3D render of a modern EV like Model 3, white background, side view, showing practical design with smooth surfaces, flush door handles, and closed front grille"),
+    ("Aerodynamic", "A photorealistic 3D render of the same EV but with aerodynamic modifications: active rear spoiler, lowered suspension, white background, side view"),
+)
+# Upper bound of the design count input; kept here so the page shell does not
+# import the comparison engine (src.analysis.comparison.MAX_DESIGNS)
+MAX_DESIGNS = 10
+# Likewise src.models.vehicle_generator.MAX_PREVIEW_CANDIDATES
+MAX_PREVIEW_CANDIDATES = 5
+
+def _design_inputs() -> list:
+    """(label, description) inputs for each design, two to a row"""
+    count = st.number_input("Designs to compare", min_value=2, max_value=MAX_DESIGNS, value=2)
+    designs = []
+    for index, col in enumerate(_grid(int(count), per_row=2)):
+        label, prompt = DEFAULT_DESIGNS[index] if index < len(DEFAULT_DESIGNS) else (f"Variant {index + 1}", "")
+        with col:
+            label = st.text_input("Design label", label, key=f"design_label_{index}")
+            prompt = st.text_area(f"{label or 'Design'} description", prompt, height=100,
+                                  key=f"design_prompt_{index}")
+        designs.append((label.strip(), prompt))
+    return designs
+
+# Sweep mode defaults: 3 x 2 x 2 = 12 variants
+DEFAULT_SWEEP_TEMPLATE = "A photorealistic 3D render of a modern EV sedan with {spoiler}, {ride_height} ride height and {grille}, white background, side view"
+DEFAULT_SWEEP_GRID = """spoiler: no rear spoiler, a ducktail spoiler, a large rear wing
+ride_height: standard, lowered
+grille: a closed front grille, an open front grille"""
+# Best variants shown as images under the ranked table
+SWEEP_GALLERY_SIZE = 4
+
+def _render_sweep_results(results: list, rank_by: str):
+    """Ranked table of a sweep plus thumbnails of the best variants"""
+    from src.analysis.design_sweep import rank_results, sweep_table
+
+    st.dataframe(sweep_table(results, rank_by), use_container_width=True)
+    best = [result for result in rank_results(results, rank_by) if result.ok][:SWEEP_GALLERY_SIZE]
+    if best:
+        st.subheader(f"Lowest {rank_by.upper()} variants")
+        for col, result in zip(st.columns(len(best)), best):
+            with col:
+                caption = ", ".join(result.variant.parameters.values())
+                st.image(result.thumbnail.bgr, channels="BGR", caption=caption,
+                         use_container_width=True)
+                st.caption(f"Cd {result.analysis['cd']:.3f} | Cl {result.analysis['cl']:.3f}")
+
+def _sweep_page(seed: int, extraction_method: str, preview: Optional[tuple], show_timing: bool):
+    """Expand a prompt template over a parameter grid and rank every variant"""
+    from src.analysis.design_sweep import (RANK_KEYS, expand_template, iter_sweep,
+                                           parse_parameter_grid, sweep_table)
+
+    template = st.text_area("Prompt template", DEFAULT_SWEEP_TEMPLATE, height=100,
+                            help="Use {name} placeholders for the swept parameters")
+    grid_text = st.text_area("Parameters (one per line: name: value, value, ...)",
+                             DEFAULT_SWEEP_GRID, height=100)
+    option_cols = st.columns(2)
+    with option_cols[0]:
+        max_workers = st.slider("Concurrent variants", min_value=1, max_value=8, value=4,
+                                help="Variants generated and analyzed at the same time")
+    with option_cols[1]:
+        rank_by = st.selectbox("Rank by", RANK_KEYS, format_func=str.upper)
+
+    try:
+        variants = expand_template(template, parse_parameter_grid(grid_text))
+    except ValueError as e:
+        st.error(f"Invalid sweep: {str(e)}")
+        return
+    st.caption(f"{len(variants)} variants")
+
+    key = (template, grid_text, int(seed), extraction_method, preview)
+    if st.button("Run Sweep"):
+        telemetry = get_telemetry()
+        run_mark = telemetry.mark()
+        generator = _get_generator()
+        analyzer = _get_analyzer()
+
+        limiter = get_rate_limiter()
+        progress = st.progress(0.0, text=f"0/{len(variants)} variants")
+        table_slot = st.empty()
+        results = []
+        for result in iter_sweep(variants, generator, analyzer, max_workers=max_workers,
+                                 seed=seed or None, extraction_method=extraction_method,
+                                 initializer=script_run_context_initializer(),
+                                 preview=_preview_options(preview)):
+            results.append(result)
+            text = f"{len(results)}/{len(variants)} variants"
+            if limiter is not None and limiter.queue_depth():
+                text += f" ({limiter.queue_depth()} Bedrock requests queued)"
+            progress.progress(len(results) / len(variants), text=text)
+            table_slot.dataframe(sweep_table(results, rank_by), use_container_width=True)
+        table_slot.empty()
+
+        timing = summarize_spans(telemetry.spans_since(run_mark))
+        telemetry.write_prometheus()
+        failed = sum(1 for result in results if not result.ok)
+        if failed:
+            st.error(f"{failed} of {len(results)} variants failed; see the error column")
+        st.session_state["sweep"] = {"key": key, "results": results, "timing": timing}
+
+    sweep = st.session_state.get("sweep")
+    if sweep:
+        if sweep["key"] != key:
+            st.info("Showing the last sweep; click Run Sweep to analyze the current template.")
+        _render_sweep_results(sweep["results"], rank_by)
+        if show_timing:
+            _render_timing_panel(sweep["timing"])
 
 def main():
     st.set_page_config(page_title="Design Theme to Aerodynamics", layout="wide")
@@ -70,139 +445,81 @@ def main():
         </div>
         """, unsafe_allow_html=True)
     
-    # Initialize generators and analyzer
-    generator = VehicleImageGenerator()
-    analyzer = AerodynamicAnalyzer()
-    
-    # Default prompts for both vehicle types
-    family_prompt = "A photorealistic 3D render of a modern EV like Model 3, white background, side view, showing practical design with smooth surfaces, flush door handles, and closed front grille"
-    aero_prompt = "A photorealistic 3D render of the same EV but with aerodynamic modifications: active rear spoiler, lowered suspension, white background, side view"
-    
-    # Create two columns for prompts
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("Initial Vehicle")
-        family_prompt = st.text_area("Initial Vehicle Description", family_prompt, height=100)
-        
-    with col2:
-        st.subheader("Aerodynamic Vehicle")
-        aero_prompt = st.text_area("Aerodynamic Vehicle Description", aero_prompt, height=100)
-    
+    mode = st.sidebar.radio("Mode", ("Compare designs", "Design sweep"))
+    # Fixed seeds make generations reproducible; repeated requests load from disk
+    seed = st.sidebar.number_input("Image seed (0 to omit)", min_value=0, max_value=2147483646, value=0)
+    extraction_method = st.sidebar.selectbox(
+        "Silhouette extraction", EXTRACTION_METHODS,
+        help="'canny' uses edge contours; 'segment' separates the vehicle from the plain background")
+    preview = None
+    if st.sidebar.checkbox("Fast preview", value=False,
+                           help="Generate several small candidates per design in one request and "
+                                "analyze only the one with the cleanest side-view silhouette"):
+        candidates = st.sidebar.slider("Preview candidates", min_value=1,
+                                       max_value=MAX_PREVIEW_CANDIDATES, value=3)
+        refine = st.sidebar.checkbox(
+            "Re-render the winner at full resolution", value=False,
+            help="One more Nova Canvas call per design; otherwise the winner is enlarged locally")
+        preview = (int(candidates), refine)
+    show_timing = st.sidebar.checkbox("Show timing panel", value=False)
+
+    if mode == "Design sweep":
+        _sweep_page(seed, extraction_method, preview, show_timing)
+        return
+
+    inputs = _design_inputs()
+    baseline = st.selectbox("Baseline", range(len(inputs)),
+                            format_func=lambda index: inputs[index][0] or f"Design {index + 1}",
+                            help="Changes in Cd and Cl are shown relative to this design")
+
+    key = _comparison_key(inputs, seed, extraction_method, preview)
+    comparisons = st.session_state.setdefault("comparisons", OrderedDict())
+
     if st.button("Generate & Compare Vehicles"):
-        # Generate and analyze both vehicles
+        from src.analysis.comparison import Design, validate_designs
+
+        designs = [Design(label, prompt) for label, prompt in inputs]
+        try:
+            validate_designs(designs)
+        except ValueError as e:
+            st.error(f"Invalid comparison: {str(e)}")
+            return
+
+        telemetry = get_telemetry()
+        run_mark = telemetry.mark()
+        # Shared across reruns and sessions (see _get_generator / _get_analyzer)
+        generator = _get_generator()
+        analyzer = _get_analyzer()
+        # Generate and analyze every design
         with st.spinner("Generating and analyzing vehicles..."):
-            # Generate initial vehicle
-            family_image, family_filepath = generator.generate_image(family_prompt)
-            # Generate aerodynamic vehicle
-            aero_image, aero_filepath = generator.generate_image(aero_prompt)
-            
-            if family_image and aero_image:
-                # Display generated images side by side
-                img_col1, img_col2 = st.columns(2)
-                
-                with img_col1:
-                    st.image(family_image, caption="Generated Initial Vehicle", use_container_width=True)
-                
-                with img_col2:
-                    st.image(aero_image, caption="Generated Aerodynamic Vehicle", use_container_width=True)
-                
-                # Extract features for both vehicles
-                try:
-                    # Convert PIL images to CV2 format for feature extraction
-                    family_cv_image = cv2.cvtColor(np.array(family_image), cv2.COLOR_RGB2BGR)
-                    aero_cv_image = cv2.cvtColor(np.array(aero_image), cv2.COLOR_RGB2BGR)
-                    
-                    # Extract features
-                    family_features = analyzer._extract_vehicle_features(family_cv_image)
-                    aero_features = analyzer._extract_vehicle_features(aero_cv_image)
-
-                    # Analyze both vehicles
-                    family_analysis = analyzer.analyze_aerodynamics(family_image)
-                    aero_analysis = analyzer.analyze_aerodynamics(aero_image)
-                
-                    # Display comparative analysis
-                    #st.subheader("Comparative Aerodynamic Analysis")
-                    st.markdown("<h1 style='color: #9370DB;'>Comparative Aerodynamic Analysis</h1>", unsafe_allow_html=True)
-                
-                    # Create metrics comparison
-                    metric_cols = st.columns(4)
-                
-                    with metric_cols[0]:
-                        st.metric("Initial Vehicle Cd", 
-                            f"{family_analysis['cd']:.3f}", 
-                            f"{((aero_analysis['cd'] - family_analysis['cd'])/family_analysis['cd']*100):.1f}%")
-                
-                    with metric_cols[1]:
-                        st.metric("Aero Vehicle Cd", 
-                            f"{aero_analysis['cd']:.3f}")
-                
-                    with metric_cols[2]:
-                        st.metric("Initial Vehicle Cl", 
-                            f"{family_analysis['cl']:.3f}", 
-                            f"{((aero_analysis['cl'] - family_analysis['cl'])/family_analysis['cl']*100):.1f}%")
-                
-                    with metric_cols[3]:
-                        st.metric("Aero Vehicle Cl", 
-                            f"{aero_analysis['cl']:.3f}")
-                
-                    # Additional KPIs
-                    #st.subheader("Detailed Aerodynamic KPIs")
-                    st.markdown("<h1 style='color: #9370DB;'>Detailed Aerodynamic KPIs</h1>", unsafe_allow_html=True)
-                    kpi_cols = st.columns(2)
-                    
-                    # Extract additional KPIs using LLM
-                    family_kpis = get_additional_kpis(analyzer, family_analysis, "family")
-                    aero_kpis = get_additional_kpis(analyzer, aero_analysis, "aerodynamic")
-                    
-                    with kpi_cols[0]:
-                        st.markdown("### Initial Vehicle KPIs")
-                        for kpi, value in family_kpis.items():
-                            st.metric(kpi, value)
-                    
-                    with kpi_cols[1]:
-                        st.markdown("### Aerodynamic Vehicle KPIs")
-                        for kpi, value in aero_kpis.items():
-                            st.metric(kpi, value)
-                    
-                    # Comparative Analysis
-                    st.subheader("Analysis Justification")
-                    
-                    analysis_cols = st.columns(2)
-                    with analysis_cols[0]:
-                        st.markdown("### Initial Vehicle Analysis")
-                        st.write(family_analysis['justification'])
-                    
-                    with analysis_cols[1]:
-                        st.markdown("### Aerodynamic Vehicle Analysis")
-                        st.write(aero_analysis['justification'])
-                    
-                    # Feature Detection Visualization
-                    st.subheader("Feature Detection Comparison")
-                    viz_cols = st.columns(2)
-                    
-                    with viz_cols[0]:
-                        family_viz = create_feature_visualization(family_image)
-                        st.image(family_viz, caption="Initial Vehicle Features", use_container_width=True)
-                    
-                    with viz_cols[1]:
-                        aero_viz = create_feature_visualization(aero_image)
-                        st.image(aero_viz, caption="Aerodynamic Vehicle Features", use_container_width=True)
-                    
-                    # Add flow visualization
-                    try:
-                        create_flow_visualization(family_features, aero_features)
-                    except Exception as viz_error:
-                        st.error(f"Error generating flow visualization: {str(viz_error)}")
-                           
-                    # Expert Analysis using LLM
-                    #st.subheader("Expert Comparative Analysis")
-                    st.markdown("<h1 style='color: #FFA500;'>Expert Comparative Analysis</h1>", unsafe_allow_html=True)
-                    expert_analysis = get_expert_analysis(analyzer, family_analysis, aero_analysis)
-                    st.markdown(expert_analysis)
-                    
-                except Exception as e:
-                    st.error(f"Error extracting features or analyzing vehicles: {str(e)}")
+            comparison = _run_comparison(generator, analyzer, designs, baseline,
+                                         seed, extraction_method, preview)
+
+        # Spans from other sessions running at the same time are included too
+        timing = summarize_spans(telemetry.spans_since(run_mark))
+        telemetry.write_prometheus()
+        if comparison is not None:
+            comparison["timing"] = timing
+            _store_comparison(comparisons, key, comparison)
+        if show_timing:
+            _render_timing_panel(timing)
+
+    elif comparisons:
+        # Any other widget interaction reruns the script: redraw from stored results
+        # instead of regenerating
+        if key in comparisons:
+            comparison = comparisons[key]
+        else:
+            comparison = next(reversed(comparisons.values()))
+            st.info("Showing the last comparison; click Generate & Compare Vehicles "
+                    "to analyze the current descriptions.")
+        _render_stored_comparison(comparison, min(baseline, len(comparison["results"]) - 1))
+        if show_timing and comparison.get("timing"):
+            _render_timing_panel(comparison["timing"])
+
+    # The shell is on screen: load what the first comparison needs while the
+    # user is still typing
+    _start_prewarm()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,203 @@
+"""
+Headless batch scoring for directories of renders or files of prompts.
+
+    python batch.py images path/to/renders -o results.jsonl
+    python batch.py prompts prompts.txt -o results.csv --seed 42
+    python batch.py prompts prompts.txt -o results.csv --preview 4
+
+Feature extraction runs in a process pool; Nova Canvas and Claude calls run in
+a bounded thread pool. Each result is written as soon as it completes.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from src.analysis.pipeline import NO_CONTOUR_ERROR, analyze_extracted
+from src.input.sources import list_images, read_prompts
+from src.output.result_writer import ResultWriter
+from src.utils.extraction_methods import EXTRACTION_METHODS
+from src.utils.telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages an item moves through
+GENERATE, EXTRACT, ANALYZE = 'generate', 'extract', 'analyze'
+
+
+def _result_row(item: str, image_path: Optional[str], features: Optional[dict] = None,
+                analysis: Optional[dict] = None, error: Optional[str] = None) -> dict:
+    """Flatten one item's features and coefficients into an output row"""
+    row = {'item': item, 'image_path': image_path, 'error': error}
+    row.update(features or {})
+    if analysis:
+        row.update({
+            'cd': analysis.get('cd'),
+            'cl': analysis.get('cl'),
+            'coefficient_source': analysis.get('source'),
+            'uncertainty': analysis.get('uncertainty'),
+            'match_distance': analysis.get('match_distance'),
+            'justification': analysis.get('justification')
+        })
+    return row
+
+
+def _generate_to_disk(generator, prompt: str, seed: Optional[int], preview=None):
+    """Generate one image and wait until the store has written it for the extraction workers"""
+    result = generator.generate_result(prompt, seed=seed, preview=preview)
+    if result.ok:
+        generator.store.wait(result.content_hash)
+    return result
+
+
+def run_pipeline(items: List[str], writer: ResultWriter, analyzer, generator=None,
+                 cv_workers: Optional[int] = None, llm_workers: int = 4,
+                 seed: Optional[int] = None, extraction_method: str = 'canny',
+                 preview=None) -> int:
+    """
+    Score every item and stream rows to ``writer``; returns the number of failures.
+
+    Items are prompts when a generator is given, otherwise image paths. Each
+    item moves to the next stage as soon as its previous stage finishes, so
+    generation, extraction and analysis of different items overlap.
+    Analysis goes through the same pipeline.analyze_extracted as the app.
+    ``preview`` (PreviewOptions) generates each prompt as the best of several
+    small candidates.
+    """
+    from src.utils.feature_extraction import extract_design_from_file
+
+    failures = 0
+    start = time.perf_counter()
+
+    # Spawned, not forked: the image store writer and Bedrock worker threads may
+    # already be running, and a forked child could inherit one of their locks held
+    with ProcessPoolExecutor(max_workers=cv_workers,
+                             mp_context=multiprocessing.get_context('spawn')) as cv_pool, \
+            ThreadPoolExecutor(max_workers=llm_workers) as llm_pool:
+        stages = {}
+        # Image store hashes of generated items, to record their analysis in the manifest
+        content_hashes = {}
+        store = generator.store if generator is not None else None
+
+        # Preview winners are stored small; measure them at full resolution
+        size = None
+        if preview is not None:
+            from src.models.vehicle_generator import FULL_SIZE
+            size = FULL_SIZE
+
+        def submit_extract(item, path):
+            future = cv_pool.submit(extract_design_from_file, path, extraction_method, size)
+            stages[future] = (EXTRACT, item, path, None)
+
+        for item in items:
+            if generator is not None:
+                future = llm_pool.submit(_generate_to_disk, generator, item, seed, preview)
+                stages[future] = (GENERATE, item, None, None)
+            else:
+                submit_extract(item, item)
+
+        while stages:
+            done, _ = wait(list(stages), return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, item, path, features = stages.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    writer.write(_result_row(item, path, features, error=f"{stage}: {e}"))
+                    failures += 1
+                    continue
+
+                if stage == GENERATE:
+                    if not result.ok:
+                        writer.write(_result_row(item, None, error=f"{stage}: {result.error}"))
+                        failures += 1
+                    else:
+                        content_hashes[item] = result.content_hash
+                        submit_extract(item, result.filepath)
+                elif stage == EXTRACT:
+                    features, shape = result
+                    future = llm_pool.submit(analyze_extracted, analyzer, features, shape,
+                                             store, content_hashes.get(item))
+                    stages[future] = (ANALYZE, item, path, features)
+                elif result is None:
+                    writer.write(_result_row(item, path, error=NO_CONTOUR_ERROR))
+                    failures += 1
+                else:
+                    writer.write(_result_row(item, path, features, result))
+                    elapsed = time.perf_counter() - start
+                    logger.info("[%d/%d] %s (%.2f items/s)", writer.rows, len(items), item,
+                                writer.rows / elapsed)
+
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch aerodynamic scoring of vehicle designs")
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    images = subparsers.add_parser('images', help="score a directory of vehicle images")
+    images.add_argument('directory')
+    images.add_argument('--recursive', action='store_true', help="include subdirectories")
+
+    prompts = subparsers.add_parser('prompts', help="generate and score one design per prompt line")
+    prompts.add_argument('prompt_file')
+    prompts.add_argument('--seed', type=int, default=None, help="Nova Canvas seed for every prompt")
+    prompts.add_argument('--preview', type=int, default=None, metavar='N',
+                         help="generate N small candidates per prompt and keep the best silhouette")
+    prompts.add_argument('--refine', action='store_true',
+                         help="re-render each preview winner at full resolution")
+
+    for sub in (images, prompts):
+        sub.add_argument('-o', '--output', required=True, help="results file (.jsonl or .csv)")
+        sub.add_argument('--format', choices=['jsonl', 'csv'], default=None)
+        sub.add_argument('--cv-workers', type=int, default=os.cpu_count(),
+                         help="processes for feature extraction")
+        sub.add_argument('--llm-workers', type=int, default=4,
+                         help="concurrent Bedrock requests")
+        sub.add_argument('--extraction', choices=EXTRACTION_METHODS, default='canny',
+                         help="silhouette extraction method")
+        sub.add_argument('-q', '--quiet', action='store_true',
+                         help="only log warnings, not per-item progress")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format="%(message)s", stream=sys.stderr)
+
+    # Imported here so --help works without AWS configuration
+    from src.models.aerodynamic_analyzer import AerodynamicAnalyzer
+
+    analyzer = AerodynamicAnalyzer(extraction_method=args.extraction)
+    generator = None
+    preview = None
+    if args.mode == 'images':
+        items = list_images(args.directory, args.recursive)
+    else:
+        from src.models.vehicle_generator import PreviewOptions, VehicleImageGenerator
+        items = read_prompts(args.prompt_file)
+        generator = VehicleImageGenerator()
+        if args.preview:
+            try:
+                preview = PreviewOptions(candidates=args.preview, refine=args.refine)
+            except ValueError as e:
+                parser.error(str(e))
+
+    start = time.perf_counter()
+    with ResultWriter(args.output, args.format) as writer:
+        failures = run_pipeline(items, writer, analyzer, generator,
+                                cv_workers=args.cv_workers, llm_workers=args.llm_workers,
+                                seed=getattr(args, 'seed', None),
+                                extraction_method=args.extraction, preview=preview)
+    elapsed = time.perf_counter() - start
+    get_telemetry().write_prometheus()
+
+    print(f"Scored {len(items)} items in {elapsed:.1f}s ({failures} failed) -> {args.output}",
+          file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Cold-start budget for the Streamlit app.
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --import-budget 0.1 --render-budget 1.0 -o cold.json
+
+Every sample runs in a fresh interpreter. It measures the time to import
+``app`` (after streamlit itself), lists any heavy dependency that import
+pulled in, and times the first script run through AppTest, which is what
+stands between a new container and the first paint. The exit status is 1 if
+a median exceeds its budget or ``import app`` loads a heavy dependency.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must only be loaded once a comparison needs them
+HEAVY_DEPENDENCIES = ('boto3', 'botocore', 'cv2', 'matplotlib', 'numpy')
+
+DEFAULT_IMPORT_BUDGET = 0.1
+DEFAULT_RENDER_BUDGET = 1.0
+
+_SAMPLE = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+import streamlit
+start = time.perf_counter()
+import app
+import_s = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+
+from streamlit import logger
+from streamlit.testing.v1 import AppTest
+logger.set_log_level('error')
+test = AppTest.from_file(os.path.join({root!r}, 'app.py'), default_timeout=60)
+start = time.perf_counter()
+test.run()
+render_s = time.perf_counter() - start
+errors = [str(e.value) for e in list(test.exception) + list(test.error)]
+print(json.dumps({{'import_s': import_s, 'render_s': render_s, 'heavy_loaded': loaded,
+                  'errors': errors}}))
+"""
+
+
+def sample() -> Dict:
+    """One cold import and first render in a new interpreter"""
+    code = _SAMPLE.format(root=REPO_ROOT, heavy=HEAVY_DEPENDENCIES)
+    output = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold-start import and first-render budget")
+    parser.add_argument('-o', '--output', help="write results JSON here (default: stdout)")
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters to sample")
+    parser.add_argument('--import-budget', type=float, default=DEFAULT_IMPORT_BUDGET,
+                        help="allowed median seconds to import app")
+    parser.add_argument('--render-budget', type=float, default=DEFAULT_RENDER_BUDGET,
+                        help="allowed median seconds for the first script run")
+    args = parser.parse_args(argv)
+
+    samples = [sample() for _ in range(args.repeat)]
+    results = {
+        'import_s': statistics.median(s['import_s'] for s in samples),
+        'render_s': statistics.median(s['render_s'] for s in samples),
+        'heavy_loaded': sorted({name for s in samples for name in s['heavy_loaded']}),
+        'errors': sorted({error for s in samples for error in s['errors']}),
+        'budget': {'import_s': args.import_budget, 'render_s': args.render_budget},
+        'samples': samples,
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    failures = []
+    if results['import_s'] > args.import_budget:
+        failures.append(f"import app took {results['import_s']:.3f}s "
+                        f"(budget {args.import_budget:.3f}s)")
+    if results['render_s'] > args.render_budget:
+        failures.append(f"first render took {results['render_s']:.3f}s "
+                        f"(budget {args.render_budget:.3f}s)")
+    if results['heavy_loaded']:
+        failures.append(f"import app loaded {', '.join(results['heavy_loaded'])}")
+    if results['errors']:
+        failures.append(f"first render failed: {results['errors']}")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
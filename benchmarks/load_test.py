@@ -0,0 +1,279 @@
+"""
+Multi-session load test for the Streamlit app.
+
+    python -m benchmarks.load_test --concurrency 1 2 4 8 --sessions 3 --latency 0.5
+    python -m benchmarks.load_test --throttle-rate 0.05 --max-in-flight 4 -o load.json
+
+Each simulated session is an AppTest instance driving ``app.main`` in this
+process: a first run to render the page, then a "Compare" click timed until
+the page has finished. Sessions use distinct prompts so none of them is
+served from another's image store entry. Bedrock is replaced by
+``StubBedrockClient``, which can add latency and throttle a fraction of
+calls or every call over a per-model concurrency cap. The rate limiter stays
+on (pass --no-rate-limit to measure without it), as do the in-process memos.
+
+For every concurrency level it reports throughput, p50/p95/p99 latency, peak
+RSS, the session error rate and how often Bedrock throttled or the limiter
+queued requests. Results are JSON.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Sessions must do the full work, not hit a cache from an earlier run
+os.environ['VEH_AERO_LLM_CACHE'] = '0'
+os.environ['VEH_AERO_SURROGATE'] = '0'
+os.environ['VEH_AERO_DESIGN_INDEX'] = '0'
+if '--no-rate-limit' in sys.argv:
+    os.environ['VEH_AERO_RATE_LIMIT'] = '0'
+
+import numpy as np  # noqa: E402
+
+from benchmarks.stub_bedrock import PAYLOAD_DIR, StubBedrockClient, install_stub  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RSS_INTERVAL = 0.05
+
+
+def _prepare_apptest():
+    """
+    Make AppTest safe to run from several threads at once.
+
+    Every AppTest run patches the global config for its duration, so
+    overlapping runs restore each other's options mid-run; pin the option
+    once instead. Compiling the script concurrently can also trip a CPython
+    3.11 ``ast.parse`` race ("AST constructor recursion depth mismatch"), so
+    compilation is serialized.
+    """
+    from streamlit import config
+    from streamlit.runtime.scriptrunner import script_cache
+    from streamlit.testing.v1 import app_test
+
+    config.set_option('global.appTest', True)
+    app_test.patch_config_options = lambda options: contextlib.nullcontext()
+
+    compile_lock = threading.Lock()
+    get_bytecode = script_cache.ScriptCache.get_bytecode
+
+    def locked_get_bytecode(self, script_path):
+        with compile_lock:
+            return get_bytecode(self, script_path)
+
+    script_cache.ScriptCache.get_bytecode = locked_get_bytecode
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """Peak resident set size while active, sampled every RSS_INTERVAL seconds"""
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            rss = _rss_bytes()
+            if rss is None:
+                # No procfs: fall back to the process lifetime peak
+                self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                return
+            self.peak = max(self.peak, rss)
+            if self._stop.wait(RSS_INTERVAL):
+                return
+
+    def __enter__(self) -> 'RssSampler':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_session(index: int, designs: int, timeout: float) -> Dict:
+    """Render the page, fill in the designs and time one comparison"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(REPO_ROOT, 'app.py'), default_timeout=timeout)
+    app.run()
+    if designs != 2:
+        count = next(n for n in app.number_input if n.label == "Designs to compare")
+        count.set_value(designs).run()
+    # Extra designs start empty; reuse the two default descriptions for them
+    defaults = [area.value for area in app.text_area[:2]]
+    for number, area in enumerate(app.text_area):
+        area.input(f"{defaults[number % 2]} (session {index}, design {number + 1})")
+
+    start = time.perf_counter()
+    error = None
+    try:
+        app.button[0].click().run()
+        failures = [str(e.value) for e in list(app.exception) + list(app.error)]
+        if failures:
+            error = failures[0]
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {'latency_s': time.perf_counter() - start, 'error': error}
+
+
+def _limiter_counters() -> Dict[str, float]:
+    from src.utils.telemetry import get_telemetry
+    totals = {'rate_limit_throttled_total': 0.0, 'rate_limit_wait_seconds_total': 0.0}
+    for (name, _), value in get_telemetry().counters().items():
+        if name in totals:
+            totals[name] += value
+    return totals
+
+
+def run_level(concurrency: int, sessions: int, designs: int, timeout: float,
+              stub: StubBedrockClient) -> Dict:
+    """Run ``sessions`` sessions back to back on each of ``concurrency`` threads"""
+    results: List[Dict] = []
+    lock = threading.Lock()
+    counter = iter(range(concurrency * sessions))
+
+    def worker():
+        for _ in range(sessions):
+            with lock:
+                index = next(counter)
+            result = run_session(index, designs, timeout)
+            with lock:
+                results.append(result)
+
+    calls, throttled, limiter = stub.calls, stub.throttled, _limiter_counters()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    limiter_after = _limiter_counters()
+
+    latencies = np.array([r['latency_s'] for r in results])
+    errors = [r['error'] for r in results if r['error']]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'concurrency': concurrency,
+        'sessions': len(results),
+        'elapsed_s': elapsed,
+        'throughput_per_s': len(results) / elapsed,
+        'p50_s': float(p50),
+        'p95_s': float(p95),
+        'p99_s': float(p99),
+        'peak_rss_mb': rss.peak / 2 ** 20,
+        'errors': len(errors),
+        'error_rate': len(errors) / len(results),
+        'error_samples': sorted(set(errors))[:5],
+        'bedrock_calls': stub.calls - calls,
+        'bedrock_throttled': stub.throttled - throttled,
+        'limiter_throttled': limiter_after['rate_limit_throttled_total']
+        - limiter['rate_limit_throttled_total'],
+        'limiter_wait_s': limiter_after['rate_limit_wait_seconds_total']
+        - limiter['rate_limit_wait_seconds_total'],
+    }
+
+
+def _print_table(levels: List[Dict]):
+    print(f"{'conc':>5}{'sessions':>10}{'req/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}"
+          f"{'rss MB':>9}{'errors':>8}{'throttled':>11}{'queued s':>10}", file=sys.stderr)
+    for level in levels:
+        print(f"{level['concurrency']:>5}{level['sessions']:>10}{level['throughput_per_s']:>8.2f}"
+              f"{level['p50_s']:>8.2f}{level['p95_s']:>8.2f}{level['p99_s']:>8.2f}"
+              f"{level['peak_rss_mb']:>9.0f}{level['error_rate']:>8.1%}"
+              f"{level['bedrock_throttled']:>11}{level['limiter_wait_s']:>10.1f}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Multi-session load test against a Bedrock stub")
+    parser.add_argument('-o', '--output', help="write results JSON here (default: stdout)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="concurrent sessions per level")
+    parser.add_argument('--sessions', type=int, default=3,
+                        help="sessions each concurrent user runs per level")
+    parser.add_argument('--designs', type=int, default=2, help="designs per comparison")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed sessions before the first level")
+    parser.add_argument('--timeout', type=float, default=300, help="seconds allowed per script run")
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help="artificial seconds per Bedrock call")
+    parser.add_argument('--nova-latency', type=float, default=None,
+                        help="override the latency for Nova Canvas calls")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="extra random latency of up to this many seconds")
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help="fraction of Bedrock calls rejected with ThrottlingException")
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help="throttle calls beyond this many in flight per model")
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help="disable the per-model rate limiter")
+    parser.add_argument('--payload-dir', default=PAYLOAD_DIR, help="recorded payload directory")
+    args = parser.parse_args(argv)
+
+    latency_by_model = {'nova': args.nova_latency} if args.nova_latency is not None else None
+    stub = StubBedrockClient(args.payload_dir, latency=args.latency, jitter=args.jitter,
+                             latency_by_model=latency_by_model, throttle_rate=args.throttle_rate,
+                             max_in_flight=args.max_in_flight)
+    install_stub(stub)
+
+    from streamlit import logger as streamlit_logger
+    # The missing-ScriptRunContext warning would be repeated on every run
+    streamlit_logger.set_log_level('error')
+    _prepare_apptest()
+
+    workdir = tempfile.mkdtemp(prefix='veh_aero_load_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for index in range(args.warmup):
+            run_session(-1 - index, args.designs, args.timeout)
+        levels = [run_level(concurrency, args.sessions, args.designs, args.timeout, stub)
+                  for concurrency in args.concurrency]
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        'config': {
+            'sessions_per_user': args.sessions,
+            'designs': args.designs,
+            'latency_s': args.latency,
+            'nova_latency_s': args.nova_latency,
+            'jitter_s': args.jitter,
+            'throttle_rate': args.throttle_rate,
+            'max_in_flight': args.max_in_flight,
+            'rate_limit': not args.no_rate_limit,
+        },
+        'levels': levels,
+    }
+    _print_table(levels)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
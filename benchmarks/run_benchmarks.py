@@ -0,0 +1,254 @@
+"""
+Offline stage-level benchmarks for the analysis pipeline.
+
+    python -m benchmarks.run_benchmarks -o bench.json
+    python -m benchmarks.run_benchmarks -o new.json --compare bench.json --threshold 0.2
+
+Bedrock is replaced by ``StubBedrockClient`` serving recorded payloads, and the
+LLM cache and surrogate are disabled. Each stage is timed separately, and the
+in-process memo caches are cleared before every repeat so each sample does
+the full work. Results are JSON. With --compare, the stage medians are checked
+against an earlier run and the exit status is 1 if any stage regressed by
+more than the threshold.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+# Benchmarks must measure the work, not a cache hit from an earlier run
+os.environ['VEH_AERO_LLM_CACHE'] = '0'
+os.environ['VEH_AERO_SURROGATE'] = '0'
+os.environ['VEH_AERO_DESIGN_INDEX'] = '0'
+# Repeated runs would otherwise be paced by the per-model request budgets
+os.environ['VEH_AERO_RATE_LIMIT'] = '0'
+
+import cv2  # noqa: E402
+import matplotlib  # noqa: E402
+import numpy as np  # noqa: E402
+
+from benchmarks.stub_bedrock import PAYLOAD_DIR, StubBedrockClient, install_stub  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _reset_caches():
+    """Drop the in-process extraction and render memos"""
+    from src.utils import feature_extraction
+    from src.visual import flow_visualization, interactive_flow
+    with feature_extraction._extraction_lock:
+        feature_extraction._extraction_cache.clear()
+    with flow_visualization._render_cache_lock:
+        flow_visualization._render_cache.clear()
+    with interactive_flow._payload_cache_lock:
+        interactive_flow._payload_cache.clear()
+
+
+def _summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        'n': len(samples),
+        'min_ms': ordered[0] * 1000,
+        'median_ms': statistics.median(ordered) * 1000,
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p95_ms': p95 * 1000,
+        'stdev_ms': (statistics.stdev(ordered) if len(ordered) > 1 else 0.0) * 1000,
+    }
+
+
+def time_stage(fn: Callable[[], object], repeat: int, warmup: int = 1,
+               setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Time ``fn`` ``repeat`` times after ``warmup`` untimed calls; ``setup`` runs untimed before each"""
+    samples = []
+    for i in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return _summarize(samples)
+
+
+def _decode(b64_png: str):
+    """The generator's decode path: base64 -> DecodedImage (BGR ndarray)"""
+    from src.utils.image_buffer import DecodedImage
+    return DecodedImage.from_bytes(base64.b64decode(b64_png))
+
+
+def run_stage_benchmarks(client: StubBedrockClient, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Time the CV and plotting stages on the recorded Nova Canvas images"""
+    from src.models.aerodynamic_analyzer import AerodynamicAnalyzer
+    from src.utils.extraction_methods import EXTRACTION_METHODS
+    from src.utils.feature_extraction import create_feature_visualization, extract_vehicle_features
+    from src.utils.silhouette import score_silhouette
+    from src.visual.flow_visualization import FlowVisualization
+    from src.visual.interactive_flow import flow_payload
+
+    analyzer = AerodynamicAnalyzer()
+    flow = FlowVisualization()
+    results = {}
+
+    for name, is_aero in (('family', False), ('aero', True)):
+        b64_png = client._payload(f"nova_canvas_{name}")['images'][0]
+        image = _decode(b64_png)
+
+        results[f"decode[{name}]"] = time_stage(lambda: _decode(b64_png), repeat)
+        results[f"score_silhouette[{name}]"] = time_stage(lambda: score_silhouette(image), repeat)
+        results[f"extract_vehicle_features[{name}]"] = time_stage(
+            lambda: analyzer._extract_vehicle_features(image), repeat, setup=_reset_caches)
+        for method in EXTRACTION_METHODS:
+            results[f"extract_vehicle_features[{name},{method}]"] = time_stage(
+                lambda: extract_vehicle_features(image, method), repeat, setup=_reset_caches)
+
+        extraction = extract_vehicle_features(image)
+        results[f"create_feature_visualization[{name}]"] = time_stage(
+            lambda: create_feature_visualization(image, extraction), repeat)
+        results[f"generate_flow_data[{name}]"] = time_stage(
+            lambda: flow.generate_flow_data(extraction.features, is_aero, extraction.main_contour),
+            repeat)
+        results[f"create_visualization[{name}]"] = time_stage(
+            lambda: flow.create_visualization(extraction.features, is_aero, extraction.main_contour),
+            repeat, setup=_reset_caches)
+        results[f"flow_payload[{name}]"] = time_stage(
+            lambda: flow_payload(flow, extraction.features, is_aero, extraction.main_contour),
+            repeat, setup=_reset_caches)
+    return results
+
+
+def run_app_benchmark(repeat: int, timeout: float) -> Dict[str, float]:
+    """Time a full ``app.main`` run (button click to finished page) through AppTest"""
+    from streamlit import logger as streamlit_logger
+    from streamlit.testing.v1 import AppTest
+
+    # The missing-ScriptRunContext warning would be repeated on every run
+    streamlit_logger.set_log_level('error')
+
+    workdir = tempfile.mkdtemp(prefix='veh_aero_bench_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    def setup():
+        # Empty image store and memos so images are fetched and processed again
+        from src.output.image_store import get_image_store
+        get_image_store().cleanup(max_images=0)
+        _reset_caches()
+
+    def run():
+        app = AppTest.from_file(os.path.join(REPO_ROOT, 'app.py'), default_timeout=timeout)
+        app.run()
+        app.button[0].click().run()
+        if app.exception or app.error:
+            raise RuntimeError(f"app run failed: {[e.value for e in app.exception or app.error]}")
+
+    try:
+        return time_stage(run, repeat, setup=setup)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Print median ratios against a baseline run and return the regressed stage names"""
+    regressions = []
+    print(f"{'stage':<52}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for stage, stats in current['stages'].items():
+        before = baseline.get('stages', {}).get(stage)
+        if before is None:
+            print(f"{stage:<52}{'-':>12}{stats['median_ms']:>10.2f}ms{'new':>8}")
+            continue
+        ratio = stats['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        flag = '  REGRESSED' if ratio > 1 + threshold else ''
+        print(f"{stage:<52}{before['median_ms']:>10.2f}ms{stats['median_ms']:>10.2f}ms"
+              f"{ratio:>8.2f}{flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline stage-level benchmarks")
+    parser.add_argument('-o', '--output', help="write results JSON here (default: stdout)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per stage")
+    parser.add_argument('--app-repeat', type=int, default=3, help="timed full app runs")
+    parser.add_argument('--skip-app', action='store_true', help="skip the full app.main benchmark")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="artificial seconds per Bedrock call")
+    parser.add_argument('--nova-latency', type=float, default=None,
+                        help="override the latency for Nova Canvas calls")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="extra random latency of up to this many seconds")
+    parser.add_argument('--payload-dir', default=PAYLOAD_DIR, help="recorded payload directory")
+    parser.add_argument('--compare', help="baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed fractional slowdown of a stage median")
+    args = parser.parse_args(argv)
+
+    latency_by_model = {'nova': args.nova_latency} if args.nova_latency is not None else None
+    client = StubBedrockClient(args.payload_dir, latency=args.latency, jitter=args.jitter,
+                               latency_by_model=latency_by_model)
+    install_stub(client)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    stages = run_stage_benchmarks(client, args.repeat)
+    if not args.skip_app:
+        stages['app.main'] = run_app_benchmark(args.app_repeat, timeout=120)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'matplotlib': matplotlib.__version__,
+            'latency_s': args.latency,
+            'nova_latency_s': args.nova_latency,
+            'jitter_s': args.jitter,
+            'repeat': args.repeat,
+            'bedrock_calls': client.calls,
+        },
+        'stages': stages,
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}",
+                  file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
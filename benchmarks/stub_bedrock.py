@@ -0,0 +1,241 @@
+"""
+Offline stand-in for the ``bedrock-runtime`` client.
+
+Responses are served from recorded payloads in ``benchmarks/payloads``:
+
+    nova_canvas_family.json / nova_canvas_aero.json   Nova Canvas response bodies
+    claude_coefficients.json / claude_kpis.json / claude_expert.json
+
+Nova Canvas payloads that have not been recorded are replaced by synthetic
+side-view renders drawn with OpenCV. Nova Canvas images are resized to the
+requested size and repeated ``numberOfImages`` times. Use ``RecordingClient``
+around a live client to capture real payloads into a directory.
+"""
+import base64
+import io
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import boto3
+import cv2
+from botocore.exceptions import ClientError
+import numpy as np
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payloads')
+
+# Claude request kinds, recognised by the assistant prefill each caller uses
+_CLAUDE_KINDS = (
+    ('aerodynamic coefficients in JSON format', 'claude_coefficients'),
+    ('calculate these KPIs', 'claude_kpis'),
+    ('detailed aerodynamic analysis', 'claude_expert'),
+)
+
+
+def synthetic_render(aerodynamic: bool = False, size: int = 1024) -> np.ndarray:
+    """Deterministic side view of a sedan on a white background (BGR)"""
+    image = np.full((size, size, 3), 255, np.uint8)
+    s = size / 1024.0
+    roof = 330 if aerodynamic else 300
+    ride = 650 if aerodynamic else 640
+
+    body = np.array([[120, ride], [130, 540], [260, 500], [380, roof + 10], [560, roof],
+                     [700, roof + 20], [850, 480], [920, 500], [915, ride]], np.float32) * s
+    cabin = np.array([[400, roof + 40], [560, roof + 30], [680, roof + 45], [780, 470],
+                      [330, 480]], np.float32) * s
+    cv2.fillPoly(image, [body.astype(np.int32)], (200, 200, 205), cv2.LINE_AA)
+    cv2.fillPoly(image, [cabin.astype(np.int32)], (70, 60, 50), cv2.LINE_AA)
+    if aerodynamic:
+        spoiler = np.array([[840, 455], [925, 440], [930, 455], [850, 470]], np.float32) * s
+        cv2.fillPoly(image, [spoiler.astype(np.int32)], (40, 40, 40), cv2.LINE_AA)
+
+    # Vertical shading so the body is not a flat colour
+    rows = np.linspace(0.85, 1.0, size, dtype=np.float32)[:, None, None]
+    painted = image.min(axis=2) < 250
+    image = np.where(painted[..., None], (image * rows).astype(np.uint8), image)
+
+    for cx in (270, 770):
+        centre = (int(cx * s), int(ride * s))
+        cv2.circle(image, centre, int(75 * s), (30, 30, 30), -1, cv2.LINE_AA)
+        cv2.circle(image, centre, int(40 * s), (160, 160, 165), -1, cv2.LINE_AA)
+    return image
+
+
+def _nova_payload(payload_dir: str, name: str, aerodynamic: bool) -> Dict[str, Any]:
+    """Recorded Nova Canvas payload, or one wrapping a synthetic render"""
+    path = os.path.join(payload_dir, f"{name}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    ok, png = cv2.imencode('.png', synthetic_render(aerodynamic))
+    return {"images": [base64.b64encode(png.tobytes()).decode('ascii')], "error": None}
+
+
+def _token_estimate(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class _Body(io.BytesIO):
+    """Stands in for botocore's StreamingBody"""
+
+
+class StubBedrockClient:
+    """
+    Implements ``invoke_model`` and ``invoke_model_with_response_stream``
+    against recorded payloads, sleeping ``latency`` seconds (plus up to
+    ``jitter`` seconds, seeded) per call. ``latency_by_model`` overrides the
+    latency for model ids containing a given substring, e.g. ``{'nova': 2.0}``.
+
+    Throttling is simulated like the service reports it, as a
+    ``ThrottlingException`` ClientError: a random ``throttle_rate`` fraction
+    of calls, and every call beyond ``max_in_flight`` concurrent calls to
+    one model.
+    """
+
+    def __init__(self, payload_dir: str = PAYLOAD_DIR, latency: float = 0.0, jitter: float = 0.0,
+                 latency_by_model: Optional[Dict[str, float]] = None, chunk_chars: int = 40,
+                 seed: int = 0, throttle_rate: float = 0.0, max_in_flight: Optional[int] = None):
+        self.payload_dir = payload_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_by_model = latency_by_model or {}
+        self.chunk_chars = chunk_chars
+        self.throttle_rate = throttle_rate
+        self.max_in_flight = max_in_flight
+        self.calls = 0
+        self.throttled = 0
+        self._in_flight: Dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._sized: Dict[Any, Dict[str, Any]] = {}
+
+    def _payload(self, name: str) -> Dict[str, Any]:
+        if name not in self._payloads:
+            if name.startswith('nova_canvas'):
+                self._payloads[name] = _nova_payload(self.payload_dir, name, name.endswith('aero'))
+            else:
+                with open(os.path.join(self.payload_dir, f"{name}.json")) as f:
+                    self._payloads[name] = json.load(f)
+        return self._payloads[name]
+
+    def _route(self, model_id: str, request: Dict[str, Any]) -> str:
+        """Payload name for a request"""
+        if 'nova' in model_id:
+            params = request.get('textToImageParams') or request.get('imageVariationParams', {})
+            text = params.get('text', '')
+            return 'nova_canvas_aero' if 'aerodynamic' in text.lower() else 'nova_canvas_family'
+        prompt = request.get('prompt', '')
+        for marker, name in _CLAUDE_KINDS:
+            if marker in prompt:
+                return name
+        raise ValueError(f"No recorded payload for request to {model_id}")
+
+    def _request_payload(self, model_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Payload for a request; Nova Canvas images are resized and repeated as requested"""
+        name = self._route(model_id, request)
+        payload = self._payload(name)
+        config = request.get('imageGenerationConfig')
+        if not name.startswith('nova_canvas') or not config:
+            return payload
+
+        key = (name, config.get('width'), config.get('height'), config.get('numberOfImages', 1))
+        with self._lock:
+            if key not in self._sized:
+                image = payload['images'][0]
+                if config.get('width') and config.get('height'):
+                    bgr = cv2.imdecode(np.frombuffer(base64.b64decode(image), np.uint8),
+                                       cv2.IMREAD_COLOR)
+                    if bgr.shape[:2] != (config['height'], config['width']):
+                        bgr = cv2.resize(bgr, (config['width'], config['height']),
+                                         interpolation=cv2.INTER_AREA)
+                        image = base64.b64encode(cv2.imencode('.png', bgr)[1].tobytes()).decode('ascii')
+                self._sized[key] = {**payload, 'images': [image] * key[3]}
+            return self._sized[key]
+
+    def _sleep(self, model_id: str):
+        latency = self.latency
+        for marker, value in self.latency_by_model.items():
+            if marker in model_id:
+                latency = value
+        with self._lock:
+            self.calls += 1
+            in_flight = self._in_flight.get(model_id, 0)
+            if self._random.random() < self.throttle_rate or \
+                    (self.max_in_flight is not None and in_flight >= self.max_in_flight):
+                self.throttled += 1
+                raise ClientError({'Error': {'Code': 'ThrottlingException',
+                                             'Message': 'Too many requests, please wait before trying again.'},
+                                   'ResponseMetadata': {'HTTPStatusCode': 429}}, 'InvokeModel')
+            self._in_flight[model_id] = in_flight + 1
+            latency += self._random.uniform(0, self.jitter)
+        try:
+            if latency > 0:
+                time.sleep(latency)
+        finally:
+            with self._lock:
+                self._in_flight[model_id] -= 1
+
+    def _metadata(self, request_body: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        output = payload.get('completion', '')
+        return {'HTTPStatusCode': 200, 'HTTPHeaders': {
+            'x-amzn-bedrock-input-token-count': str(_token_estimate(request_body)),
+            'x-amzn-bedrock-output-token-count': str(_token_estimate(output)) if output else '0',
+        }}
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict[str, Any]:
+        payload = self._request_payload(modelId, json.loads(body))
+        self._sleep(modelId)
+        return {
+            'body': _Body(json.dumps(payload).encode('utf-8')),
+            'contentType': 'application/json',
+            'ResponseMetadata': self._metadata(body, payload)
+        }
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict[str, Any]:
+        payload = self._payload(self._route(modelId, json.loads(body)))
+        self._sleep(modelId)
+        text = payload.get('completion', '')
+
+        def events():
+            for start in range(0, len(text), self.chunk_chars):
+                chunk = {'completion': text[start:start + self.chunk_chars], 'stop_reason': None}
+                yield {'chunk': {'bytes': json.dumps(chunk).encode('utf-8')}}
+
+        return {'body': events(), 'contentType': 'application/json',
+                'ResponseMetadata': self._metadata(body, payload)}
+
+
+class RecordingClient:
+    """Wraps a live client and saves each response body under its payload name"""
+
+    def __init__(self, client, payload_dir: str):
+        self.client = client
+        self.payload_dir = payload_dir
+        self._router = StubBedrockClient(payload_dir)
+        os.makedirs(payload_dir, exist_ok=True)
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict[str, Any]:
+        response = self.client.invoke_model(modelId=modelId, body=body, **kwargs)
+        raw = response['body'].read()
+        name = self._router._route(modelId, json.loads(body))
+        with open(os.path.join(self.payload_dir, f"{name}.json"), 'wb') as f:
+            f.write(raw)
+        response['body'] = _Body(raw)
+        return response
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs):
+        # Streamed responses are recorded through the equivalent non-streaming call
+        response = self.invoke_model(modelId, body, **kwargs)
+        payload = json.loads(response['body'].read())
+        chunk = {'completion': payload.get('completion', '')}
+        return {'body': iter([{'chunk': {'bytes': json.dumps(chunk).encode('utf-8')}}])}
+
+
+def install_stub(client) -> None:
+    """Make ``boto3.client`` return ``client`` for every service"""
+    boto3.client = lambda *args, **kwargs: client
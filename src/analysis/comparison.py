@@ -0,0 +1,133 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.analysis.pipeline import generate_and_analyze
+from src.models.aerodynamic_analyzer import get_additional_kpis
+from src.utils.feature_extraction import VehicleExtraction
+from src.utils.image_buffer import DecodedImage
+from src.utils.silhouette import SilhouetteScore
+from src.utils.task_graph import TaskGraph
+from src.utils.telemetry import get_telemetry
+
+# Reviews cover up to ten variants; each costs one image and two Claude calls
+MAX_DESIGNS = 10
+COEFFICIENTS = ('cd', 'cl')
+# Vehicle type in the KPI prompt. Fixed rather than the free-form label, so
+# relabelling a design neither changes the prompt nor misses the LLM cache
+KPI_VEHICLE_TYPE = "passenger"
+
+
+@dataclass
+class Design:
+    """A labelled prompt to generate and analyze"""
+    label: str
+    prompt: str
+
+
+@dataclass
+class DesignResult:
+    """Generation, extraction and coefficients for one design; ``error`` is set instead of raising"""
+    design: Design
+    image: Optional[DecodedImage] = None
+    extraction: Optional[VehicleExtraction] = None
+    analysis: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    # Silhouette score of the chosen preview candidate
+    score: Optional[SilhouetteScore] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def validate_designs(designs: Sequence[Design]):
+    """Raise ValueError unless there are 2..MAX_DESIGNS designs with distinct labels and prompts"""
+    if not 2 <= len(designs) <= MAX_DESIGNS:
+        raise ValueError(f"Compare between 2 and {MAX_DESIGNS} designs, got {len(designs)}")
+    labels = [design.label.strip() for design in designs]
+    if not all(labels) or not all(design.prompt.strip() for design in designs):
+        raise ValueError("Every design needs a label and a description")
+    if len(set(labels)) != len(labels):
+        raise ValueError("Design labels must be unique")
+
+
+def analyze_design(generator, analyzer, design: Design, seed: Optional[int] = None,
+                   extraction_method: str = 'canny', preview=None) -> DesignResult:
+    """Generate, extract and estimate coefficients for one design; ``preview`` is a PreviewOptions"""
+    with get_telemetry().span('compare_design', label=design.label):
+        outcome = generate_and_analyze(generator, analyzer, design.prompt, seed,
+                                       extraction_method, preview)
+    generation = outcome.generation
+    return DesignResult(design, generation.image, outcome.extraction, outcome.analysis,
+                        outcome.error, generation.score)
+
+
+def iter_comparison(designs: Sequence[Design], generator, analyzer, max_workers: Optional[int] = None,
+                    seed: Optional[int] = None, extraction_method: str = 'canny',
+                    initializer: Optional[Callable[[], None]] = None, preview=None
+                    ) -> Iterator[Tuple[str, int, Any]]:
+    """
+    Run every design in parallel, yielding ``(stage, index, result)`` as each finishes.
+
+    Stage 'design' carries the DesignResult (image, extraction and
+    coefficients); stage 'kpis' follows once that design's KPIs are in. KPI
+    calls are scheduled as soon as their design's coefficients are ready, so
+    the caller can start the expert summary while they are still running.
+    ``max_workers`` defaults to two per design; the rate limiter bounds the
+    Bedrock requests actually in flight. With ``preview`` (PreviewOptions),
+    each design is the best of several small candidates.
+    """
+    graph = TaskGraph(max_workers=max_workers or 2 * len(designs), initializer=initializer)
+    for index, design in enumerate(designs):
+        graph.add(f"design:{index}",
+                  lambda design=design: analyze_design(generator, analyzer, design, seed,
+                                                       extraction_method, preview))
+        graph.add(f"kpis:{index}",
+                  lambda result: get_additional_kpis(analyzer, result.analysis, KPI_VEHICLE_TYPE)
+                  if result.ok else {},
+                  deps=[f"design:{index}"])
+    for name, result in graph.as_completed():
+        stage, index = name.split(':')
+        yield stage, int(index), result
+
+
+def coefficient_deltas(results: Sequence[DesignResult], baseline: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Cd/Cl of every design and their change from the baseline design.
+
+    Returns (N, 2) arrays ``values``, ``delta`` and ``percent`` (relative to
+    the baseline's magnitude), columns in COEFFICIENTS order. Designs without
+    coefficients, and every delta when the baseline has none, are NaN.
+    """
+    values = np.full((len(results), len(COEFFICIENTS)), np.nan)
+    for row, result in enumerate(results):
+        if result.ok:
+            values[row] = [result.analysis[key] for key in COEFFICIENTS]
+    delta = values - values[baseline]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = delta / np.abs(values[baseline]) * 100
+    percent[~np.isfinite(percent)] = np.nan
+    return {'values': values, 'delta': delta, 'percent': percent}
+
+
+def _rounded(value: float, digits: int) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def comparison_table(results: Sequence[DesignResult], baseline: int = 0) -> List[Dict[str, Any]]:
+    """Rows of coefficients and deltas from the baseline, in design order"""
+    deltas = coefficient_deltas(results, baseline)
+    rows = []
+    for row, result in enumerate(results):
+        rows.append({
+            'design': result.design.label,
+            'cd': _rounded(deltas['values'][row, 0], 3),
+            'cl': _rounded(deltas['values'][row, 1], 3),
+            'cd_delta_pct': _rounded(deltas['percent'][row, 0], 1),
+            'cl_delta_pct': _rounded(deltas['percent'][row, 1], 1),
+            'source': result.analysis.get('source'),
+            'error': result.error,
+        })
+    return rows
@@ -0,0 +1,173 @@
+import itertools
+import string
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from src.analysis.pipeline import generate_and_analyze
+from src.utils.image_buffer import DecodedImage
+from src.utils.telemetry import get_telemetry
+
+# Guard against a grid that would quietly queue hundreds of Nova Canvas calls
+MAX_SWEEP_VARIANTS = 200
+RANK_KEYS = ('cd', 'cl')
+# Results keep a thumbnail rather than the full render; the image store has that
+THUMBNAIL_SIZE = 256
+
+
+@dataclass
+class SweepVariant:
+    """One point of the parameter grid and the prompt it expands to"""
+    index: int
+    parameters: Dict[str, str]
+    prompt: str
+
+
+@dataclass
+class SweepResult:
+    """Generation and analysis outcome for one variant; ``error`` is set instead of raising"""
+    variant: SweepVariant
+    thumbnail: Optional[DecodedImage] = None
+    filepath: Optional[str] = None
+    analysis: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def parse_parameter_grid(text: str) -> Dict[str, List[str]]:
+    """
+    Parse one parameter per line as ``name: value, value, ...``, skipping
+    blank lines and '#' comments.
+    """
+    grid = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        name, sep, values = line.partition(':')
+        name = name.strip()
+        options = [value.strip() for value in values.split(',') if value.strip()]
+        if not sep or not name.isidentifier() or not options:
+            raise ValueError(f"Line {number}: expected 'name: value, value, ...', got {line!r}")
+        if name in grid:
+            raise ValueError(f"Line {number}: parameter '{name}' is listed twice")
+        grid[name] = options
+    return grid
+
+
+def expand_template(template: str, grid: Dict[str, Sequence[str]]) -> List[SweepVariant]:
+    """
+    Expand a prompt template with ``{name}`` placeholders over every
+    combination of the grid's values, in grid order.
+    """
+    try:
+        placeholders = [(name, spec, conversion)
+                        for _, name, spec, conversion in string.Formatter().parse(template)
+                        if name is not None]
+    except ValueError as e:
+        raise ValueError(f"Invalid template: {e}") from None
+    # Positional, attribute, index and formatted fields would fail in format()
+    invalid = [f"{{{name}{'!' + conversion if conversion else ''}{':' + spec if spec else ''}}}"
+               for name, spec, conversion in placeholders
+               if not name.isidentifier() or spec or conversion]
+    if invalid:
+        raise ValueError("Template placeholders must be plain names like {spoiler}, got "
+                         + ", ".join(invalid))
+    fields = {name for name, _, _ in placeholders}
+    missing = sorted(fields - set(grid))
+    if missing:
+        raise ValueError(f"Template placeholders without values: {', '.join(missing)}")
+    unused = sorted(set(grid) - fields)
+    if unused:
+        raise ValueError(f"Parameters not used in the template: {', '.join(unused)}")
+
+    names = list(grid)
+    count = 1
+    for name in names:
+        count *= len(grid[name])
+    if count > MAX_SWEEP_VARIANTS:
+        raise ValueError(f"The grid expands to {count} variants (limit {MAX_SWEEP_VARIANTS})")
+
+    variants = []
+    for index, values in enumerate(itertools.product(*(grid[name] for name in names))):
+        parameters = dict(zip(names, values))
+        variants.append(SweepVariant(index, parameters, template.format(**parameters)))
+    return variants
+
+
+def _run_variant(generator, analyzer, variant: SweepVariant, seed: Optional[int],
+                 extraction_method: str, preview=None) -> SweepResult:
+    """Generate, extract and analyze one variant"""
+    with get_telemetry().span('sweep_variant', index=variant.index):
+        outcome = generate_and_analyze(generator, analyzer, variant.prompt, seed,
+                                       extraction_method, preview)
+    generation = outcome.generation
+    if not generation.ok:
+        return SweepResult(variant, error=outcome.error)
+    return SweepResult(variant, generation.image.resized(THUMBNAIL_SIZE), generation.filepath,
+                       outcome.analysis, outcome.error)
+
+
+def iter_sweep(variants: Sequence[SweepVariant], generator, analyzer, max_workers: int = 4,
+               seed: Optional[int] = None, extraction_method: str = 'canny',
+               initializer: Optional[Callable[[], None]] = None,
+               preview=None) -> Iterator[SweepResult]:
+    """
+    Generate and analyze every variant, yielding results in completion order.
+
+    Each variant occupies one worker from generation through analysis, so at
+    most ``max_workers`` variants (and Bedrock requests) are in flight. Closing
+    the iterator early cancels the variants that have not started. With
+    ``preview`` (PreviewOptions), each variant is the best of several small
+    candidates.
+    """
+    if not variants:
+        return
+    workers = max(1, min(max_workers, len(variants)))
+    executor = ThreadPoolExecutor(max_workers=workers, initializer=initializer)
+    try:
+        pending = {executor.submit(_run_variant, generator, analyzer, variant, seed,
+                                   extraction_method, preview)
+                   for variant in variants}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def rank_results(results: Sequence[SweepResult], by: str = 'cd') -> List[SweepResult]:
+    """
+    Order results best first: lowest ``by`` coefficient, ties broken by the
+    other one. Fallback estimates follow the real ones, and failures come last.
+    """
+    if by not in RANK_KEYS:
+        raise ValueError(f"Unknown ranking key: {by}")
+    other = 'cl' if by == 'cd' else 'cd'
+
+    def key(result: SweepResult):
+        if not result.ok:
+            return (2, 0.0, 0.0, result.variant.index)
+        fallback = result.analysis.get('source') == 'fallback'
+        return (int(fallback), result.analysis[by], result.analysis[other], result.variant.index)
+
+    return sorted(results, key=key)
+
+
+def sweep_table(results: Sequence[SweepResult], by: str = 'cd') -> List[Dict[str, Any]]:
+    """Ranked rows of parameters, coefficients and status for display or export"""
+    rows = []
+    for rank, result in enumerate(rank_results(results, by), 1):
+        row = {'rank': rank if result.ok else None, **result.variant.parameters}
+        row.update({
+            'cd': result.analysis.get('cd'),
+            'cl': result.analysis.get('cl'),
+            'source': result.analysis.get('source'),
+            'error': result.error,
+        })
+        rows.append(row)
+    return rows
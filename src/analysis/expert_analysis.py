@@ -1,11 +1,27 @@
-import json
 import streamlit as st
-from typing import Dict
+from typing import Dict, Iterable, Iterator, Sequence
 
-def get_expert_analysis(analyzer, family_analysis: dict, aero_analysis: dict) -> str:
-    """Get detailed comparative analysis from LLM"""
-    try:
-        system_prompt = """You are an expert automotive aerodynamicist with 20+ years of experience in vehicle design and wind tunnel testing. 
+from src.utils.bedrock import invoke_model_stream
+from src.utils.telemetry import get_telemetry
+
+def _format_percent(value) -> str:
+    return "-" if value is None else f"{value:+.1f}%"
+
+def format_coefficient_table(rows: Sequence[dict], baseline: str) -> str:
+    """Compact markdown table of the designs' coefficients for the expert prompt"""
+    lines = ["| Design | Cd | Cl | Cd vs baseline | Cl vs baseline |",
+             "|---|---|---|---|---|"]
+    for row in rows:
+        name = f"{row['design']} (baseline)" if row['design'] == baseline else row['design']
+        lines.append(f"| {name} | {row['cd']:.3f} | {row['cl']:.3f} | "
+                     f"{_format_percent(row['cd_delta_pct'])} | {_format_percent(row['cl_delta_pct'])} |")
+    return "\n".join(lines)
+
+def _build_expert_request(rows: Sequence[dict], baseline: str) -> dict:
+    """Build the Claude request body for the comparative expert analysis of all designs"""
+    # Designs that failed have no coefficients to discuss
+    rows = [row for row in rows if row['cd'] is not None]
+    system_prompt = """You are an expert automotive aerodynamicist with 20+ years of experience in vehicle design and wind tunnel testing. 
         Your expertise includes:
         - Computational Fluid Dynamics (CFD) analysis
         - Wind tunnel testing and validation
@@ -33,19 +49,14 @@ def get_expert_analysis(analyzer, family_analysis: dict, aero_analysis: dict) ->
         - Sports car Cd range: 0.28-0.34
         - Hypercar Cd range: 0.20-0.30"""
 
-        analysis_prompt = f"""Based on the provided coefficients and industry knowledge, analyze these two vehicles:
+    analysis_prompt = f"""Based on the provided coefficients and industry knowledge, analyze these {len(rows)} vehicle designs.
+        Percentages are changes relative to the baseline design, {baseline}.
 
-        Initial Vehicle:
-        - Drag coefficient (Cd): {family_analysis['cd']:.3f}
-        - Lift coefficient (Cl): {family_analysis['cl']:.3f}
-        
-        Aerodynamic Vehicle:
-        - Drag coefficient (Cd): {aero_analysis['cd']:.3f}
-        - Lift coefficient (Cl): {aero_analysis['cl']:.3f}
+        {format_coefficient_table(rows, baseline)}
         
         Please provide:
         1. Technical Analysis:
-           - Evaluate how each coefficient compares to industry standards
+           - Rank the designs and evaluate how their coefficients compare to industry standards
            - Identify likely flow characteristics based on the coefficients
            - Assess the relationship between drag and lift coefficients
         
@@ -55,7 +66,7 @@ def get_expert_analysis(analyzer, family_analysis: dict, aero_analysis: dict) ->
            - Evaluate potential fuel efficiency impact
         
         3. Design Assessment:
-           - Identify probable key design features contributing to these coefficients
+           - Identify probable key design features behind the differences from the baseline
            - Suggest specific areas for optimization
            - Analyze trade-offs between practicality and aerodynamic efficiency
         
@@ -63,27 +74,74 @@ def get_expert_analysis(analyzer, family_analysis: dict, aero_analysis: dict) ->
            - Propose specific design modifications with expected improvement percentages
            - Prioritize modifications based on cost-benefit analysis
            - Consider manufacturing and practical constraints"""
-        
-        response = analyzer.client.invoke_model(
-            modelId=analyzer.analysis_model_id,
-            body=json.dumps({
-                "prompt": f"\n\nHuman: {analysis_prompt}\n\nAssistant: I'll provide a detailed aerodynamic analysis based on my expertise and the given data.",
-                "max_tokens_to_sample": 2000,
-                "temperature": 0.3,  # Lower temperature for more focused responses
-                "anthropic_version": "bedrock-2023-05-31"
-            }),
-            contentType="application/json",
-            accept="application/json"
-        )
-        
-        response_body = json.loads(response['body'].read())
-        analysis = response_body.get('completion', '')
-        
-        return analysis
-        
+
+    return {
+        # Claude's text completion API takes the system prompt before the first turn
+        "prompt": f"{system_prompt}\n\nHuman: {analysis_prompt}\n\nAssistant: I'll provide a detailed aerodynamic analysis based on my expertise and the given data.",
+        "max_tokens_to_sample": 2000,
+        "temperature": 0.3,  # Lower temperature for more focused responses
+        "anthropic_version": "bedrock-2023-05-31"
+    }
+
+def stream_expert_analysis(analyzer, rows: Sequence[dict], baseline: str) -> Iterator[str]:
+    """
+    Yield the comparative analysis text incrementally as Claude generates it.
+
+    A cached completion is yielded in one piece; a freshly streamed one is
+    stored in the LLM cache once complete.
+    """
+    body = _build_expert_request(rows, baseline)
+    cache = analyzer.llm_cache
+    if cache is not None:
+        cached = cache.get(analyzer.analysis_model_id, body)
+        if cached is not None and cached.get('completion'):
+            yield cached['completion']
+            return
+
+    parts = []
+    try:
+        for chunk in invoke_model_stream(analyzer.client, analyzer.analysis_model_id, body):
+            text = chunk.get('completion', '')
+            if text:
+                parts.append(text)
+                yield text
     except Exception as e:
         st.error(f"Error generating expert analysis: {str(e)}")
-        return "Error generating comparative analysis."
+        get_telemetry().increment('fallbacks_total', stage='expert_analysis')
+        if not parts:
+            yield "Error generating comparative analysis."
+        return
+
+    if cache is not None and parts:
+        cache.put(analyzer.analysis_model_id, body, {'completion': ''.join(parts)})
+
+# Section headers requested in the expert prompt, in order, with display titles
+SECTION_HEADERS = [
+    ("1. Technical Analysis", "Technical Analysis"),
+    ("2. Performance Implications", "Performance Implications"),
+    ("3. Design Assessment", "Design Assessment"),
+    ("4. Recommendations", "Recommendations"),
+]
+
+def split_expert_sections(analysis: str) -> Dict[str, str]:
+    """
+    Split analysis text into sections by header.
+
+    Works on partial text: a section appears once its header has been seen, and
+    everything before the second header belongs to Technical Analysis.
+    """
+    positions = []
+    for header, title in SECTION_HEADERS[1:]:
+        index = analysis.find(header)
+        if index >= 0:
+            positions.append((index, header, title))
+    positions.sort()
+
+    sections = {SECTION_HEADERS[0][1]: analysis[:positions[0][0]] if positions else analysis}
+    for i, (index, header, title) in enumerate(positions):
+        end = positions[i + 1][0] if i + 1 < len(positions) else len(analysis)
+        sections[title] = analysis[index + len(header):end]
+    return sections
 
 def display_expert_analysis(analysis: str):
     """Format and display the expert analysis in a structured way"""
@@ -91,19 +149,25 @@ def display_expert_analysis(analysis: str):
     st.markdown("<h1 style='color: #FFA500;'>Expert Aerodynamic Analysis</h1>", unsafe_allow_html=True)
     
     # Create expandable sections for each analysis component
-    with st.expander("**Technical Analysis**", expanded=True):
-        st.markdown(analysis.split("2. Performance Implications")[0])
-    
-    with st.expander("**Performance Implications**"):
-        performance = analysis.split("2. Performance Implications")[1].split("3. Design Assessment")[0]
-        st.markdown(performance)
-    
-    with st.expander("**Design Assessment**"):
-        design = analysis.split("3. Design Assessment")[1].split("4. Recommendations")[0]
-        st.markdown(design)
-    
-    with st.expander("**Recommendations**"):
-        recommendations = analysis.split("4. Recommendations")[1]
-        st.markdown(recommendations)
+    sections = split_expert_sections(analysis)
+    for i, (_, title) in enumerate(SECTION_HEADERS):
+        with st.expander(f"**{title}**", expanded=(i == 0)):
+            st.markdown(sections.get(title, ""))
+
+def display_expert_analysis_stream(chunks: Iterable[str]) -> str:
+    """
+    Render streamed analysis text into per-section expanders as it arrives.
 
+    Returns the full text once the stream ends.
+    """
+    slots = {}
+    for _, title in SECTION_HEADERS:
+        with st.expander(f"**{title}**", expanded=True):
+            slots[title] = st.empty()
 
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        for title, content in split_expert_sections(text).items():
+            slots[title].markdown(content)
+    return text
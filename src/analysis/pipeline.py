@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.models.vehicle_generator import GenerationResult
+from src.utils.feature_extraction import VehicleExtraction, extract_vehicle_features, serializable_features
+
+NO_CONTOUR_ERROR = "extract: no vehicle contour found"
+
+
+@dataclass
+class DesignAnalysis:
+    """Generation, extraction and coefficients for one prompt; ``error`` is set instead of raising"""
+    generation: GenerationResult
+    extraction: Optional[VehicleExtraction] = None
+    analysis: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def analyze_extracted(analyzer, features: Dict[str, float], shape: Optional[List[float]] = None,
+                      store=None, content_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Estimate Cd/Cl from extracted features and record them against the stored
+    image (an ImageStore and its ``content_hash``) when given. Returns None
+    without analyzing when no vehicle contour was found, so all-zero features
+    never reach the surrogate, the design index or the LLM.
+    """
+    if not features:
+        return None
+    analysis = analyzer.analyze_features(features, shape)
+    if store is not None and content_hash:
+        store.record_analysis(content_hash, serializable_features(features), analysis)
+    return analysis
+
+
+def generate_and_analyze(generator, analyzer, prompt: str, seed: Optional[int] = None,
+                         extraction_method: str = 'canny', preview=None) -> DesignAnalysis:
+    """
+    Generate one design, extract its silhouette and estimate Cd/Cl, recording
+    the result in the image store. ``preview`` is a PreviewOptions.
+    """
+    generation = generator.generate_result(prompt, seed=seed, preview=preview)
+    if not generation.ok:
+        return DesignAnalysis(generation, error=f"generate: {generation.error}")
+
+    try:
+        extraction = extract_vehicle_features(generation.image, extraction_method)
+        analysis = analyze_extracted(analyzer, extraction.features, extraction.shape,
+                                     generator.store, generation.content_hash)
+    except Exception as e:
+        return DesignAnalysis(generation, error=f"analyze: {e}")
+    if analysis is None:
+        return DesignAnalysis(generation, extraction, error=NO_CONTOUR_ERROR)
+    return DesignAnalysis(generation, extraction, analysis)
@@ -0,0 +1,26 @@
+import os
+from typing import List
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+
+def list_images(directory: str, recursive: bool = False) -> List[str]:
+    """Return the image files in a directory, sorted for reproducible runs"""
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"Image directory not found: {directory}")
+
+    paths = []
+    if recursive:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in files)
+    else:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+    return sorted(path for path in paths
+                  if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def read_prompts(path: str) -> List[str]:
+    """Read one prompt per line, skipping blank lines and '#' comments"""
+    with open(path, encoding='utf-8') as handle:
+        return [line.strip() for line in handle
+                if line.strip() and not line.lstrip().startswith('#')]
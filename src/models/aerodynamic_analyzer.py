@@ -1,30 +1,85 @@
 # src/models/aerodynamic_analyzer.py
 
-import boto3
 import json
 import numpy as np
-import cv2
 import streamlit as st
 from PIL import Image
-from typing import Dict
+from typing import Dict, List, Optional, Union
+
+from src.models.design_index import get_design_index
+from src.models.surrogate import get_surrogate
+from src.utils.bedrock import get_bedrock_client, invoke_model
+from src.utils.feature_extraction import VehicleExtraction, extract_vehicle_features
+from src.utils.image_buffer import DecodedImage
+from src.utils.llm_cache import get_llm_cache
+from src.utils.telemetry import get_telemetry
 
 class AerodynamicAnalyzer:
-    def __init__(self):
-        """Initialize the Bedrock client for both image generation and analysis"""
-        self.client = boto3.client('bedrock-runtime', region_name='us-east-1')
+    def __init__(self, extraction_method: str = 'canny'):
+        """
+        Initialize the Bedrock client for both image generation and analysis.
+
+        ``extraction_method`` selects the silhouette extraction used when no
+        precomputed extraction is passed in ('canny' or 'segment').
+        """
+        self.client = get_bedrock_client()
         self.image_model_id = 'amazon.nova-canvas-v1:0'
         self.analysis_model_id = 'anthropic.claude-v2'  # Using Claude for analysis
+        self.llm_cache = get_llm_cache()
+        self.surrogate = get_surrogate()
+        self.design_index = get_design_index()
+        self.extraction_method = extraction_method
         
-    def analyze_aerodynamics(self, image: Image.Image) -> Dict[str, float]:
+    def analyze_aerodynamics(self, image: Union[DecodedImage, Image.Image],
+                             extraction: Optional[VehicleExtraction] = None) -> Dict[str, float]:
         """
         Analyze the aerodynamic characteristics of the vehicle using computer vision
         and LLM analysis.
+
+        Pass a precomputed ``extraction`` to skip the CV pipeline for this image.
         """
-        # Convert PIL Image to CV2 format
-        cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-        
         # Extract vehicle contours and features
-        features = self._extract_vehicle_features(cv_image)
+        if extraction is None:
+            extraction = extract_vehicle_features(image, self.extraction_method)
+        return self.analyze_features(extraction.features, extraction.shape)
+
+    def analyze_features(self, features: Dict[str, float],
+                         shape: Optional[List[float]] = None) -> Dict[str, float]:
+        """
+        Estimate aerodynamic coefficients from an already-extracted feature dict.
+
+        With a ``shape`` descriptor, a previously analysed design within the
+        design index tolerance is reused as is.
+        """
+        telemetry = get_telemetry()
+        with telemetry.span('analyze_features') as span:
+            coefficients = self._analyze_features(features, shape)
+            span.attributes['source'] = coefficients['source']
+        telemetry.increment('coefficients_total', source=coefficients['source'])
+        if coefficients['source'] == 'fallback':
+            telemetry.increment('fallbacks_total', stage='coefficients')
+        return coefficients
+
+    def _analyze_features(self, features: Dict[str, float],
+                          shape: Optional[List[float]]) -> Dict[str, float]:
+        # Fastest path: the same design (within tolerance) was analysed before
+        if self.design_index is not None:
+            match = self.design_index.match(features, shape)
+            if match is not None:
+                return dict(match.result, source='design_index', match_distance=match.distance)
+
+        # Fast path: answer locally when the surrogate is confident
+        if self.surrogate is not None:
+            prediction = self.surrogate.predict(features)
+            if prediction is not None and prediction.confident:
+                return {
+                    'cd': prediction.cd,
+                    'cl': prediction.cl,
+                    'justification': (f"Surrogate estimate from {prediction.neighbours} similar "
+                                      f"past designs (uncertainty ±{prediction.uncertainty:.3f} Cd)."),
+                    'source': 'surrogate',
+                    'uncertainty': prediction.uncertainty
+                }
         
         # Generate analysis prompt based on features
         analysis_prompt = self._generate_analysis_prompt(features)
@@ -32,62 +87,18 @@ class AerodynamicAnalyzer:
         # Get aerodynamic coefficients using Claude
         coefficients = self._get_coefficients_from_llm(analysis_prompt)
         
+        # Feed real LLM answers back into the surrogate and the design index
+        if coefficients['source'] == 'llm':
+            if self.surrogate is not None:
+                self.surrogate.add(features, coefficients['cd'], coefficients['cl'])
+            if self.design_index is not None:
+                self.design_index.add(features, shape, coefficients)
+        
         return coefficients
 
     def _extract_vehicle_features(self, image: np.ndarray) -> Dict[str, float]:
         """Extract key aerodynamic features from the vehicle image"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Edge detection
-        edges = cv2.Canny(gray, 100, 200)
-        
-        # Find contours
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Get the main vehicle contour (largest contour)
-        if contours:
-            main_contour = max(contours, key=cv2.contourArea)
-            
-            # Calculate features
-            features = {
-                'frontal_area': cv2.contourArea(main_contour),
-                'aspect_ratio': self._calculate_aspect_ratio(main_contour),
-                'curvature': self._calculate_curvature(main_contour),
-                'ground_clearance': self._estimate_ground_clearance(main_contour),
-                'nose_angle': self._calculate_nose_angle(main_contour)
-            }
-            
-            return features
-        return {}
-
-    def _calculate_aspect_ratio(self, contour: np.ndarray) -> float:
-        """Calculate the aspect ratio of the vehicle"""
-        x, y, w, h = cv2.boundingRect(contour)
-        return w / h if h != 0 else 0
-
-    def _calculate_curvature(self, contour: np.ndarray) -> float:
-        """Calculate the average curvature of the vehicle's surface"""
-        # Simplified curvature calculation
-        hull = cv2.convexHull(contour)
-        hull_area = cv2.contourArea(hull)
-        contour_area = cv2.contourArea(contour)
-        return hull_area / contour_area if contour_area != 0 else 1
-
-    def _estimate_ground_clearance(self, contour: np.ndarray) -> float:
-        """Estimate the ground clearance ratio"""
-        x, y, w, h = cv2.boundingRect(contour)
-        return y / h if h != 0 else 0
-
-    def _calculate_nose_angle(self, contour: np.ndarray) -> float:
-        """Calculate the approximate nose angle of the vehicle"""
-        # Simplified angle calculation using the first few points
-        if len(contour) > 10:
-            front_points = contour[:10]
-            vx, vy, x, y = cv2.fitLine(front_points, cv2.DIST_L2, 0, 0.01, 0.01)
-            angle = np.arctan2(vy, vx) * 180 / np.pi
-            return abs(angle)
-        return 0
+        return extract_vehicle_features(image, self.extraction_method).features
 
     def _generate_analysis_prompt(self, features: Dict[str, float]) -> str:
         """Generate a prompt for the LLM based on extracted features"""
@@ -113,47 +124,75 @@ class AerodynamicAnalyzer:
     def _get_coefficients_from_llm(self, prompt: str) -> Dict[str, float]:
         """Get aerodynamic coefficients using Claude"""
         try:
-            response = self.client.invoke_model(
-                modelId=self.analysis_model_id,
-                body=json.dumps({
+            response_body = invoke_model(
+                self.client,
+                self.analysis_model_id,
+                {
                     "prompt": f"\n\nHuman: {prompt}\n\nAssistant: Let me analyze these features and provide the aerodynamic coefficients in JSON format.",
                     "max_tokens_to_sample": 1000,
                     "temperature": 0.5,
                     "anthropic_version": "bedrock-2023-05-31"
-                }),
-                contentType="application/json",
-                accept="application/json"
+                },
+                cache=self.llm_cache,
+                cache_if=lambda body: _parse_coefficients(body.get('completion', '')) is not None
             )
         except Exception as e:
             st.error(f"Error invoking model: {str(e)}")
-            return {'cd': 0.30, 'cl': -0.15, 'justification': "Error invoking model"}
+            return {'cd': 0.30, 'cl': -0.15, 'justification': "Error invoking model", 'source': 'fallback'}
         
-        response_body = json.loads(response['body'].read())
         # Claude's response is in the 'completion' field
         response_text = response_body.get('completion', '')
         
         # Extract JSON from the response text
+        coefficients = _parse_coefficients(response_text)
+        if coefficients is None:
+            st.error("Error parsing response: no valid coefficient JSON found")
+            return {'cd': 0.30, 'cl': -0.15, 'justification': "Error parsing response", 'source': 'fallback'}
+        return coefficients
+
+def _extract_json_object(response_text: str) -> Optional[dict]:
+    """Return the outermost JSON object embedded in a completion, if any"""
+    # Find JSON-like content in the response
+    json_start = response_text.find('{')
+    json_end = response_text.rfind('}') + 1
+    if json_start >= 0 and json_end > json_start:
         try:
-            # Find JSON-like content in the response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                analysis = json.loads(json_str)
-            else:
-                raise ValueError("No JSON found in response")
-            
-            return {
-                'cd': float(analysis['cd']),
-                'cl': float(analysis['cl']),
-                'justification': analysis['justification']
-            }
-        except (json.JSONDecodeError, KeyError) as e:
-            st.error(f"Error parsing response: {str(e)}")
-            return {'cd': 0.30, 'cl': -0.15, 'justification': "Error parsing response"}
+            return json.loads(response_text[json_start:json_end])
+        except json.JSONDecodeError:
+            return None
+    return None
+
+def _parse_coefficients(response_text: str) -> Optional[Dict[str, float]]:
+    """Parse the cd/cl/justification JSON out of a completion"""
+    analysis = _extract_json_object(response_text)
+    try:
+        return {
+            'cd': float(analysis['cd']),
+            'cl': float(analysis['cl']),
+            'justification': analysis['justification'],
+            'source': 'llm'
+        }
+    except (TypeError, KeyError, ValueError):
+        return None
 
 def get_additional_kpis(analyzer: AerodynamicAnalyzer, analysis: dict, vehicle_type: str) -> dict[str, str]:
     """Calculate additional aerodynamic KPIs using LLM"""
+    telemetry = get_telemetry()
+    with telemetry.span('get_additional_kpis', vehicle_type=vehicle_type):
+        kpis = _get_additional_kpis(analyzer, analysis, vehicle_type)
+    if kpis is None:
+        telemetry.increment('fallbacks_total', stage='kpis')
+        return {
+            "Estimated Top Speed": "N/A",
+            "Fuel Efficiency Impact": "N/A",
+            "High-speed Stability": "N/A",
+            "Wind Noise Rating": "N/A",
+            "Aero Efficiency Ratio": "N/A"
+        }
+    return kpis
+
+def _get_additional_kpis(analyzer: AerodynamicAnalyzer, analysis: dict, vehicle_type: str) -> Optional[dict]:
+    """Ask Claude for the KPI JSON; None when the call or parsing fails"""
     try:
         prompt = f"""Based on the {vehicle_type} vehicle with:
         - Drag coefficient (Cd): {analysis['cd']}
@@ -167,35 +206,26 @@ def get_additional_kpis(analyzer: AerodynamicAnalyzer, analysis: dict, vehicle_t
         5. Aerodynamic efficiency ratio
         """
         
-        response = analyzer.client.invoke_model(
-            modelId=analyzer.analysis_model_id,
-            body=json.dumps({
+        response_body = invoke_model(
+            analyzer.client,
+            analyzer.analysis_model_id,
+            {
                 "prompt": f"\n\nHuman: {prompt}\n\nAssistant: Let me calculate these KPIs.",
                 "max_tokens_to_sample": 1000,
                 "temperature": 0.5,
                 "anthropic_version": "bedrock-2023-05-31"
-            }),
-            contentType="application/json",
-            accept="application/json"
+            },
+            cache=analyzer.llm_cache,
+            cache_if=lambda body: _extract_json_object(body.get('completion', '')) is not None
         )
-        
-        response_body = json.loads(response['body'].read())
         response_text = response_body.get('completion', '')
         
         # Extract JSON from response
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        if json_start >= 0 and json_end > json_start:
-            kpis = json.loads(response_text[json_start:json_end])
+        kpis = _extract_json_object(response_text)
+        if kpis is not None:
             return kpis
         
     except Exception as e:
         st.error(f"Error calculating KPIs: {str(e)}")
     
-    return {
-        "Estimated Top Speed": "N/A",
-        "Fuel Efficiency Impact": "N/A",
-        "High-speed Stability": "N/A",
-        "Wind Noise Rating": "N/A",
-        "Aero Efficiency Ratio": "N/A"
-    }
+    return None
@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.models.surrogate import FEATURE_KEYS, feature_vector
+
+DEFAULT_INDEX_PATH = os.path.join('.cache', 'design_index.sqlite')
+
+# Leading log-scaled Hu moments used as the shape descriptor; the higher
+# moments are dominated by pixel noise on near-identical silhouettes
+HU_MOMENTS = 4
+# Hu differences of this size count as much as one feature scale unit
+HU_SCALE = 0.05
+# Maximum distance (in scaled units) at which a stored design is reused: roughly
+# aspect ratio within 0.05, nose angle within 3 degrees and near-identical outlines
+DEFAULT_TOLERANCE = 0.1
+# Recent additions are scanned linearly until there are this many, then merged
+MERGE_THRESHOLD = 8192
+
+VECTOR_SIZE = len(FEATURE_KEYS) + HU_MOMENTS
+
+
+def design_vector(features: Dict[str, float], shape: Optional[Sequence[float]]) -> Optional[np.ndarray]:
+    """Scaled float32 features plus shape descriptor, or None when either is missing"""
+    vector = feature_vector(features)
+    if vector is None or shape is None or len(shape) < HU_MOMENTS:
+        return None
+    hu = np.asarray(shape[:HU_MOMENTS], dtype=float) / HU_SCALE
+    return np.concatenate([vector, hu]).astype(np.float32)
+
+
+@dataclass
+class DesignMatch:
+    """A stored analysis whose design lies within tolerance of the query"""
+    design_id: int
+    distance: float
+    result: Dict[str, Any]
+
+
+class DesignIndex:
+    """
+    Nearest-neighbour index of analysed designs, persisted in SQLite.
+
+    Vectors are held in memory as float32. For tolerance queries the main block
+    is kept sorted along its highest-variance axis, so only the slice within
+    ``tolerance`` on that axis is scanned; recent additions sit in a small
+    unsorted tail that is scanned in full and merged once it grows past
+    MERGE_THRESHOLD. Unbounded k-NN queries scan everything.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_INDEX_PATH,
+                 tolerance: float = DEFAULT_TOLERANCE):
+        self.path = path
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, VECTOR_SIZE), dtype=np.float32)
+        self._axis = 0
+        self._tail_ids: List[int] = []
+        self._tail_vectors: List[np.ndarray] = []
+        self._results: Dict[int, Dict[str, Any]] = {}
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS designs (
+                        id INTEGER PRIMARY KEY,
+                        vector BLOB NOT NULL,
+                        result TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )""")
+                rows = self._conn.execute("SELECT id, vector FROM designs").fetchall()
+            if rows:
+                ids = np.array([row[0] for row in rows], dtype=np.int64)
+                vectors = np.frombuffer(b''.join(row[1] for row in rows),
+                                        dtype=np.float32).reshape(-1, VECTOR_SIZE)
+                self._rebuild(ids, vectors)
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._tail_ids)
+
+    def _rebuild(self, ids: np.ndarray, vectors: np.ndarray):
+        """Re-sort everything along the current highest-variance axis"""
+        self._axis = int(np.argmax(vectors.var(axis=0))) if len(vectors) > 1 else 0
+        order = np.argsort(vectors[:, self._axis], kind='stable')
+        self._ids = ids[order]
+        self._vectors = np.ascontiguousarray(vectors[order])
+        self._tail_ids, self._tail_vectors = [], []
+
+    def add(self, features: Dict[str, float], shape: Optional[Sequence[float]],
+            result: Dict[str, Any]) -> Optional[int]:
+        """Store an analysis result for a design; returns its id, or None if it cannot be indexed"""
+        vector = design_vector(features, shape)
+        if vector is None:
+            return None
+        payload = json.dumps(result, default=str)
+        with self._lock:
+            if self._conn is not None:
+                with self._conn:
+                    design_id = self._conn.execute(
+                        "INSERT INTO designs (vector, result, created_at) VALUES (?, ?, ?)",
+                        (vector.tobytes(), payload, time.time())).lastrowid
+            else:
+                design_id = len(self) + 1
+                self._results[design_id] = json.loads(payload)
+            self._tail_ids.append(design_id)
+            self._tail_vectors.append(vector)
+            if len(self._tail_ids) >= MERGE_THRESHOLD:
+                self._rebuild(np.concatenate([self._ids, np.array(self._tail_ids, dtype=np.int64)]),
+                              np.vstack([self._vectors, np.array(self._tail_vectors)]))
+        return design_id
+
+    def query(self, vector: np.ndarray, k: int = 1,
+              max_distance: Optional[float] = None) -> List[Tuple[int, float]]:
+        """The ``k`` nearest (id, distance) pairs, optionally only those within ``max_distance``"""
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            ids, vectors, axis = self._ids, self._vectors, self._axis
+            tail_ids = np.array(self._tail_ids, dtype=np.int64)
+            tail_vectors = np.array(self._tail_vectors, dtype=np.float32).reshape(-1, VECTOR_SIZE)
+
+        if max_distance is not None and len(ids):
+            # Only points within max_distance along the sorted axis can qualify
+            lo, hi = np.searchsorted(vectors[:, axis],
+                                     [vector[axis] - max_distance, vector[axis] + max_distance])
+            ids, vectors = ids[lo:hi], vectors[lo:hi]
+
+        candidate_ids = np.concatenate([ids, tail_ids])
+        if not len(candidate_ids):
+            return []
+        diff = np.concatenate([vectors, tail_vectors]) - vector
+        distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+        if max_distance is not None:
+            keep = distances <= max_distance
+            candidate_ids, distances = candidate_ids[keep], distances[keep]
+        k = min(k, len(distances))
+        if k == 0:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [(int(candidate_ids[i]), float(distances[i])) for i in nearest]
+
+    def result(self, design_id: int) -> Optional[Dict[str, Any]]:
+        """Stored analysis result for a design id"""
+        if self._conn is None:
+            return self._results.get(design_id)
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM designs WHERE id = ?",
+                                     (design_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def match(self, features: Dict[str, float],
+              shape: Optional[Sequence[float]]) -> Optional[DesignMatch]:
+        """Closest stored design within ``tolerance``, if any"""
+        vector = design_vector(features, shape)
+        if vector is None:
+            return None
+        hits = self.query(vector, k=1, max_distance=self.tolerance)
+        if not hits:
+            return None
+        design_id, distance = hits[0]
+        result = self.result(design_id)
+        return DesignMatch(design_id, distance, result) if result is not None else None
+
+
+_default_index: Optional[DesignIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_design_index() -> Optional[DesignIndex]:
+    """
+    Return the process-wide design index.
+
+    Configured with VEH_AERO_DESIGN_INDEX_PATH and VEH_AERO_DESIGN_TOLERANCE;
+    set VEH_AERO_DESIGN_INDEX=0 to disable reuse.
+    """
+    global _default_index
+    if os.environ.get('VEH_AERO_DESIGN_INDEX', '1') == '0':
+        return None
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = DesignIndex(
+                path=os.environ.get('VEH_AERO_DESIGN_INDEX_PATH', DEFAULT_INDEX_PATH),
+                tolerance=float(os.environ.get('VEH_AERO_DESIGN_TOLERANCE', DEFAULT_TOLERANCE)))
+        return _default_index
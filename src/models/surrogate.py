@@ -0,0 +1,180 @@
+import atexit
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_SURROGATE_PATH = os.path.join('.cache', 'coefficient_surrogate.npz')
+# Answer locally only with this many known results and at most this uncertainty
+DEFAULT_MIN_SAMPLES = 10
+DEFAULT_MAX_UNCERTAINTY = 0.015
+
+# Features from extract_vehicle_features used by the surrogate, with rough scales
+# that bring them to comparable magnitudes before distances are taken
+FEATURE_KEYS = ('aspect_ratio', 'curvature', 'ground_clearance', 'nose_angle')
+FEATURE_SCALES = np.array([0.5, 0.2, 0.5, 30.0])
+
+# Rewriting the .npz is O(n), so new results are saved in batches: after this
+# many, or once the oldest unsaved one is this many seconds old
+SAVE_BATCH = 20
+SAVE_INTERVAL = 30.0
+
+
+def feature_vector(features: Dict[str, float]) -> Optional[np.ndarray]:
+    """Scaled feature vector for a feature dict, or None when features are missing"""
+    if not features or any(key not in features for key in FEATURE_KEYS):
+        return None
+    values = [float(np.asarray(features[key]).item()) for key in FEATURE_KEYS]
+    return np.array(values) / FEATURE_SCALES
+
+
+@dataclass
+class SurrogatePrediction:
+    """k-NN estimate; ``uncertainty`` is in coefficient units and covers both Cd and Cl"""
+    cd: float
+    cl: float
+    uncertainty: float
+    neighbours: int
+    confident: bool
+
+
+class CoefficientSurrogate:
+    """
+    Distance-weighted k-nearest-neighbour model of Cd/Cl over vehicle features.
+
+    Fitted incrementally from LLM or reference results and persisted as an
+    ``.npz`` file; added results are saved in batches (see SAVE_BATCH) and on
+    exit. The estimate is distance-weighted, but the uncertainty combines the
+    larger of the k neighbours' unweighted Cd and Cl spreads with their mean
+    distance, so a prediction is only confident when all k neighbours agree
+    on both coefficients and are close to the design.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_SURROGATE_PATH, k: int = 5,
+                 min_samples: int = DEFAULT_MIN_SAMPLES,
+                 max_uncertainty: float = DEFAULT_MAX_UNCERTAINTY,
+                 distance_penalty: float = 0.02):
+        self.path = path
+        self.k = k
+        self.min_samples = min_samples
+        self.max_uncertainty = max_uncertainty
+        self.distance_penalty = distance_penalty
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._X = np.empty((0, len(FEATURE_KEYS)))
+        self._Y = np.empty((0, 2))
+        self._unsaved = 0
+        self._unsaved_since = 0.0
+
+        if path and os.path.exists(path):
+            data = np.load(path)
+            self._X, self._Y = data['X'], data['Y']
+        if path:
+            atexit.register(self.flush)
+
+    def __len__(self) -> int:
+        return len(self._X)
+
+    def fit(self, X: np.ndarray, Y: np.ndarray):
+        """Replace the training set with scaled feature vectors X and (cd, cl) rows Y"""
+        with self._lock:
+            self._X = np.asarray(X, dtype=float).reshape(-1, len(FEATURE_KEYS))
+            self._Y = np.asarray(Y, dtype=float).reshape(-1, 2)
+        self.save()
+
+    def add(self, features: Dict[str, float], cd: float, cl: float, save: bool = True):
+        """
+        Record a known result; exact duplicates (e.g. replayed cache hits) are
+        ignored. With ``save``, the training set is written once a batch is due.
+        """
+        vector = feature_vector(features)
+        if vector is None:
+            return
+        row = np.array([cd, cl], dtype=float)
+        with self._lock:
+            duplicate = np.all(self._X == vector, axis=1) & np.all(self._Y == row, axis=1)
+            if duplicate.any():
+                return
+            self._X = np.vstack([self._X, vector])
+            self._Y = np.vstack([self._Y, row])
+            if not self._unsaved:
+                self._unsaved_since = time.monotonic()
+            self._unsaved += 1
+            due = (self._unsaved >= SAVE_BATCH
+                   or time.monotonic() - self._unsaved_since >= SAVE_INTERVAL)
+        if save and due:
+            self.save()
+
+    def predict(self, features: Dict[str, float]) -> Optional[SurrogatePrediction]:
+        """Estimate Cd/Cl for a feature dict, or None when there is nothing to go on"""
+        vector = feature_vector(features)
+        with self._lock:
+            X, Y = self._X, self._Y
+        if vector is None or len(X) == 0:
+            return None
+
+        distances = np.sqrt(((X - vector) ** 2).sum(axis=1))
+        k = min(self.k, len(X))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        d = distances[nearest]
+        weights = 1.0 / (d + 1e-6)
+        weights /= weights.sum()
+
+        cd, cl = weights @ Y[nearest]
+        # Unweighted, so one (near) exact match cannot vouch for itself: all k
+        # neighbours have to agree and be close
+        spread = Y[nearest].std(axis=0).max()
+        uncertainty = float(spread + self.distance_penalty * d.mean())
+        confident = (len(X) >= self.min_samples and k == self.k
+                     and uncertainty <= self.max_uncertainty)
+        return SurrogatePrediction(float(cd), float(cl), uncertainty, int(k), confident)
+
+    def save(self):
+        """Persist the training set, if a path is configured"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        # Concurrent saves would share the temporary file
+        with self._save_lock:
+            with self._lock:
+                X, Y = self._X, self._Y
+                self._unsaved = 0
+            tmp_path = f"{self.path}.tmp.npz"
+            np.savez(tmp_path, X=X, Y=Y)
+            os.replace(tmp_path, self.path)
+
+    def flush(self):
+        """Save results added since the last save"""
+        if self._unsaved:
+            self.save()
+
+
+_default_surrogate: Optional[CoefficientSurrogate] = None
+_default_surrogate_lock = threading.Lock()
+
+
+def get_surrogate() -> Optional[CoefficientSurrogate]:
+    """
+    Return the process-wide surrogate model.
+
+    Configured with VEH_AERO_SURROGATE_PATH, VEH_AERO_SURROGATE_MIN_SAMPLES and
+    VEH_AERO_SURROGATE_MAX_UNCERTAINTY; set VEH_AERO_SURROGATE=0 to always go
+    to the LLM.
+    """
+    global _default_surrogate
+    if os.environ.get('VEH_AERO_SURROGATE', '1') == '0':
+        return None
+    with _default_surrogate_lock:
+        if _default_surrogate is None:
+            _default_surrogate = CoefficientSurrogate(
+                path=os.environ.get('VEH_AERO_SURROGATE_PATH', DEFAULT_SURROGATE_PATH),
+                min_samples=int(os.environ.get('VEH_AERO_SURROGATE_MIN_SAMPLES',
+                                               DEFAULT_MIN_SAMPLES)),
+                max_uncertainty=float(os.environ.get('VEH_AERO_SURROGATE_MAX_UNCERTAINTY',
+                                                     DEFAULT_MAX_UNCERTAINTY)))
+        return _default_surrogate
@@ -1,59 +1,236 @@
-import boto3
 import json
 import base64
-import os
-from PIL import Image
-import io
-import uuid
+import hashlib
+import cv2
 import streamlit as st
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from src.output.image_store import StoredImage, get_image_store
+from src.utils.image_buffer import DecodedImage
+from src.utils.bedrock import get_bedrock_client, invoke_model
+from src.utils.silhouette import SilhouetteScore, score_silhouette
+from src.utils.telemetry import get_telemetry
+
+DEFAULT_NEGATIVE_PROMPT = "low quality, blurry, bad anatomy"
+
+# Full renders are analyzed at this size; previews are brought up to it
+FULL_SIZE = 1024
+PREVIEW_SIZE = 512
+# Nova Canvas returns at most five images per request
+MAX_PREVIEW_CANDIDATES = 5
+# How closely a refined render follows the preview it was made from (0.2 - 1.0)
+REFINE_SIMILARITY = 0.9
+
+
+@dataclass(frozen=True)
+class PreviewOptions:
+    """
+    Generate ``candidates`` renders of ``size`` pixels in one request and
+    keep the one with the best silhouette. The winner is enlarged to
+    FULL_SIZE locally, or re-rendered at FULL_SIZE from the preview when
+    ``refine`` is set (one more Nova Canvas call).
+    """
+    candidates: int = 3
+    size: int = PREVIEW_SIZE
+    refine: bool = False
+
+    def __post_init__(self):
+        if not 1 <= self.candidates <= MAX_PREVIEW_CANDIDATES:
+            raise ValueError(f"Preview candidates must be between 1 and {MAX_PREVIEW_CANDIDATES}")
+        # Nova Canvas sizes are multiples of 16 from 320 pixels
+        if self.size % 16 or not 320 <= self.size <= FULL_SIZE:
+            raise ValueError(f"Preview size must be a multiple of 16 from 320 to {FULL_SIZE}")
+
+
+@dataclass
+class GenerationResult:
+    """Outcome of generating one prompt; ``error`` is set instead of raising"""
+    prompt: str
+    image: Optional[DecodedImage] = None
+    filepath: Optional[str] = None
+    error: Optional[str] = None
+    content_hash: Optional[str] = None
+    # Silhouette score of the chosen candidate, for previews
+    score: Optional[SilhouetteScore] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 
 class VehicleImageGenerator:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         """Initialize the Bedrock client"""
-        self.client = boto3.client('bedrock-runtime', region_name='us-east-1')
+        self.client = get_bedrock_client()
         self.model_id = 'amazon.nova-canvas-v1:0'
-        
-        self.output_dir = 'generated_vehicles'
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        self.use_cache = use_cache
 
-    def generate_image(self, prompt: str, negative_prompt: str = "low quality, blurry, bad anatomy"):
-        """Generate vehicle image using Nova Canvas"""
-        try:
-            body = json.dumps({
-                "taskType": "TEXT_IMAGE",
-                "textToImageParams": {
-                    "text": prompt,
-                    "negativeText": negative_prompt
-                },
-                "imageGenerationConfig": {
-                    "numberOfImages": 1,
-                    "quality": "standard",
-                    "height": 1024,
-                    "width": 1024,
-                    "cfgScale": 8.0
-                }
-            })
-
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                body=body,
-                contentType="application/json",
-                accept="application/json"
-            )
-
-            response_body = json.loads(response.get("body").read())
+        # Content-addressed, written in the background; see ImageStore
+        self.store = get_image_store()
+        self.output_dir = self.store.root
+
+    def _generation_config(self, seed: Optional[int], size: int = FULL_SIZE, count: int = 1) -> dict:
+        """Nova Canvas image generation config, adding a seed when one is given"""
+        config = {
+            "numberOfImages": count,
+            "quality": "standard",
+            "height": size,
+            "width": size,
+            "cfgScale": 8.0
+        }
+        if seed is not None:
+            config["seed"] = int(seed)
+        return config
+
+    def _build_request(self, prompt: str, negative_prompt: str, seed: Optional[int],
+                       size: int = FULL_SIZE, count: int = 1) -> dict:
+        """Build the Nova Canvas text-to-image request body"""
+        return {
+            "taskType": "TEXT_IMAGE",
+            "textToImageParams": {
+                "text": prompt,
+                "negativeText": negative_prompt
+            },
+            "imageGenerationConfig": self._generation_config(seed, size, count)
+        }
+
+    def _build_refine_request(self, prompt: str, negative_prompt: str, seed: Optional[int],
+                              source: str) -> dict:
+        """Image variation request re-rendering the ``source`` image (base64 PNG) at FULL_SIZE"""
+        return {
+            "taskType": "IMAGE_VARIATION",
+            "imageVariationParams": {
+                "text": prompt,
+                "negativeText": negative_prompt,
+                "images": [source],
+                "similarityStrength": REFINE_SIMILARITY
+            },
+            "imageGenerationConfig": self._generation_config(seed)
+        }
+
+    def _request_key(self, request: dict) -> str:
+        """Stable key for a request: model, prompt, generation config and seed"""
+        canonical = json.dumps({"model": self.model_id, "request": request}, sort_keys=True)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _find_stored(self, request_key: str, seed: Optional[int], span) -> Optional[StoredImage]:
+        """
+        Image stored by an earlier run of the same request, or None. Only
+        seeded requests are repeatable; without a seed every call is a new
+        variation, so nothing is reused.
+        """
+        if not self.use_cache or seed is None:
+            return None
+        stored = self.store.find(request_key)
+        if stored is not None:
+            span.attributes['cached'] = True
+            get_telemetry().increment('cache_hits_total', cache='generated_image')
+        return stored
+
+    def _generate(self, prompt: str, negative_prompt: str, seed: Optional[int] = None) -> StoredImage:
+        """Call Nova Canvas for one prompt and queue the result for storage, raising on failure"""
+        telemetry = get_telemetry()
+        request = self._build_request(prompt, negative_prompt, seed)
+        request_key = self._request_key(request)
+
+        with telemetry.span('generate_image', model=self.model_id) as span:
+            # Same prompt, config and seed: reuse the image stored by an earlier run
+            stored = self._find_stored(request_key, seed, span)
+            if stored is not None:
+                return stored
+
+            response_body = invoke_model(self.client, self.model_id, request)
             base64_image = response_body.get("images")[0]
-            
+
             image_bytes = base64.b64decode(base64_image)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            filename = f"vehicle_{uuid.uuid4().hex[:8]}.png"
-            filepath = os.path.join(self.output_dir, filename)
-            image.save(filepath)
-            
-            return image, filepath
-            
+            span.attributes['image_bytes'] = len(image_bytes)
+
+            # Encoding and the disk write happen on the store's writer thread
+            return self.store.put(image_bytes, request_key, self.model_id, request)
+
+    def _refine(self, prompt: str, negative_prompt: str, seed: Optional[int],
+                preview: StoredImage) -> StoredImage:
+        """Re-render a preview at FULL_SIZE with Nova Canvas, raising on failure"""
+        telemetry = get_telemetry()
+        # Keyed (and recorded) by the preview's hash instead of its base64 bytes
+        manifest_request = self._build_refine_request(prompt, negative_prompt, seed,
+                                                      preview.content_hash)
+        request_key = self._request_key(manifest_request)
+
+        with telemetry.span('refine_preview', model=self.model_id) as span:
+            stored = self._find_stored(request_key, seed, span)
+            if stored is not None:
+                return stored
+
+            ok, png = cv2.imencode('.png', preview.image.bgr)
+            if not ok:
+                raise ValueError("Could not encode the preview image")
+            request = self._build_refine_request(prompt, negative_prompt, seed,
+                                                 base64.b64encode(png.tobytes()).decode('ascii'))
+            response_body = invoke_model(self.client, self.model_id, request)
+            image_bytes = base64.b64decode(response_body.get("images")[0])
+            span.attributes['image_bytes'] = len(image_bytes)
+            return self.store.put(image_bytes, request_key, self.model_id, manifest_request)
+
+    def _generate_preview(self, prompt: str, negative_prompt: str, seed: Optional[int],
+                          preview: PreviewOptions) -> Tuple[StoredImage, DecodedImage, SilhouetteScore]:
+        """
+        Request ``preview.candidates`` small renders in one call and keep the
+        best silhouette. Only the winner is stored. Returns it with the image
+        to analyze (at FULL_SIZE) and its score; raises on failure.
+        """
+        telemetry = get_telemetry()
+        request = self._build_request(prompt, negative_prompt, seed, preview.size, preview.candidates)
+        request_key = self._request_key(request)
+
+        with telemetry.span('generate_preview', model=self.model_id,
+                            candidates=preview.candidates) as span:
+            stored = self._find_stored(request_key, seed, span)
+            if stored is not None:
+                score = score_silhouette(stored.image)
+            else:
+                response_body = invoke_model(self.client, self.model_id, request)
+                candidates = [base64.b64decode(image) for image in response_body.get("images")]
+                if not candidates:
+                    raise ValueError("Nova Canvas returned no images")
+                scores = [score_silhouette(DecodedImage.from_bytes(data)) for data in candidates]
+                best = max(range(len(candidates)), key=lambda index: scores[index].total)
+                score = scores[best]
+                telemetry.increment('preview_candidates_total', len(candidates))
+                span.attributes['scores'] = [round(s.total, 3) for s in scores]
+                stored = self.store.put(candidates[best], request_key, self.model_id, request)
+            span.attributes['score'] = round(score.total, 3)
+
+        if preview.refine:
+            stored = self._refine(prompt, negative_prompt, seed, stored)
+            return stored, stored.image, score
+        return stored, stored.image.resized(FULL_SIZE, upscale=True), score
+
+    def generate_image(self, prompt: str, negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
+                       seed: Optional[int] = None, preview: Optional[PreviewOptions] = None):
+        """Generate vehicle image using Nova Canvas; returns (DecodedImage, path)"""
+        result = self.generate_result(prompt, negative_prompt, seed, preview)
+        if not result.ok:
+            st.error(f"Error generating image: {result.error}")
+            return None, None
+        return result.image, result.filepath
+
+    def generate_result(self, prompt: str, negative_prompt: str = DEFAULT_NEGATIVE_PROMPT,
+                        seed: Optional[int] = None,
+                        preview: Optional[PreviewOptions] = None) -> GenerationResult:
+        """
+        Generate one image, capturing any failure as a value instead of st.error.
+        With ``preview``, the best of several small candidates is returned (see
+        PreviewOptions); ``filepath`` and ``content_hash`` are the stored winner's.
+        """
+        try:
+            if preview is None:
+                stored = self._generate(prompt, negative_prompt, seed)
+                return GenerationResult(prompt, stored.image, stored.path,
+                                        content_hash=stored.content_hash)
+            stored, image, score = self._generate_preview(prompt, negative_prompt, seed, preview)
+            return GenerationResult(prompt, image, stored.path, content_hash=stored.content_hash,
+                                    score=score)
         except Exception as e:
-            st.error(f"Error generating image: {str(e)}")
-            return None, None
\ No newline at end of file
+            return GenerationResult(prompt, error=str(e))
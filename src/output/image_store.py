@@ -0,0 +1,334 @@
+import atexit
+import io
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from src.utils.image_buffer import DecodedImage, encoded_hash
+from src.utils.telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = 'generated_vehicles'
+MANIFEST_NAME = 'manifest.sqlite'
+
+# 'webp' re-encodes to lossless WebP (smaller, at some CPU cost on the writer
+# thread), 'png' re-encodes PNG, 'original' keeps the bytes Bedrock returned
+IMAGE_FORMATS = ('original', 'webp', 'png')
+DEFAULT_IMAGE_FORMAT = 'webp'
+# File extensions of 'original' images by their leading bytes
+_SIGNATURES = ((b'\x89PNG', 'png'), (b'\xff\xd8\xff', 'jpg'), (b'RIFF', 'webp'))
+# Lossless WebP effort: method 2 is ~8% smaller than default PNG at a similar cost
+WEBP_METHOD = 2
+WEBP_EFFORT = 20
+PNG_COMPRESS_LEVEL = 6
+
+_UNLIMITED = 2 ** 62
+
+
+@dataclass
+class StoredImage:
+    """Manifest entry for one stored image"""
+    content_hash: str
+    path: str
+    width: int
+    height: int
+    image: Optional[DecodedImage] = None
+
+
+def content_hash(data: bytes) -> str:
+    """Content address of an encoded image"""
+    return encoded_hash(data)
+
+
+class ImageStore:
+    """
+    Content-addressed store for generated images with a SQLite manifest.
+
+    ``put`` returns immediately: encoding and the disk write happen on a
+    background writer thread, and until then lookups are served from memory.
+    Identical images are stored once. The manifest links each image to the
+    requests (prompt, negative prompt, generation config) that produced it,
+    and to the features and analysis recorded for it. Files are sharded by
+    the first two hash characters so directories stay small.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, image_format: str = DEFAULT_IMAGE_FORMAT):
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.root = root
+        self.image_format = image_format
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, StoredImage] = {}
+        self._pending_requests: Dict[str, str] = {}
+        self._written: Dict[str, threading.Event] = {}
+        self._pending_jobs: Dict[str, int] = {}
+        self._queue: "queue.Queue" = queue.Queue()
+
+        self._conn = sqlite3.connect(os.path.join(root, MANIFEST_NAME), timeout=30,
+                                     check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS images (
+                    content_hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    features TEXT,
+                    analysis TEXT
+                )""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS requests (
+                    request_key TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    model_id TEXT,
+                    prompt TEXT,
+                    negative_prompt TEXT,
+                    config TEXT,
+                    created_at REAL NOT NULL
+                )""")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS images_last_access ON images (last_access)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS requests_content_hash ON requests (content_hash)")
+
+        self._writer = threading.Thread(target=self._write_loop, name='image-store-writer',
+                                        daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _path(self, digest: str, data: bytes) -> str:
+        extension = self.image_format
+        if extension == 'original':
+            extension = next((ext for magic, ext in _SIGNATURES if data.startswith(magic)), 'png')
+        return os.path.join(self.root, digest[:2], f"{digest}.{extension}")
+
+    def put(self, data: bytes, request_key: Optional[str] = None, model_id: Optional[str] = None,
+            request: Optional[Dict[str, Any]] = None) -> StoredImage:
+        """
+        Add an encoded image (e.g. the PNG Bedrock returned) and the request
+        that produced it. Returns at once with the decoded image; the file
+        appears at ``path`` once the writer thread has stored it.
+        """
+        digest = content_hash(data)
+        image = DecodedImage.from_bytes(data, digest)
+        stored = StoredImage(digest, self._path(digest, data), image.width, image.height, image)
+
+        with self._lock:
+            if digest not in self._pending:
+                self._pending[digest] = stored
+                self._written[digest] = threading.Event()
+            # Queued jobs for this hash; it is served from memory until all are done
+            self._pending_jobs[digest] = self._pending_jobs.get(digest, 0) + 1
+            if request_key:
+                self._pending_requests[request_key] = digest
+        self._queue.put(('image', stored, data, request_key, model_id, request))
+        return stored
+
+    def record_analysis(self, digest: str, features: Optional[Dict[str, Any]] = None,
+                        analysis: Optional[Dict[str, Any]] = None):
+        """Attach extracted features and the coefficient analysis to a stored image"""
+        self._queue.put(('analysis', digest, features, analysis))
+
+    def find(self, request_key: str, load: bool = True) -> Optional[StoredImage]:
+        """Image previously stored for a request, or None; ``load`` decodes it"""
+        with self._lock:
+            digest = self._pending_requests.get(request_key)
+            if digest is not None and digest in self._pending:
+                return self._pending[digest]
+            row = self._conn.execute(
+                "SELECT i.content_hash, i.path, i.width, i.height FROM requests r "
+                "JOIN images i ON i.content_hash = r.content_hash WHERE r.request_key = ?",
+                (request_key,)).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE images SET last_access = ? WHERE content_hash = ?",
+                                   (time.time(), row[0]))
+
+        stored = StoredImage(*row)
+        if not os.path.exists(stored.path):
+            return None
+        if load:
+            stored.image = DecodedImage.from_file(stored.path, stored.content_hash)
+        return stored
+
+    def wait(self, digest: str, timeout: Optional[float] = None) -> bool:
+        """Block until the image with this hash is on disk; False on timeout"""
+        with self._lock:
+            event = self._written.get(digest)
+        return event.wait(timeout) if event is not None else True
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every queued write has finished"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+    def _write_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job[0] == 'image':
+                    self._write_image(*job[1:])
+                else:
+                    self._write_analysis(*job[1:])
+            except Exception:
+                # Never let one bad write stop the writer thread
+                logger.exception("Image store %s write failed", job[0])
+                get_telemetry().increment('image_store_write_failures_total', job=job[0])
+            finally:
+                self._queue.task_done()
+
+    def _encode(self, stored: StoredImage, data: bytes) -> bytes:
+        if self.image_format == 'original':
+            return data
+        buf = io.BytesIO()
+        image = stored.image.to_pil()
+        if self.image_format == 'webp':
+            image.save(buf, format='WEBP', lossless=True, method=WEBP_METHOD, quality=WEBP_EFFORT)
+        else:
+            image.save(buf, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+        return buf.getvalue()
+
+    def _write_image(self, stored: StoredImage, data: bytes, request_key: Optional[str],
+                     model_id: Optional[str], request: Optional[Dict[str, Any]]):
+        try:
+            self._store_image(stored, data, request_key, model_id, request)
+        finally:
+            # Release waiters even when the write failed, so nobody blocks forever
+            with self._lock:
+                event = self._written.get(stored.content_hash)
+                if request_key and self._pending_requests.get(request_key) == stored.content_hash:
+                    del self._pending_requests[request_key]
+                self._pending_jobs[stored.content_hash] -= 1
+                if not self._pending_jobs[stored.content_hash]:
+                    del self._pending_jobs[stored.content_hash]
+                    self._pending.pop(stored.content_hash, None)
+                    self._written.pop(stored.content_hash, None)
+            if event is not None:
+                event.set()
+
+    def _store_image(self, stored: StoredImage, data: bytes, request_key: Optional[str],
+                     model_id: Optional[str], request: Optional[Dict[str, Any]]):
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM images WHERE content_hash = ?",
+                                        (stored.content_hash,)).fetchone() is not None
+
+        # Duplicate content: only the request mapping is new
+        if not (exists and os.path.exists(stored.path)):
+            encoded = self._encode(stored, data)
+            os.makedirs(os.path.dirname(stored.path), exist_ok=True)
+            # Write to a temporary name first so readers never see a partial file
+            tmp_path = f"{stored.path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, stored.path)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO images (content_hash, path, format, size, width, height, "
+                    "created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (stored.content_hash, stored.path, self.image_format, len(encoded),
+                     stored.width, stored.height, now, now))
+
+        if request_key:
+            request = request or {}
+            params = request.get('textToImageParams') or request.get('imageVariationParams', {})
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO requests VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (request_key, stored.content_hash, model_id, params.get('text'),
+                     params.get('negativeText'),
+                     json.dumps(request.get('imageGenerationConfig')), now))
+
+    def _write_analysis(self, digest: str, features: Optional[Dict[str, Any]],
+                        analysis: Optional[Dict[str, Any]]):
+        with self._lock, self._conn:
+            if features is not None:
+                self._conn.execute("UPDATE images SET features = ? WHERE content_hash = ?",
+                                   (json.dumps(features, default=float), digest))
+            if analysis is not None:
+                self._conn.execute("UPDATE images SET analysis = ? WHERE content_hash = ?",
+                                   (json.dumps(analysis, default=str), digest))
+
+    def cleanup(self, max_age_seconds: Optional[float] = None, max_bytes: Optional[int] = None,
+                max_images: Optional[int] = None) -> int:
+        """
+        Delete images not accessed within ``max_age_seconds``, then the least
+        recently used ones until the store fits ``max_bytes`` and ``max_images``.
+        Returns the number of images removed.
+        """
+        self.flush()
+        with self._lock:
+            doomed = []
+            if max_age_seconds is not None:
+                doomed += self._conn.execute(
+                    "SELECT content_hash, path FROM images WHERE last_access < ?",
+                    (time.time() - max_age_seconds,)).fetchall()
+            if max_bytes is not None or max_images is not None:
+                # Running totals from the most recently used image down
+                doomed += self._conn.execute(
+                    "SELECT content_hash, path FROM ("
+                    "  SELECT content_hash, path, "
+                    "         SUM(size) OVER (ORDER BY last_access DESC, content_hash) AS total, "
+                    "         ROW_NUMBER() OVER (ORDER BY last_access DESC, content_hash) AS rank "
+                    "  FROM images) WHERE total > ? OR rank > ?",
+                    (max_bytes if max_bytes is not None else _UNLIMITED,
+                     max_images if max_images is not None else _UNLIMITED)).fetchall()
+            doomed = list(dict(doomed).items())
+            with self._conn:
+                self._conn.executemany("DELETE FROM images WHERE content_hash = ?",
+                                       [(digest,) for digest, _ in doomed])
+                self._conn.executemany("DELETE FROM requests WHERE content_hash = ?",
+                                       [(digest,) for digest, _ in doomed])
+
+        for _, path in doomed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return len(doomed)
+
+    def stats(self) -> Dict[str, int]:
+        """Stored image count and bytes, plus writes still queued"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images").fetchone()
+        return {'images': count, 'bytes': total, 'pending': self._queue.unfinished_tasks}
+
+
+_default_store: Optional[ImageStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    """
+    Return the process-wide image store.
+
+    Configured with VEH_AERO_IMAGE_STORE_DIR and VEH_AERO_IMAGE_FORMAT
+    (webp, the default, png or original).
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ImageStore(
+                root=os.environ.get('VEH_AERO_IMAGE_STORE_DIR', DEFAULT_STORE_DIR),
+                image_format=os.environ.get('VEH_AERO_IMAGE_FORMAT', DEFAULT_IMAGE_FORMAT))
+        return _default_store
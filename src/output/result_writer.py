@@ -0,0 +1,54 @@
+import csv
+import json
+import os
+from typing import Any, Dict, Optional
+
+# Column order for CSV output; JSONL rows may carry extra keys
+CSV_FIELDS = [
+    'item', 'image_path', 'cd', 'cl', 'coefficient_source', 'uncertainty', 'match_distance',
+    'frontal_area', 'aspect_ratio', 'curvature', 'ground_clearance', 'nose_angle',
+    'justification', 'error'
+]
+
+
+class ResultWriter:
+    """
+    Stream result rows to a JSONL or CSV file, flushing after every row so
+    partial runs are usable. The format follows the file extension unless
+    given explicitly.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path = path
+        self.format = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if self.format not in ('csv', 'jsonl'):
+            raise ValueError(f"Unsupported output format: {self.format}")
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._handle = open(path, 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if self.format == 'csv':
+            self._csv = csv.DictWriter(self._handle, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            self._csv.writeheader()
+        self.rows = 0
+
+    def write(self, row: Dict[str, Any]):
+        """Append one result row"""
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            self._handle.write(json.dumps(row, default=str) + '\n')
+        self._handle.flush()
+        self.rows += 1
+
+    def close(self):
+        self._handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import boto3
+from botocore.config import Config
+
+from src.utils.llm_cache import LLMCache
+from src.utils.rate_limiter import Lease, get_rate_limiter
+from src.utils.telemetry import get_telemetry
+
+
+DEFAULT_REGION = 'us-east-1'
+# Sized for several sessions, each with a handful of concurrent calls
+DEFAULT_POOL_SIZE = 50
+DEFAULT_CONNECT_TIMEOUT = 5
+# Nova Canvas and long Claude completions can take well over botocore's 60 s default
+DEFAULT_READ_TIMEOUT = 180
+# Including the first attempt
+DEFAULT_MAX_ATTEMPTS = 6
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def create_bedrock_client(region: Optional[str] = None, endpoint_url: Optional[str] = None,
+                          pool_size: Optional[int] = None, connect_timeout: Optional[float] = None,
+                          read_timeout: Optional[float] = None, max_attempts: Optional[int] = None):
+    """
+    Build a ``bedrock-runtime`` client with a sized connection pool, explicit
+    timeouts and adaptive retries.
+
+    Unset arguments come from the environment: VEH_AERO_BEDROCK_REGION,
+    VEH_AERO_BEDROCK_ENDPOINT_URL (e.g. a local stand-in for testing),
+    VEH_AERO_BEDROCK_POOL_SIZE, VEH_AERO_BEDROCK_CONNECT_TIMEOUT,
+    VEH_AERO_BEDROCK_READ_TIMEOUT and VEH_AERO_BEDROCK_MAX_ATTEMPTS.
+    """
+    env = os.environ.get
+    config = Config(
+        max_pool_connections=int(pool_size or env('VEH_AERO_BEDROCK_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        connect_timeout=float(connect_timeout or env('VEH_AERO_BEDROCK_CONNECT_TIMEOUT',
+                                                     DEFAULT_CONNECT_TIMEOUT)),
+        read_timeout=float(read_timeout or env('VEH_AERO_BEDROCK_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)),
+        # Adaptive mode adds client-side rate limiting on throttling errors, which
+        # works best when every caller in the process shares one client
+        retries={
+            'mode': 'adaptive',
+            'total_max_attempts': int(max_attempts or env('VEH_AERO_BEDROCK_MAX_ATTEMPTS',
+                                                          DEFAULT_MAX_ATTEMPTS))
+        },
+        tcp_keepalive=True
+    )
+    return boto3.client(
+        'bedrock-runtime',
+        region_name=region or env('VEH_AERO_BEDROCK_REGION', DEFAULT_REGION),
+        endpoint_url=endpoint_url or env('VEH_AERO_BEDROCK_ENDPOINT_URL') or None,
+        config=config
+    )
+
+
+def get_bedrock_client():
+    """Return the process-wide ``bedrock-runtime`` client (boto3 clients are thread safe)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_bedrock_client()
+        return _client
+
+
+def _token_counts(response: Dict[str, Any]):
+    """Input/output token counts from the Bedrock response headers, when present"""
+    headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    counts = []
+    for header in ('x-amzn-bedrock-input-token-count', 'x-amzn-bedrock-output-token-count'):
+        value = headers.get(header)
+        counts.append(int(value) if value is not None else None)
+    return counts
+
+
+@contextmanager
+def _rate_limited(model_id: str) -> Iterator[Optional[Lease]]:
+    """Hold a rate limiter slot for ``model_id`` (yields None when limiting is disabled)"""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        yield None
+        return
+    with limiter.slot(model_id) as lease:
+        yield lease
+
+
+def _call(lease: Optional[Lease], function: Callable[[], Any]) -> Any:
+    """Make a Bedrock call; within a rate limiter slot, a throttled call is retried once"""
+    return function() if lease is None else lease.call(function)
+
+
+def invoke_model(client, model_id: str, body: Dict[str, Any],
+                 cache: Optional[LLMCache] = None,
+                 cache_if: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Dict[str, Any]:
+    """
+    Call Bedrock ``invoke_model`` with a JSON body and return the parsed response body.
+
+    Calls that reach Bedrock wait for a slot from the per-model rate limiter,
+    and a throttled call is retried once in that slot. When a cache is given it is consulted first, and successful responses are
+    stored in it. ``cache_if`` can reject responses that should not be reused,
+    e.g. completions that fail to parse.
+    """
+    telemetry = get_telemetry()
+    if cache is not None:
+        cached = cache.get(model_id, body)
+        if cached is not None:
+            telemetry.record_bedrock(model_id, cached=True)
+            telemetry.increment('cache_hits_total', cache='llm')
+            return cached
+
+    request = json.dumps(body)
+    with _rate_limited(model_id) as lease, \
+            telemetry.span('bedrock.invoke_model', model=model_id) as span:
+        response = _call(lease, lambda: client.invoke_model(
+            modelId=model_id,
+            body=request,
+            contentType="application/json",
+            accept="application/json"
+        ))
+        raw = response['body'].read()
+        input_tokens, output_tokens = _token_counts(response)
+        span.attributes.update(request_bytes=len(request), response_bytes=len(raw),
+                               input_tokens=input_tokens, output_tokens=output_tokens)
+        if lease is not None:
+            span.attributes['queued_s'] = lease.queued_s
+    telemetry.record_bedrock(model_id, len(request), len(raw), input_tokens, output_tokens)
+    response_body = json.loads(raw)
+
+    if cache is not None and (cache_if is None or cache_if(response_body)):
+        cache.put(model_id, body, response_body)
+    return response_body
+
+
+def invoke_model_stream(client, model_id: str, body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Call Bedrock ``invoke_model_with_response_stream`` and yield each parsed
+    chunk payload as it arrives.
+    """
+    telemetry = get_telemetry()
+    request = json.dumps(body)
+    response_bytes = 0
+    input_tokens = output_tokens = None
+    # The slot is held until the stream is fully read (or abandoned)
+    with _rate_limited(model_id) as lease, \
+            telemetry.span('bedrock.invoke_model_stream', model=model_id) as span:
+        response = _call(lease, lambda: client.invoke_model_with_response_stream(
+            modelId=model_id,
+            body=request,
+            contentType="application/json",
+            accept="application/json"
+        ))
+        if lease is not None:
+            span.attributes['queued_s'] = lease.queued_s
+        for event in response['body']:
+            chunk = event.get('chunk')
+            if chunk:
+                response_bytes += len(chunk['bytes'])
+                payload = json.loads(chunk['bytes'])
+                # The final chunk carries the invocation's token usage
+                metrics = payload.get('amazon-bedrock-invocationMetrics')
+                if metrics:
+                    input_tokens = metrics.get('inputTokenCount')
+                    output_tokens = metrics.get('outputTokenCount')
+                yield payload
+        span.attributes.update(request_bytes=len(request), response_bytes=response_bytes,
+                               input_tokens=input_tokens, output_tokens=output_tokens)
+    telemetry.record_bedrock(model_id, len(request), response_bytes, input_tokens, output_tokens)
@@ -0,0 +1,3 @@
+# Silhouette extraction modes: Canny edge contours, or background segmentation.
+# Kept free of heavy imports so the UI can list them before OpenCV is loaded.
+EXTRACTION_METHODS = ('canny', 'segment')
@@ -1,30 +1,276 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
 import cv2
 import numpy as np
 from PIL import Image
 
-def create_feature_visualization(image: Image.Image) -> np.ndarray:
-    """Create enhanced feature visualization"""
-    cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    
-    # Create multi-layer visualization
-    viz_image = cv_image.copy()
-    
+from src.utils.image_buffer import DecodedImage, as_decoded
+from src.utils.telemetry import get_telemetry, traced
+
+# Number of extraction results kept in memory, keyed by image content hash
+EXTRACTION_CACHE_SIZE = 32
+
+# Segmentation works on a copy downscaled to this longest side
+SEGMENT_MAX_SIDE = 256
+# Minimum per-channel difference from the background colour to count as vehicle
+SEGMENT_THRESHOLD = 40
+
+_extraction_cache: "OrderedDict[str, VehicleExtraction]" = OrderedDict()
+_extraction_lock = threading.Lock()
+
+
+@dataclass
+class VehicleExtraction:
+    """Result of running the CV feature pipeline once on a vehicle image"""
+    content_hash: str
+    edges: np.ndarray
+    main_contour: Optional[np.ndarray]
+    bounding_box: Optional[Tuple[int, int, int, int]]
+    features: Dict[str, float] = field(default_factory=dict)
+    # Log-scaled Hu moments of the main contour (translation/scale invariant)
+    shape: Optional[List[float]] = None
+
+
+def _calculate_aspect_ratio(contour: np.ndarray) -> float:
+    """Calculate the aspect ratio of the vehicle"""
+    x, y, w, h = cv2.boundingRect(contour)
+    return w / h if h != 0 else 0
+
+
+def _calculate_curvature(contour: np.ndarray) -> float:
+    """Calculate the average curvature of the vehicle's surface"""
+    # Simplified curvature calculation
+    hull = cv2.convexHull(contour)
+    hull_area = cv2.contourArea(hull)
+    contour_area = cv2.contourArea(contour)
+    return hull_area / contour_area if contour_area != 0 else 1
+
+
+def _estimate_ground_clearance(contour: np.ndarray) -> float:
+    """Estimate the ground clearance ratio"""
+    x, y, w, h = cv2.boundingRect(contour)
+    return y / h if h != 0 else 0
+
+
+def _calculate_nose_angle(contour: np.ndarray) -> float:
+    """Calculate the approximate nose angle of the vehicle"""
+    # Simplified angle calculation using the first few points
+    if len(contour) > 10:
+        front_points = contour[:10]
+        vx, vy, x, y = cv2.fitLine(front_points, cv2.DIST_L2, 0, 0.01, 0.01)
+        angle = np.arctan2(vy, vx) * 180 / np.pi
+        return abs(angle)
+    return 0
+
+
+def _shape_descriptor(contour: np.ndarray) -> List[float]:
+    """Log-scaled Hu moments of a contour, sign preserved"""
+    hu = cv2.HuMoments(cv2.moments(contour)).flatten()
+    return [float(v) for v in -np.sign(hu) * np.log10(np.abs(hu) + 1e-30)]
+
+
+def _build_extraction(content_hash: str, edges: Optional[np.ndarray], contours,
+                      shape: Optional[Tuple[int, int]] = None) -> VehicleExtraction:
+    """
+    Pick the main contour and compute the feature dict. When ``edges`` is None
+    the outline of the main contour is drawn into an image of ``shape``.
+    """
+    draw_outline = edges is None
+    if draw_outline:
+        edges = np.zeros(shape, np.uint8)
+    if not contours:
+        return VehicleExtraction(content_hash, edges, None, None, {})
+
+    # Get the main vehicle contour (largest contour)
+    main_contour = max(contours, key=cv2.contourArea)
+    if draw_outline:
+        cv2.drawContours(edges, [main_contour], -1, 255, 1)
+
+    features = {
+        'frontal_area': cv2.contourArea(main_contour),
+        'aspect_ratio': _calculate_aspect_ratio(main_contour),
+        'curvature': _calculate_curvature(main_contour),
+        'ground_clearance': _estimate_ground_clearance(main_contour),
+        'nose_angle': _calculate_nose_angle(main_contour)
+    }
+
+    return VehicleExtraction(
+        content_hash=content_hash,
+        edges=edges,
+        main_contour=main_contour,
+        bounding_box=tuple(int(v) for v in cv2.boundingRect(main_contour)),
+        features=features,
+        shape=_shape_descriptor(main_contour)
+    )
+
+
+def _run_canny_extraction(image: DecodedImage) -> VehicleExtraction:
+    """Run Canny and contour detection on the image's grayscale view"""
     # Edge detection
-    edges = cv2.Canny(cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY), 100, 200)
-    
-    # Contour detection
+    edges = cv2.Canny(image.gray, 100, 200)
+
+    # Find contours
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
+
+    return _build_extraction(image.content_hash, edges, contours)
+
+
+def _background_mask(image: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """255 where a pixel is outside the background colour range, 0 elsewhere"""
+    return cv2.bitwise_not(cv2.inRange(image, lower, upper))
+
+
+def segment_background(image: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mask the pixels that differ from the background colour, estimated as the
+    median of the image border (white for our prompts), by more than
+    SEGMENT_THRESHOLD in any channel. Returns ``(mask, lower, upper)`` with
+    the background colour range.
+    """
+    border = np.concatenate([image[0], image[-1], image[:, 0], image[:, -1]])
+    background = np.median(border, axis=0)
+    lower = np.clip(background - SEGMENT_THRESHOLD, 0, 255).astype(np.uint8)
+    upper = np.clip(background + SEGMENT_THRESHOLD, 0, 255).astype(np.uint8)
+    return _background_mask(image, lower, upper), lower, upper
+
+
+def _run_segment_extraction(image: DecodedImage) -> VehicleExtraction:
+    """
+    Segment the vehicle from the plain background the prompts ask for.
+
+    Thresholding and morphology run on a copy downscaled to SEGMENT_MAX_SIDE.
+    The filled silhouette is upscaled, and only a thin band around its
+    boundary is re-thresholded at full resolution. Unlike Canny edge
+    fragments, the result is a closed contour.
+    """
+    cv_image, content_hash = image.bgr, image.content_hash
+    h, w = cv_image.shape[:2]
+    scale = min(1.0, SEGMENT_MAX_SIDE / max(h, w))
+    small = cv_image
+    if scale < 1.0:
+        small = cv2.resize(cv_image, (max(1, round(w * scale)), max(1, round(h * scale))),
+                           interpolation=cv2.INTER_LINEAR)
+
+    mask, lower, upper = segment_background(small)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE,
+                            cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5)), iterations=2)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN,
+                            cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+
+    # Keep the largest blob, with holes (windows, wheels) filled
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return VehicleExtraction(content_hash, np.zeros((h, w), np.uint8), None, None, {})
+    silhouette = np.zeros_like(mask)
+    cv2.drawContours(silhouette, [max(contours, key=cv2.contourArea)], -1, 255, cv2.FILLED)
+
+    if scale < 1.0:
+        # Upscale only the silhouette's bounding box and refine a thin band around
+        # its boundary at full resolution; everything outside the box is background
+        band = cv2.morphologyEx(silhouette, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+        bx, by, bw, bh = cv2.boundingRect(band)
+        x0, y0 = int(bx / scale), int(by / scale)
+        x1, y1 = min(w, int(np.ceil((bx + bw) / scale))), min(h, int(np.ceil((by + bh) / scale)))
+        size = (x1 - x0, y1 - y0)
+        roi_silhouette = cv2.resize(silhouette[by:by + bh, bx:bx + bw], size,
+                                    interpolation=cv2.INTER_NEAREST)
+        roi_band = cv2.resize(band[by:by + bh, bx:bx + bw], size, interpolation=cv2.INTER_NEAREST)
+        roi_silhouette = cv2.copyTo(_background_mask(cv_image[y0:y1, x0:x1], lower, upper),
+                                    roi_band, roi_silhouette)
+        contours, _ = cv2.findContours(roi_silhouette, cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0))
+    else:
+        contours, _ = cv2.findContours(silhouette, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return _build_extraction(content_hash, None, contours, (h, w))
+
+
+_EXTRACTORS = {
+    'canny': _run_canny_extraction,
+    'segment': _run_segment_extraction,
+}
+
+
+def extract_vehicle_features(image: Union[DecodedImage, Image.Image, np.ndarray],
+                             method: str = 'canny') -> VehicleExtraction:
+    """
+    Extract the main contour, edges, bounding box and feature dict of a vehicle image.
+
+    Accepts a DecodedImage, a PIL image or a BGR ndarray. ``method`` is one of
+    EXTRACTION_METHODS: 'canny' (edge contours) or 'segment' (background
+    segmentation). Results are memoized by image content hash and method so
+    the same image is only processed once per pipeline run.
+    """
+    if method not in _EXTRACTORS:
+        raise ValueError(f"Unknown extraction method: {method}")
+    image = as_decoded(image)
+    key = f"{method}:{image.content_hash}"
+
+    with _extraction_lock:
+        cached = _extraction_cache.get(key)
+        if cached is not None:
+            _extraction_cache.move_to_end(key)
+            get_telemetry().increment('cache_hits_total', cache='extraction')
+            return cached
+
+    with get_telemetry().span('extract_vehicle_features', method=method):
+        extraction = _EXTRACTORS[method](image)
+
+    with _extraction_lock:
+        _extraction_cache[key] = extraction
+        while len(_extraction_cache) > EXTRACTION_CACHE_SIZE:
+            _extraction_cache.popitem(last=False)
+
+    return extraction
+
+
+def serializable_features(features: Dict[str, float]) -> Dict[str, float]:
+    """Convert numpy scalars/arrays in a feature dict to plain floats"""
+    return {key: float(np.asarray(value).item()) for key, value in features.items()}
+
+
+def extract_features_from_file(path: str, method: str = 'canny') -> Dict[str, float]:
+    """Read an image from disk and return its plain-float feature dict (process-pool friendly)"""
+    return serializable_features(extract_vehicle_features(DecodedImage.from_file(path), method).features)
+
+
+def extract_design_from_file(path: str, method: str = 'canny', size: Optional[int] = None
+                             ) -> Tuple[Dict[str, float], Optional[List[float]]]:
+    """
+    Like extract_features_from_file, but also return the shape descriptor.
+    ``size`` resizes the image's longest side first, so small previews are
+    measured on the same pixel scale as full renders.
+    """
+    image = DecodedImage.from_file(path)
+    if size is not None:
+        image = image.resized(size, upscale=True)
+    extraction = extract_vehicle_features(image, method)
+    return serializable_features(extraction.features), extraction.shape
+
+
+@traced('create_feature_visualization')
+def create_feature_visualization(image: Union[DecodedImage, Image.Image, np.ndarray],
+                                 extraction: Optional[VehicleExtraction] = None,
+                                 method: str = 'canny') -> np.ndarray:
+    """Create enhanced feature visualization (RGB)"""
+    image = as_decoded(image)
+    if extraction is None:
+        extraction = extract_vehicle_features(image, method)
+
+    # Create multi-layer visualization; the RGB conversion is the one copy drawn on
+    viz_image = cv2.cvtColor(image.bgr, cv2.COLOR_BGR2RGB)
+
     # Draw edges in green
-    viz_image[edges > 0] = [0, 255, 0]
-    
+    viz_image[extraction.edges > 0] = [0, 255, 0]
+
     # Draw main contour in blue
-    if contours:
-        main_contour = max(contours, key=cv2.contourArea)
-        cv2.drawContours(viz_image, [main_contour], -1, (255, 0, 0), 2)
-        
+    if extraction.main_contour is not None:
+        cv2.drawContours(viz_image, [extraction.main_contour], -1, (0, 0, 255), 2)
+
         # Draw bounding box in red
-        x, y, w, h = cv2.boundingRect(main_contour)
-        cv2.rectangle(viz_image, (x, y), (x+w, y+h), (0, 0, 255), 2)
-    
-    return cv2.cvtColor(viz_image, cv2.COLOR_BGR2RGB)
\ No newline at end of file
+        x, y, w, h = extraction.bounding_box
+        cv2.rectangle(viz_image, (x, y), (x+w, y+h), (255, 0, 0), 2)
+
+    return viz_image
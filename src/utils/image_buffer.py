@@ -0,0 +1,110 @@
+import hashlib
+import threading
+from typing import Optional, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def encoded_hash(data: bytes) -> str:
+    """Content address of an encoded image (same as the image store's)"""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+class DecodedImage:
+    """
+    One decoded image held as a single read-only BGR ndarray.
+
+    Built straight from encoded bytes with ``cv2.imdecode``. The grayscale view
+    is converted once on first use and cached, so the CV pipeline,
+    visualizations and display (``st.image(..., channels="BGR")``) share one
+    buffer instead of each converting a PIL image. ``content_hash`` comes from
+    the encoded bytes when known, otherwise from the pixels.
+    """
+
+    def __init__(self, bgr: np.ndarray, content_hash: Optional[str] = None):
+        if bgr.ndim != 3 or bgr.shape[2] != 3:
+            raise ValueError(f"Expected an HxWx3 BGR array, got shape {bgr.shape}")
+        # A read-only view: the caller's own array stays writable
+        self._bgr = bgr.view()
+        self._bgr.flags.writeable = False
+        self._content_hash = content_hash
+        self._gray: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, content_hash: Optional[str] = None) -> "DecodedImage":
+        """Decode PNG/JPEG/WebP bytes without an intermediate copy of the input"""
+        bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError("Could not decode image data")
+        return cls(bgr, content_hash or encoded_hash(data))
+
+    @classmethod
+    def from_file(cls, path: str, content_hash: Optional[str] = None) -> "DecodedImage":
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            return cls.from_bytes(data, content_hash)
+        except ValueError:
+            raise ValueError(f"Could not read image: {path}") from None
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> "DecodedImage":
+        return cls(cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR))
+
+    @property
+    def bgr(self) -> np.ndarray:
+        return self._bgr
+
+    @property
+    def gray(self) -> np.ndarray:
+        with self._lock:
+            if self._gray is None:
+                self._gray = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+                self._gray.flags.writeable = False
+            return self._gray
+
+    @property
+    def width(self) -> int:
+        return self._bgr.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self._bgr.shape[0]
+
+    @property
+    def content_hash(self) -> str:
+        with self._lock:
+            if self._content_hash is None:
+                digest = hashlib.sha1(self._bgr.data)
+                digest.update(str(self._bgr.shape).encode())
+                self._content_hash = digest.hexdigest()
+            return self._content_hash
+
+    def to_pil(self) -> Image.Image:
+        """A new RGB PIL copy, for APIs that need one"""
+        return Image.fromarray(cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB))
+
+    def resized(self, max_side: int, upscale: bool = False) -> "DecodedImage":
+        """
+        A downscaled copy whose longest side is at most ``max_side``; with
+        ``upscale``, smaller images are enlarged to exactly ``max_side``.
+        """
+        scale = max_side / max(self.width, self.height)
+        if scale == 1 or (scale > 1 and not upscale):
+            return self
+        size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        return DecodedImage(cv2.resize(self._bgr, size, interpolation=interpolation))
+
+
+def as_decoded(image: Union[DecodedImage, Image.Image, np.ndarray]) -> DecodedImage:
+    """Wrap a PIL image or BGR ndarray; DecodedImage passes through"""
+    if isinstance(image, DecodedImage):
+        return image
+    if isinstance(image, Image.Image):
+        return DecodedImage.from_pil(image)
+    # Callers may keep writing to their array, so take a private copy
+    return DecodedImage(np.array(image, copy=True))
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'llm_responses.sqlite')
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def make_cache_key(model_id: str, body: Dict[str, Any]) -> str:
+    """Content address for a request: model id plus the full request body,
+    which carries the prompt and sampling parameters"""
+    canonical = json.dumps({"model": model_id, "body": body}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed, content-addressed cache of Bedrock response bodies.
+
+    Entries expire after ``ttl_seconds`` and the least recently used entries are
+    evicted once the cache exceeds ``max_entries`` or ``max_bytes``. Hit and miss
+    counters are kept per process.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model_id TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def get(self, model_id: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the cached response body for a request, or None on a miss"""
+        key = make_cache_key(model_id, body)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, model_id: str, body: Dict[str, Any], response: Dict[str, Any]):
+        """Store a response body and evict least recently used entries over the limits"""
+        key = make_cache_key(model_id, body)
+        payload = json.dumps(response)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_id, payload, len(payload), now, now))
+            self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones over the limits"""
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?",
+                           (time.time() - self.ttl_seconds,))
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            key, size = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 1").fetchone()
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process and current cache size"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': count, 'bytes': total}
+
+
+_default_cache: Optional[LLMCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Return the process-wide LLM cache.
+
+    Configured with VEH_AERO_LLM_CACHE_PATH, VEH_AERO_LLM_CACHE_MAX_ENTRIES,
+    VEH_AERO_LLM_CACHE_MAX_BYTES and VEH_AERO_LLM_CACHE_TTL; set
+    VEH_AERO_LLM_CACHE=0 to disable caching.
+    """
+    global _default_cache
+    if os.environ.get('VEH_AERO_LLM_CACHE', '1') == '0':
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache(
+                path=os.environ.get('VEH_AERO_LLM_CACHE_PATH', DEFAULT_CACHE_PATH),
+                max_entries=int(os.environ.get('VEH_AERO_LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                max_bytes=int(os.environ.get('VEH_AERO_LLM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+                ttl_seconds=float(os.environ.get('VEH_AERO_LLM_CACHE_TTL', DEFAULT_TTL_SECONDS))
+            )
+        return _default_cache
@@ -0,0 +1,270 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.utils.telemetry import get_telemetry
+
+# Bedrock error codes that mean "slow down" rather than "this request is wrong"
+THROTTLING_CODES = ('ThrottlingException', 'TooManyRequestsException',
+                    'ServiceQuotaExceededException', 'ModelNotReadyException')
+
+# Multiplicative decrease applied to the concurrency limit when throttled
+BACKOFF_FACTOR = 0.5
+# Pause before the one retry of a throttled call, still holding its slot
+THROTTLE_RETRY_DELAY = 1.0
+# Longest a request waits in the queue before giving up
+DEFAULT_QUEUE_TIMEOUT = 300.0
+
+
+@dataclass
+class ModelBudget:
+    """Request rate (per second), burst size and concurrency bounds for one model"""
+    rate: float
+    burst: float
+    max_concurrency: int
+    min_concurrency: int = 1
+
+
+# Keyed by model id prefix. Conservative against the default on-demand quotas;
+# raise them with VEH_AERO_RATE_LIMITS when the account's quota is higher.
+DEFAULT_BUDGETS = {
+    'amazon.nova-canvas': ModelBudget(rate=2.0, burst=6, max_concurrency=6),
+    'anthropic.': ModelBudget(rate=4.0, burst=10, max_concurrency=10),
+}
+FALLBACK_BUDGET = ModelBudget(rate=5.0, burst=10, max_concurrency=8)
+
+
+class RateLimitTimeout(TimeoutError):
+    """A request waited longer than its queue timeout for a slot"""
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Whether a botocore error is Bedrock throttling"""
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    return response.get('Error', {}).get('Code') in THROTTLING_CODES
+
+
+@dataclass
+class Lease:
+    """One admitted request; ``throttled`` is set once Bedrock throttled it"""
+    model_id: str
+    admitted_at: float
+    queued_s: float = 0.0
+    throttled: bool = False
+
+    def call(self, function: Callable[[], Any]) -> Any:
+        """
+        Run ``function``, retrying it once after THROTTLE_RETRY_DELAY if
+        Bedrock throttles it. Any other error is raised at once.
+        """
+        try:
+            return function()
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            self.throttled = True
+        time.sleep(THROTTLE_RETRY_DELAY)
+        return function()
+
+
+@dataclass
+class _State:
+    tokens: float
+    limit: float
+    refilled_at: float
+    decreased_at: float = 0.0
+    in_flight: int = 0
+    queue: "deque[int]" = field(default_factory=deque)
+
+
+class ModelLimiter:
+    """
+    Token bucket plus AIMD concurrency limit for one model, with a FIFO queue.
+
+    A request is admitted when it is at the head of the queue, the number in
+    flight is below the current limit and a token is available. Each
+    successful request raises the limit by 1/limit (about +1 per round of
+    requests) up to ``max_concurrency``; a throttled one halves it, at most
+    once per round. Only throttling error codes count, not other retries.
+    """
+
+    def __init__(self, model_id: str, budget: ModelBudget,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        self.model_id = model_id
+        self.budget = budget
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+        self._state = _State(tokens=budget.burst, limit=float(budget.max_concurrency),
+                             refilled_at=time.monotonic())
+
+    def _refill(self, now: float):
+        state = self._state
+        state.tokens = min(self.budget.burst,
+                           state.tokens + (now - state.refilled_at) * self.budget.rate)
+        state.refilled_at = now
+
+    def _publish(self):
+        telemetry = get_telemetry()
+        state = self._state
+        telemetry.set_gauge('rate_limit_queue_depth', len(state.queue), model=self.model_id)
+        telemetry.set_gauge('rate_limit_in_flight', state.in_flight, model=self.model_id)
+        telemetry.set_gauge('rate_limit_concurrency', int(state.limit), model=self.model_id)
+
+    def acquire(self, timeout: Optional[float] = None) -> Lease:
+        """Wait for this request's turn; raises RateLimitTimeout after ``timeout`` seconds"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        state = self._state
+        with self._condition:
+            ticket = next(self._tickets)
+            state.queue.append(ticket)
+            self._publish()
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if state.queue[0] == ticket and state.in_flight < max(1, int(state.limit)):
+                        self._refill(now)
+                        if state.tokens >= 1:
+                            state.tokens -= 1
+                            state.queue.popleft()
+                            state.in_flight += 1
+                            self._publish()
+                            # The next request in line may be admissible too
+                            self._condition.notify_all()
+                            return Lease(self.model_id, now, queued_s=now - start)
+                        wait = (1 - state.tokens) / self.budget.rate
+                    if now >= deadline:
+                        raise RateLimitTimeout(
+                            f"Waited {timeout:g}s for a {self.model_id} request slot")
+                    remaining = deadline - now
+                    self._condition.wait(min(wait, remaining) if wait is not None else remaining)
+            except BaseException:
+                if ticket in state.queue:
+                    state.queue.remove(ticket)
+                    self._publish()
+                    self._condition.notify_all()
+                raise
+
+    def release(self, lease: Lease):
+        """Return a slot and adjust the concurrency limit"""
+        state = self._state
+        with self._condition:
+            state.in_flight -= 1
+            if lease.throttled:
+                # Requests admitted before the last decrease saw the old limit;
+                # only the first of them to be throttled counts
+                if lease.admitted_at >= state.decreased_at:
+                    state.limit = max(self.budget.min_concurrency, state.limit * BACKOFF_FACTOR)
+                    state.decreased_at = time.monotonic()
+            else:
+                state.limit = min(self.budget.max_concurrency, state.limit + 1 / state.limit)
+            self._publish()
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[Lease]:
+        """Hold a slot for the enclosed block; throttling errors raised in it are detected"""
+        lease = self.acquire(timeout)
+        telemetry = get_telemetry()
+        telemetry.increment('rate_limit_wait_seconds_total', lease.queued_s, model=self.model_id)
+        try:
+            yield lease
+        except BaseException as e:
+            if is_throttling_error(e):
+                lease.throttled = True
+            raise
+        finally:
+            if lease.throttled:
+                telemetry.increment('rate_limit_throttled_total', model=self.model_id)
+            self.release(lease)
+
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, requests in flight, current concurrency limit and tokens"""
+        with self._condition:
+            self._refill(time.monotonic())
+            return {
+                'queue_depth': len(self._state.queue),
+                'in_flight': self._state.in_flight,
+                'concurrency_limit': int(self._state.limit),
+                'tokens': self._state.tokens,
+            }
+
+
+class RateLimiter:
+    """Process-wide set of per-model limiters; model ids match budgets by prefix"""
+
+    def __init__(self, budgets: Optional[Dict[str, ModelBudget]] = None,
+                 default: ModelBudget = FALLBACK_BUDGET,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.default = default
+        self.queue_timeout = queue_timeout
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, model_id: str) -> ModelBudget:
+        matches = [prefix for prefix in self.budgets if model_id.startswith(prefix)]
+        return self.budgets[max(matches, key=len)] if matches else self.default
+
+    def limiter(self, model_id: str) -> ModelLimiter:
+        with self._lock:
+            if model_id not in self._limiters:
+                self._limiters[model_id] = ModelLimiter(model_id, self._budget(model_id),
+                                                        self.queue_timeout)
+            return self._limiters[model_id]
+
+    def slot(self, model_id: str, timeout: Optional[float] = None):
+        return self.limiter(model_id).slot(timeout)
+
+    def queue_depth(self) -> int:
+        """Requests waiting across all models"""
+        return sum(stats['queue_depth'] for stats in self.stats().values())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.model_id: limiter.stats() for limiter in limiters}
+
+
+def _budgets_from_env(text: str) -> Dict[str, ModelBudget]:
+    """DEFAULT_BUDGETS updated from a JSON object of prefix -> budget fields"""
+    budgets = dict(DEFAULT_BUDGETS)
+    for prefix, fields in json.loads(text).items():
+        budgets[prefix] = replace(budgets.get(prefix, FALLBACK_BUDGET), **fields)
+    return budgets
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """
+    Return the process-wide limiter, or None when VEH_AERO_RATE_LIMIT=0.
+
+    VEH_AERO_RATE_LIMITS overrides budgets by model id prefix, e.g.
+    '{"amazon.nova-canvas": {"rate": 4, "burst": 8, "max_concurrency": 8}}';
+    VEH_AERO_RATE_LIMIT_TIMEOUT sets how long a request may queue.
+    """
+    global _default_limiter
+    if os.environ.get('VEH_AERO_RATE_LIMIT', '1') == '0':
+        return None
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            overrides = os.environ.get('VEH_AERO_RATE_LIMITS')
+            _default_limiter = RateLimiter(
+                budgets=_budgets_from_env(overrides) if overrides else None,
+                queue_timeout=float(os.environ.get('VEH_AERO_RATE_LIMIT_TIMEOUT',
+                                                   DEFAULT_QUEUE_TIMEOUT)))
+        return _default_limiter
@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Union
+
+import cv2
+import numpy as np
+
+from src.utils.feature_extraction import segment_background
+from src.utils.image_buffer import DecodedImage
+from src.utils.telemetry import traced
+
+# Candidates are scored on a copy downscaled to this longest side
+SCORE_MAX_SIDE = 128
+# Border pixels allowed to differ from the background before it counts as busy
+BACKGROUND_NOISE = 0.02
+# Silhouettes covering less of the image than this are not a vehicle
+MIN_SILHOUETTE_AREA = 0.02
+# Length to height of a side-view car (wheels included) and the tolerance on
+# its log, wide enough for hatchbacks and SUVs
+SIDE_VIEW_ASPECT = 2.4
+ASPECT_TOLERANCE = 0.5
+
+
+@dataclass
+class SilhouetteScore:
+    """Silhouette quality of a render, each criterion in [0, 1]"""
+    closure: float
+    background: float
+    aspect: float
+
+    @property
+    def total(self) -> float:
+        """Product of the criteria, so failing any one rules a render out"""
+        return self.closure * self.background * self.aspect
+
+
+def _background_score(mask: np.ndarray) -> float:
+    """1 for a plain border in one colour, falling as more border pixels differ from it"""
+    border = np.concatenate([mask[0], mask[-1], mask[:, 0], mask[:, -1]])
+    off = np.count_nonzero(border) / border.size
+    return float(np.clip(1 - (off - BACKGROUND_NOISE) / (1 - BACKGROUND_NOISE), 0, 1))
+
+
+@traced('score_silhouette')
+def score_silhouette(image: Union[DecodedImage, np.ndarray]) -> SilhouetteScore:
+    """
+    Score how usable a render is for feature extraction.
+
+    ``closure`` is the share of the foreground in one blob, halved when that
+    blob runs off the image; ``background`` rewards a plain border;
+    ``aspect`` rewards a side-view length to height ratio. Works on a copy of
+    at most SCORE_MAX_SIDE pixels, so scoring a candidate takes a few ms.
+    """
+    bgr = image.bgr if isinstance(image, DecodedImage) else image
+    h, w = bgr.shape[:2]
+    scale = min(1.0, SCORE_MAX_SIDE / max(h, w))
+    small = bgr
+    if scale < 1.0:
+        small = cv2.resize(bgr, (max(1, round(w * scale)), max(1, round(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    h, w = small.shape[:2]
+
+    mask, _, _ = segment_background(small)
+    background_score = _background_score(mask)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE,
+                            cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return SilhouetteScore(0.0, background_score, 0.0)
+
+    main = max(contours, key=cv2.contourArea)
+    main_area = cv2.contourArea(main)
+    if main_area < MIN_SILHOUETTE_AREA * h * w:
+        return SilhouetteScore(0.0, background_score, 0.0)
+
+    closure = main_area / sum(cv2.contourArea(contour) for contour in contours)
+    x, y, bw, bh = cv2.boundingRect(main)
+    if x == 0 or y == 0 or x + bw >= w or y + bh >= h:
+        closure *= 0.5
+
+    aspect = float(np.exp(-(np.log(bw / bh / SIDE_VIEW_ASPECT) / ASPECT_TOLERANCE) ** 2))
+    return SilhouetteScore(float(closure), background_score, aspect)
+
@@ -0,0 +1,98 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+
+def script_run_context_initializer() -> Optional[Callable[[], None]]:
+    """
+    Return a thread-pool initializer that attaches the current Streamlit script
+    context to worker threads, so ``st.error`` calls made inside tasks still
+    reach the page. Returns None when not running under Streamlit.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except ImportError:
+        return None
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+
+    def initializer():
+        import threading
+        add_script_run_ctx(threading.current_thread(), ctx)
+
+    return initializer
+
+
+class TaskGraph:
+    """
+    Minimal dependency-aware executor.
+
+    Tasks are registered with the names of the tasks they depend on and are
+    submitted to a thread pool as soon as all of their inputs are available.
+    Each task is called with its dependencies' results as positional arguments,
+    in the order the dependencies were listed.
+    """
+
+    def __init__(self, max_workers: int = 4, initializer: Optional[Callable[[], None]] = None):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self._tasks: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self._results: Dict[str, Any] = {}
+        self._futures: Dict[Future, str] = {}
+        self._submitted = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def add(self, name: str, fn: Callable[..., Any], deps: Sequence[str] = ()) -> str:
+        """Register a task; dependencies must already be registered"""
+        if name in self._tasks:
+            raise ValueError(f"Task '{name}' is already registered")
+        missing = [dep for dep in deps if dep not in self._tasks]
+        if missing:
+            raise ValueError(f"Task '{name}' depends on unknown tasks: {missing}")
+        self._tasks[name] = (fn, tuple(deps))
+        return name
+
+    def start(self):
+        """Start running every task whose dependencies are satisfied"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                initializer=self.initializer)
+            self._submit_ready()
+
+    def _submit_ready(self):
+        for name, (fn, deps) in self._tasks.items():
+            if name in self._submitted or not all(dep in self._results for dep in deps):
+                continue
+            args = [self._results[dep] for dep in deps]
+            self._futures[self._executor.submit(fn, *args)] = name
+            self._submitted.add(name)
+
+    def as_completed(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield ``(name, result)`` pairs in the calling thread as tasks finish.
+
+        Dependents are submitted before each result is yielded, so slow
+        consumers (e.g. Streamlit rendering) don't hold up the graph. An
+        exception raised by a task cancels pending work and is re-raised here.
+        """
+        self.start()
+        try:
+            while self._futures:
+                done, _ = wait(list(self._futures), return_when=FIRST_COMPLETED)
+                finished = []
+                for future in done:
+                    name = self._futures.pop(future)
+                    self._results[name] = future.result()
+                    finished.append(name)
+                self._submit_ready()
+                for name in finished:
+                    yield name, self._results[name]
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self) -> Dict[str, Any]:
+        """Run the graph to completion and return all results by task name"""
+        for _ in self.as_completed():
+            pass
+        return dict(self._results)
@@ -0,0 +1,248 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Number of finished spans kept in memory for the in-app timing panel
+RECENT_SPANS = 2000
+
+METRIC_PREFIX = 'veh_aero'
+
+_HELP = {
+    'span_seconds': "Time spent in each instrumented stage",
+    'span_errors_total': "Stages that raised an exception",
+    'bedrock_requests_total': "Bedrock calls by model, including cache hits",
+    'bedrock_request_bytes_total': "JSON request body bytes sent to Bedrock",
+    'bedrock_response_bytes_total': "Response body bytes received from Bedrock",
+    'bedrock_input_tokens_total': "Input tokens reported by Bedrock",
+    'bedrock_output_tokens_total': "Output tokens reported by Bedrock",
+    'coefficients_total': "Cd/Cl results by source (design_index, llm, surrogate, fallback)",
+    'fallbacks_total': "Placeholder results returned after an error",
+    'cache_hits_total': "Results served from a cache instead of recomputed",
+    'rate_limit_wait_seconds_total': "Time Bedrock requests spent queued by the rate limiter",
+    'rate_limit_throttled_total': "Bedrock requests that were throttled or needed retries",
+    'rate_limit_queue_depth': "Bedrock requests waiting for a rate limiter slot",
+    'rate_limit_in_flight': "Bedrock requests currently admitted by the rate limiter",
+    'rate_limit_concurrency': "Current adaptive concurrency limit",
+}
+
+
+@dataclass
+class Span:
+    """One timed stage; ``attributes`` carries sizes, token counts and similar"""
+    name: str
+    start: float
+    duration: float = 0.0
+    error: Optional[str] = None
+    thread: str = ''
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+def _labels(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Telemetry:
+    """
+    Thread-safe span and counter recorder.
+
+    Finished spans are kept in a bounded in-memory buffer (for the in-app
+    timing panel), aggregated into per-stage duration totals, and optionally
+    appended to a JSON lines file as they finish. Counters, gauges and span
+    totals are exported in the Prometheus text format with ``write_prometheus``.
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None, prometheus_path: Optional[str] = None,
+                 max_spans: int = RECENT_SPANS):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self._lock = threading.Lock()
+        self._spans: "deque[Span]" = deque(maxlen=max_spans)
+        self._sequence = 0
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Time the enclosed block. The yielded span's ``attributes`` can be
+        filled in while it runs; exceptions are recorded and re-raised.
+        """
+        current = Span(name, time.time(), thread=threading.current_thread().name,
+                       attributes=dict(attributes))
+        start = time.perf_counter()
+        try:
+            yield current
+        except GeneratorExit:
+            # A streaming consumer stopped early; not a failure of the stage
+            raise
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.duration = time.perf_counter() - start
+            self._finish(current)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self._sequence += 1
+            self._spans.append(span)
+            key = _labels({'span': span.name})
+            self._add(('span_seconds_count', key), 1)
+            self._add(('span_seconds_sum', key), span.duration)
+            if span.error:
+                self._add(('span_errors_total', key), 1)
+            if self.jsonl_path:
+                self._append_jsonl(span)
+
+    def _add(self, key, value: float):
+        self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def _append_jsonl(self, span: Span):
+        directory = os.path.dirname(self.jsonl_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(asdict(span), default=str) + '\n')
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to the counter ``name`` with the given labels"""
+        with self._lock:
+            self._add((name, _labels(labels)), value)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set the gauge ``name`` with the given labels to its current ``value``"""
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def record_bedrock(self, model_id: str, request_bytes: int = 0, response_bytes: int = 0,
+                       input_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+                       cached: bool = False):
+        """Count one Bedrock call's sizes and token usage"""
+        labels = _labels({'model': model_id})
+        with self._lock:
+            self._add(('bedrock_requests_total', _labels({'model': model_id, 'cached': str(cached).lower()})), 1)
+            self._add(('bedrock_request_bytes_total', labels), request_bytes)
+            self._add(('bedrock_response_bytes_total', labels), response_bytes)
+            if input_tokens is not None:
+                self._add(('bedrock_input_tokens_total', labels), input_tokens)
+            if output_tokens is not None:
+                self._add(('bedrock_output_tokens_total', labels), output_tokens)
+
+    def mark(self) -> int:
+        """Position in the span stream; pass to ``spans_since`` to get later spans"""
+        with self._lock:
+            return self._sequence
+
+    def spans_since(self, mark: int) -> List[Span]:
+        """Spans finished after ``mark`` that are still in the in-memory buffer"""
+        with self._lock:
+            count = min(self._sequence - mark, len(self._spans))
+            return list(self._spans)[len(self._spans) - count:] if count > 0 else []
+
+    def counters(self) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def gauges(self) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+        with self._lock:
+            return dict(self._gauges)
+
+    def prometheus_text(self) -> str:
+        """Counters, gauges and span totals in the Prometheus text exposition format"""
+        by_name: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]] = {}
+        for (name, labels), value in sorted(self.counters().items()):
+            by_name.setdefault(name, []).append((labels, value))
+        gauges: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]] = {}
+        for (name, labels), value in sorted(self.gauges().items()):
+            gauges.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, samples in gauges.items():
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {full_name} gauge")
+            for labels, value in samples:
+                rendered = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f"{full_name}{{{rendered}}} {value:g}")
+        for name, samples in by_name.items():
+            family = name[:-len('_count')] if name.endswith('_count') else \
+                name[:-len('_sum')] if name.endswith('_sum') else name
+            full_family = f"{METRIC_PREFIX}_{family}"
+            if family == 'span_seconds':
+                if name.endswith('_count'):
+                    lines.append(f"# HELP {full_family} {_HELP[family]}")
+                    lines.append(f"# TYPE {full_family} summary")
+            else:
+                lines.append(f"# HELP {full_family} {_HELP.get(family, family)}")
+                lines.append(f"# TYPE {full_family} counter")
+            for labels, value in samples:
+                rendered = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f"{METRIC_PREFIX}_{name}{{{rendered}}} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: Optional[str] = None):
+        """Write the Prometheus text file (e.g. for node_exporter's textfile collector)"""
+        path = path or self.prometheus_path
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+
+def traced(name: str):
+    """Decorator recording each call of the wrapped function as a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_telemetry().span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize_spans(spans: List[Span]) -> List[Dict[str, Any]]:
+    """Per-stage call count, total and max seconds, slowest total first"""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        row = rows.setdefault(span.name, {'stage': span.name, 'calls': 0, 'total_s': 0.0,
+                                          'max_s': 0.0, 'errors': 0})
+        row['calls'] += 1
+        row['total_s'] += span.duration
+        row['max_s'] = max(row['max_s'], span.duration)
+        row['errors'] += span.error is not None
+    return sorted(rows.values(), key=lambda row: row['total_s'], reverse=True)
+
+
+_default_telemetry: Optional[Telemetry] = None
+_default_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """
+    Return the process-wide recorder.
+
+    Set VEH_AERO_TELEMETRY_JSONL to append every span to a JSON lines file and
+    VEH_AERO_TELEMETRY_PROM to the path ``write_prometheus`` should write.
+    """
+    global _default_telemetry
+    with _default_telemetry_lock:
+        if _default_telemetry is None:
+            _default_telemetry = Telemetry(
+                jsonl_path=os.environ.get('VEH_AERO_TELEMETRY_JSONL') or None,
+                prometheus_path=os.environ.get('VEH_AERO_TELEMETRY_PROM') or None)
+        return _default_telemetry
@@ -1,121 +1,464 @@
-import matplotlib.pyplot as plt
+import cv2
+import hashlib
+import html
+import json
+import queue
+import threading
+from collections import OrderedDict
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 import numpy as np
 import io
 import streamlit as st
+from typing import Optional, Sequence, Tuple, Union
+
+from src.utils.feature_extraction import VehicleExtraction
+from src.utils.telemetry import get_telemetry, traced
+
+# Computational domain (m) and vehicle scale shared by the solver and the plots
+DOMAIN_X = (-5.0, 15.0)
+DOMAIN_Y = (-3.0, 3.0)
+VEHICLE_LENGTH = 8.0
+FREESTREAM_VELOCITY = 30.0
+
+# Rendered plots kept in memory, keyed by flow inputs and render settings
+RENDER_CACHE_SIZE = 64
+IMAGE_FORMATS = ('png', 'jpeg', 'webp')
+
+_render_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+# Idle Agg figures available for reuse; no pyplot global state is involved
+_figure_pool: "queue.LifoQueue[Figure]" = queue.LifoQueue(maxsize=8)
+
+
+def _resample_closed(points: np.ndarray, n: int) -> np.ndarray:
+    """Resample a closed polygon to ``n`` vertices evenly spaced by arc length"""
+    closed = np.vstack([points, points[:1]])
+    seg = np.hypot(*np.diff(closed, axis=0).T)
+    s = np.concatenate([[0.0], np.cumsum(seg)])
+    targets = np.linspace(0.0, s[-1], n, endpoint=False)
+    return np.column_stack([np.interp(targets, s, closed[:, 0]),
+                            np.interp(targets, s, closed[:, 1])])
+
+
+def _signed_area(points: np.ndarray) -> float:
+    """Shoelace area; positive for counter-clockwise polygons"""
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def _solve_source_panels(vertices: np.ndarray, v_inf: float) -> np.ndarray:
+    """
+    Constant-strength source panel method for a closed body in uniform flow.
+
+    Panel j runs from vertex j to vertex j+1. Returns complex per-panel
+    coefficients c_j such that the induced complex velocity u - iv at z is
+    sum_j c_j * log((z - z_j) / (z - z_{j+1})).
+    """
+    z1 = vertices[:, 0] + 1j * vertices[:, 1]
+    z2 = np.roll(z1, -1)
+    tangent = (z2 - z1) / np.abs(z2 - z1)
+    # Outward normal: tangent rotated -90 degrees for counter-clockwise bodies
+    normal = -1j * tangent if _signed_area(vertices) > 0 else 1j * tangent
+
+    # Control points sit just outside each panel midpoint to stay off the branch cut
+    control = 0.5 * (z1 + z2) + 1e-6 * np.abs(z2 - z1) * normal
+    w = np.conj(tangent) / (2 * np.pi) * np.log(
+        (control[:, None] - z1[None, :]) / (control[:, None] - z2[None, :]))
+
+    # Zero normal velocity at every control point: Re(w * n) is the normal component
+    influence = np.real(w * normal[:, None])
+    rhs = -v_inf * normal.real
+    sigma = np.linalg.lstsq(influence, rhs, rcond=None)[0]
+    return sigma * np.conj(tangent) / (2 * np.pi)
+
+
+def _induced_velocity(x: np.ndarray, y: np.ndarray, vertices: np.ndarray,
+                      coeffs: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """
+    Induced complex velocity u - iv at flat arrays of points.
+
+    log((z - z_j)/(z - z_{j+1})) is split into a real part built from one
+    log-distance per vertex, shared by the two panels that meet there, and the
+    angle the panel subtends, which has no branch cut off the panel itself.
+    Evaluated in float32 chunks to bound memory.
+    """
+    xk = vertices[:, 0].astype(np.float32)
+    yk = vertices[:, 1].astype(np.float32)
+    # sum_j c_j (l_j - l_{j+1}) / 2 == sum_k l_k (c_k - c_{k-1}) / 2 with l = log|z - z_k|^2
+    d = 0.5 * (coeffs - np.roll(coeffs, 1))
+    d_re, d_im = d.real.astype(np.float32), d.imag.astype(np.float32)
+    c_re, c_im = coeffs.real.astype(np.float32), coeffs.imag.astype(np.float32)
+
+    w = np.empty(x.size, dtype=np.complex64)
+    for start in range(0, x.size, chunk):
+        dx = x[start:start + chunk, None].astype(np.float32) - xk
+        dy = y[start:start + chunk, None].astype(np.float32) - yk
+        log_r2 = np.log(np.maximum(dx * dx + dy * dy, 1e-12))
+        dx2 = np.roll(dx, -1, axis=1)
+        dy2 = np.roll(dy, -1, axis=1)
+        theta = np.arctan2(dy * dx2 - dx * dy2, dx * dx2 + dy * dy2)
+        w[start:start + chunk].real = log_r2 @ d_re - theta @ c_im
+        w[start:start + chunk].imag = log_r2 @ d_im + theta @ c_re
+    return w
+
+
+def _bilinear(values: np.ndarray, xc: np.ndarray, yc: np.ndarray,
+              px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    """
+    Bilinearly sample a field on the (yc, xc) grid at the points (px, py),
+    clamped to the grid's edges. The coordinates broadcast, so
+    ``px=x[None, :], py=y[:, None]`` resamples onto a whole (y, x) grid.
+    """
+    fx = np.clip((px - xc[0]) / (xc[1] - xc[0]), 0, xc.size - 1)
+    fy = np.clip((py - yc[0]) / (yc[1] - yc[0]), 0, yc.size - 1)
+    i = np.minimum(fx.astype(int), xc.size - 2)
+    j = np.minimum(fy.astype(int), yc.size - 2)
+    wx, wy = fx - i, fy - j
+    top = values[j, i] * (1 - wx) + values[j, i + 1] * wx
+    bottom = values[j + 1, i] * (1 - wx) + values[j + 1, i + 1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def _acquire_figure(figsize: Tuple[float, float], dpi: float) -> Figure:
+    """Take an idle figure from the pool (or create one) sized for this render"""
+    try:
+        fig = _figure_pool.get_nowait()
+    except queue.Empty:
+        fig = Figure()
+        FigureCanvasAgg(fig)
+    fig.set_size_inches(*figsize)
+    fig.set_dpi(dpi)
+    return fig
+
+
+def _release_figure(fig: Figure):
+    """Clear a figure and return it to the pool, dropping it if the pool is full"""
+    fig.clear()
+    try:
+        _figure_pool.put_nowait(fig)
+    except queue.Full:
+        pass
+
+
+def _trace_streamlines(x: np.ndarray, y: np.ndarray, U: np.ndarray, V: np.ndarray,
+                       n_seeds: int = 40) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trace streamlines from the inlet edge with vectorized midpoint (RK2) steps.
+
+    All seed lines advance together, one grid cell of arc length per step.
+    Lines stop when they leave the domain or reach still air (the body
+    interior). Returns (n_seeds, n_steps, 2) points, NaN after a line stops,
+    and the speed at each point.
+    """
+    dx, dy = x[1] - x[0], y[1] - y[0]
+    step = max(dx, dy)
+    n_steps = int(np.ceil((x[-1] - x[0]) / step * 1.5))
+
+    # Velocity as u + iv, so each sample interpolates both components at once
+    W = U + 1j * V
+
+    def velocity(px, py):
+        w = _bilinear(W, x, y, px, py)
+        return w.real, w.imag
+
+    px = np.full(n_seeds, x[0])
+    py = np.linspace(y[0], y[-1], n_seeds + 2)[1:-1]
+    points = np.full((n_seeds, n_steps, 2), np.nan)
+    speeds = np.full((n_seeds, n_steps), np.nan)
+    alive = np.ones(n_seeds, dtype=bool)
+    min_speed = 1e-3 * FREESTREAM_VELOCITY
+
+    for k in range(n_steps):
+        u, v = velocity(px, py)
+        speed = np.hypot(u, v)
+        alive &= (speed > min_speed) & (px >= x[0]) & (px <= x[-1]) & (py >= y[0]) & (py <= y[-1])
+        if not alive.any():
+            break
+        points[alive, k, 0] = px[alive]
+        points[alive, k, 1] = py[alive]
+        speeds[alive, k] = speed[alive]
+
+        # Midpoint step along the unit tangent, so each step covers one cell
+        safe = np.maximum(speed, min_speed)
+        mx = px + 0.5 * step * u / safe
+        my = py + 0.5 * step * v / safe
+        mu, mv = velocity(mx, my)
+        msafe = np.maximum(np.hypot(mu, mv), min_speed)
+        px = np.where(alive, px + step * mu / msafe, px)
+        py = np.where(alive, py + step * mv / msafe, py)
+
+    return points, speeds
+
 
 class FlowVisualization:
-    def __init__(self):
-        """Initialize visualization setup using matplotlib instead of VTK for thread safety"""
-        self.fig = plt.figure(figsize=(10, 8))
-        
-    def generate_flow_data(self, features: dict, is_aerodynamic: bool = False):
-        """Generate flow field data for visualization"""
-        # Create computational domain
-        nx, ny = 100, 60  # Using 2D for simplicity and better performance
-        x = np.linspace(-5, 15, nx)
-        y = np.linspace(-3, 3, ny)
+    def __init__(self, nx: int = 400, ny: int = 240, n_panels: int = 96, coarse_factor: int = 4,
+                 dpi: float = 100, output_size: Optional[Tuple[int, int]] = None,
+                 image_format: str = 'png', quality: int = 85):
+        """
+        Flow solver and renderer.
+
+        Plots are drawn with matplotlib's object-oriented Agg API (thread safe,
+        no pyplot state). ``output_size`` in pixels overrides the default
+        15x6 inch figure at ``dpi``; ``image_format`` is png, jpeg or webp, with
+        ``quality`` applied to the lossy formats.
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.nx = nx
+        self.ny = ny
+        self.n_panels = n_panels
+        self.coarse_factor = coarse_factor
+        self.dpi = dpi
+        self.figsize = (output_size[0] / dpi, output_size[1] / dpi) if output_size else (15, 6)
+        self.image_format = image_format
+        self.quality = quality
+
+    def body_outline(self, features: dict, is_aerodynamic: bool = False,
+                     contour: np.ndarray = None) -> np.ndarray:
+        """
+        Vehicle silhouette in domain coordinates as an (n_panels, 2) closed polygon.
+
+        Uses the extracted image contour when available (falling back to its convex
+        hull when the contour is an open edge fragment), otherwise a synthetic body
+        built from the aspect ratio.
+        """
+        if contour is not None and len(contour) >= 3:
+            points = contour.reshape(-1, 2).astype(float)
+            hull = cv2.convexHull(contour).reshape(-1, 2).astype(float)
+            if abs(_signed_area(points)) < 0.5 * abs(_signed_area(hull)):
+                points = hull
+            x_min, y_min = points.min(axis=0)
+            x_max, y_max = points.max(axis=0)
+            scale = VEHICLE_LENGTH / max(x_max - x_min, 1.0)
+            # Image y grows downwards; flip and centre the body on the origin
+            x = (points[:, 0] - x_min) * scale - VEHICLE_LENGTH / 2
+            y = (y_max - points[:, 1]) * scale - (y_max - y_min) * scale / 2
+            return _resample_closed(np.column_stack([x, y]), self.n_panels)
+
+        aspect_ratio = float(np.asarray(features.get('aspect_ratio', 2.5) or 2.5).item())
+        height = VEHICLE_LENGTH / max(aspect_ratio, 1.0)
+        # Superellipse: rounded for aerodynamic designs, boxier otherwise
+        exponent = 2.0 if is_aerodynamic else 4.0
+        t = np.linspace(0, 2 * np.pi, self.n_panels, endpoint=False)
+        x = VEHICLE_LENGTH / 2 * np.sign(np.cos(t)) * np.abs(np.cos(t)) ** (2 / exponent)
+        y = height / 2 * np.sign(np.sin(t)) * np.abs(np.sin(t)) ** (2 / exponent)
+        return np.column_stack([x, y])
+
+    @traced('generate_flow_data')
+    def generate_flow_data(self, features: dict, is_aerodynamic: bool = False,
+                           contour: np.ndarray = None):
+        """
+        Generate flow field data for visualization.
+
+        Solves 2-D potential flow around the vehicle silhouette with a source
+        panel method. The smooth far field is evaluated on a grid
+        ``coarse_factor`` times coarser and interpolated; points in a band
+        around the body, where gradients are steep, are evaluated exactly.
+        Returns X, Y, U, V and the pressure coefficient P on an ``nx`` x ``ny``
+        grid, with the body interior masked out.
+        """
+        x = np.linspace(*DOMAIN_X, self.nx)
+        y = np.linspace(*DOMAIN_Y, self.ny)
         X, Y = np.meshgrid(x, y)
 
-        # Vehicle parameters
-        length = 8
-        width = 2
-        height = 1.5 * (1/features.get('aspect_ratio', 1.5))
-        nose_angle = features.get('nose_angle', 30)
-
-        # Calculate flow field variables
-        U = np.ones_like(X) * 30  # Base velocity
-        V = np.zeros_like(Y)
-        P = np.zeros_like(X)
-
-        # Modify flow around vehicle
-        for i in range(nx):
-            for j in range(ny):
-                dx = X[j,i]
-                dy = Y[j,i]
-                dist = np.sqrt(dy**2)
-
-                if -length/2 <= dx <= length/2:
-                    if dist < width:
-                        P[j,i] = 0.5 * (1 - (dist/width)**2)
-                        
-                        if is_aerodynamic:
-                            U[j,i] *= 1.3
-                            V[j,i] = -0.3 * dy * np.exp(-dist)
-                        else:
-                            U[j,i] *= 0.8
-                            V[j,i] = -0.5 * dy * np.exp(-dist)
+        outline = self.body_outline(features, is_aerodynamic, contour)
+        coeffs = _solve_source_panels(outline, FREESTREAM_VELOCITY)
+
+        # Rasterize the body onto the grid (rows follow y, columns follow x)
+        grid_points = np.column_stack([(outline[:, 0] - x[0]) / (x[1] - x[0]),
+                                       (outline[:, 1] - y[0]) / (y[1] - y[0])])
+        mask = np.zeros(X.shape, dtype=np.uint8)
+        cv2.fillPoly(mask, [np.round(grid_points * 16).astype(np.int32)], 1, shift=4)
+        inside = mask.astype(bool)
+
+        # Far field: exact on a coarse grid, then interpolated
+        factor = max(1, self.coarse_factor)
+        xc = np.linspace(*DOMAIN_X, max(2, self.nx // factor))
+        yc = np.linspace(*DOMAIN_Y, max(2, self.ny // factor))
+        Xc, Yc = np.meshgrid(xc, yc)
+        W = _bilinear(_induced_velocity(Xc.ravel(), Yc.ravel(), outline, coeffs).reshape(Xc.shape),
+                      xc, yc, x[None, :], y[:, None])
+
+        # Near field: exact within two coarse cells of the body
+        if factor > 1:
+            radius = 2 * factor
+            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+            band = cv2.dilate(mask, kernel).astype(bool) & ~inside
+            W[band] = _induced_velocity(X[band], Y[band], outline, coeffs)
+
+        U = FREESTREAM_VELOCITY + W.real.astype(np.float64)
+        V = -W.imag.astype(np.float64)
+        P = 1 - (U ** 2 + V ** 2) / FREESTREAM_VELOCITY ** 2
+
+        # No flow inside the body
+        U[inside] = 0.0
+        V[inside] = 0.0
+        P[inside] = np.nan
 
         return X, Y, U, V, P
 
-    def create_visualization(self, features: dict, is_aerodynamic: bool = False):
-        """Create matplotlib visualization"""
-        X, Y, U, V, P = self.generate_flow_data(features, is_aerodynamic)
-        
-        # Clear previous plot
-        plt.clf()
-        
-        # Create figure with two subplots
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # Plot 1: Pressure distribution
-        pressure = ax1.contourf(X, Y, P, levels=20, cmap='RdBu_r')
-        ax1.set_title('Pressure Distribution')
-        plt.colorbar(pressure, ax=ax1, label='Pressure')
-        
-        # Plot 2: Flow streamlines
-        speed = np.sqrt(U**2 + V**2)
-        streamplot = ax2.streamplot(X, Y, U, V, color=speed, cmap='viridis',
-                                  density=2, linewidth=1, arrowsize=1)
-        ax2.set_title('Flow Streamlines')
-        plt.colorbar(streamplot.lines, ax=ax2, label='Velocity')
+    def _render_key(self, features: dict, is_aerodynamic: bool, contour: Optional[np.ndarray],
+                    layers: Tuple[bool, bool] = (True, True)) -> str:
+        """Cache key covering the flow inputs and every solver and render setting"""
+        plain = {key: float(np.asarray(value).item()) for key, value in (features or {}).items()}
+        digest = hashlib.sha1(json.dumps({
+            'features': plain,
+            'aero': bool(is_aerodynamic),
+            'solver': [self.nx, self.ny, self.n_panels, self.coarse_factor],
+            'render': [self.dpi, list(self.figsize), self.image_format, self.quality, list(layers)]
+        }, sort_keys=True).encode())
+        if contour is not None:
+            digest.update(np.ascontiguousarray(contour).data)
+        return digest.hexdigest()
+
+    @traced('create_visualization')
+    def create_visualization(self, features: dict, is_aerodynamic: bool = False,
+                             contour: np.ndarray = None, show_pressure: bool = True,
+                             show_streamlines: bool = True):
+        """Create matplotlib visualization of the enabled plots (at least one)"""
+        if not (show_pressure or show_streamlines):
+            raise ValueError("Enable the pressure or the streamline plot")
+        key = self._render_key(features, is_aerodynamic, contour, (show_pressure, show_streamlines))
+        with _render_cache_lock:
+            cached = _render_cache.get(key)
+            if cached is not None:
+                _render_cache.move_to_end(key)
+                get_telemetry().increment('cache_hits_total', cache='flow_render')
+                return io.BytesIO(cached)
+
+        X, Y, U, V, P = self.generate_flow_data(features, is_aerodynamic, contour)
         
-        # Set labels
-        for ax in [ax1, ax2]:
-            ax.set_xlabel('Length (m)')
-            ax.set_ylabel('Height (m)')
+        # Create figure with one subplot per enabled plot
+        fig = _acquire_figure(self.figsize, self.dpi)
+        try:
+            axes = list(fig.subplots(1, show_pressure + show_streamlines, squeeze=False)[0])
             
-        # Add vehicle outline
-        vehicle_x = np.linspace(-4, 4, 100)
-        if is_aerodynamic:
-            vehicle_y = 0.5 * np.sin(np.pi * vehicle_x / 8)
-        else:
-            vehicle_y = 0.8 * np.ones_like(vehicle_x)
-        
-        for ax in [ax1, ax2]:
-            ax.plot(vehicle_x, vehicle_y, 'k-', linewidth=2, label='Vehicle')
-            ax.plot(vehicle_x, -vehicle_y, 'k-', linewidth=2)
-        
-        plt.tight_layout()
-        
-        # Convert plot to image
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        buf.seek(0)
-        plt.close()
+            # Plot 1: Pressure distribution
+            if show_pressure:
+                ax1 = axes[0]
+                # Potential flow spikes at sharp corners; clip the scale to the useful Cp range
+                pressure = ax1.contourf(X, Y, P, levels=np.linspace(-3, 1, 21), cmap='RdBu_r', extend='min')
+                ax1.set_title('Pressure Distribution')
+                fig.colorbar(pressure, ax=ax1, label='Pressure coefficient (Cp)')
+            
+            # Plot 2: Flow streamlines, traced in NumPy and drawn as one LineCollection
+            if show_streamlines:
+                self._plot_streamlines(fig, axes[-1], X, Y, U, V)
+            
+            # Set labels
+            for ax in axes:
+                ax.set_xlabel('Length (m)')
+                ax.set_ylabel('Height (m)')
+                
+            # Add vehicle outline
+            outline = self.body_outline(features, is_aerodynamic, contour)
+            outline = np.vstack([outline, outline[:1]])
+            
+            for ax in axes:
+                ax.fill(outline[:, 0], outline[:, 1], color='lightgray', zorder=2)
+                ax.plot(outline[:, 0], outline[:, 1], 'k-', linewidth=2, label='Vehicle', zorder=3)
+            
+            # Fixed margins: tight_layout would cost a full extra draw per render
+            fig.subplots_adjust(left=0.05, right=0.98, bottom=0.1, top=0.92, wspace=0.15)
+            
+            # Convert plot to image
+            buf = io.BytesIO()
+            pil_kwargs = {'quality': self.quality} if self.image_format != 'png' else None
+            fig.savefig(buf, format=self.image_format, dpi=self.dpi, pil_kwargs=pil_kwargs)
+        finally:
+            _release_figure(fig)
+
+        data = buf.getvalue()
+        with _render_cache_lock:
+            _render_cache[key] = data
+            while len(_render_cache) > RENDER_CACHE_SIZE:
+                _render_cache.popitem(last=False)
         
-        return buf
+        return io.BytesIO(data)
+
+    def _plot_streamlines(self, fig: Figure, ax, X: np.ndarray, Y: np.ndarray,
+                          U: np.ndarray, V: np.ndarray):
+        """Streamlines traced in NumPy and drawn as one LineCollection, with direction arrows"""
+        points, speeds = _trace_streamlines(X[0], Y[:, 0], U, V)
+        segments = np.stack([points[:, :-1], points[:, 1:]], axis=2).reshape(-1, 2, 2)
+        segment_speed = speeds[:, :-1].ravel()
+        valid = np.isfinite(segments).all(axis=(1, 2))
+        lines = LineCollection(segments[valid], cmap='viridis', linewidths=1)
+        lines.set_array(segment_speed[valid])
+        ax.add_collection(lines)
+        ax.set_xlim(X[0, 0], X[0, -1])
+        ax.set_ylim(Y[0, 0], Y[-1, 0])
+
+        # Direction arrows at a few evenly spaced points along each line
+        arrows = points[:, ::max(1, points.shape[1] // 6)][:, 1:]
+        ax_x, ax_y = arrows[..., 0].ravel(), arrows[..., 1].ravel()
+        keep = np.isfinite(ax_x)
+        w = _bilinear(U + 1j * V, X[0], Y[:, 0], ax_x[keep], ax_y[keep])
+        au, av = w.real, w.imag
+        norm = np.maximum(np.hypot(au, av), 1e-9)
+        ax.quiver(ax_x[keep], ax_y[keep], au / norm, av / norm, color='k',
+                  angles='xy', scale=60, width=0.003, headwidth=5, zorder=1)
+        ax.set_title('Flow Streamlines')
+        fig.colorbar(lines, ax=ax, label='Velocity')
     
 
-def create_flow_visualization(family_features: dict, aero_features: dict):
-    """Create and display flow visualization in Streamlit"""
+def _as_flow_inputs(source: Union[VehicleExtraction, dict]):
+    """Accept either a feature dict or a shared extraction result (which adds the contour)"""
+    if isinstance(source, VehicleExtraction):
+        return source.features, source.main_contour
+    return source, None
+
+
+# Heading colours for the flow plots, cycled across designs
+HEADING_COLORS = ('#B19CD9', '#4CAF50', '#FFA500', '#3498DB', '#E57373')
+# Flow plots per row; each needs about half the page width to stay legible
+FLOW_COLUMNS = 2
+
+
+def create_flow_visualization(vehicles: Sequence[Tuple[str, Union[VehicleExtraction, dict]]]):
+    """
+    Create and display flow visualization in Streamlit for labelled vehicles.
+
+    In interactive mode the flow fields are sent to the browser and drawn
+    there; otherwise the plots are rendered to images on the server.
+    """
+    # Add interactive controls in sidebar
+    st.sidebar.markdown("### Visualization Controls")
+    interactive = st.sidebar.checkbox(
+        "Interactive flow plots", True,
+        help="Draw the flow in the browser: toggle layers, zoom and hover without a rerun")
+    show_pressure = st.sidebar.checkbox("Show Pressure Distribution", True)
+    show_streamlines = st.sidebar.checkbox("Show Streamlines", True)
+
     st.markdown("## Vehicle Flow Analysis")
     
     viz = FlowVisualization()
+    if interactive:
+        from src.visual.interactive_flow import flow_payload, render_interactive_flow
+
+        def show(features, contour):
+            render_interactive_flow(flow_payload(viz, features, False, contour),
+                                    show_pressure, show_streamlines)
+    elif show_pressure or show_streamlines:
+        def show(features, contour):
+            st.image(viz.create_visualization(features, False, contour,
+                                              show_pressure, show_streamlines))
+    else:
+        def show(features, contour):
+            st.info("Enable the pressure distribution or streamlines in the sidebar.")
     
-    # Create two columns for visualization
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown('<div style="color: #B19CD9; font-size: 20px;">Initial Vehicle Flow Pattern</div>', 
-                   unsafe_allow_html=True)
-        family_viz = viz.create_visualization(family_features, False)
-        st.image(family_viz)
-        
-    with col2:
-        st.markdown('<div style="color: #4CAF50; font-size: 20px;">Aerodynamic Vehicle Flow Pattern</div>', 
-                   unsafe_allow_html=True)
-        aero_viz = viz.create_visualization(aero_features, True)
-        st.image(aero_viz)
+    # Lay the plots out FLOW_COLUMNS to a row
+    for start in range(0, len(vehicles), FLOW_COLUMNS):
+        cols = st.columns(FLOW_COLUMNS)
+        for offset, (col, (label, source)) in enumerate(zip(cols, vehicles[start:start + FLOW_COLUMNS])):
+            color = HEADING_COLORS[(start + offset) % len(HEADING_COLORS)]
+            with col:
+                st.markdown(f'<div style="color: {color}; font-size: 20px;">{html.escape(label)} Flow Pattern</div>',
+                            unsafe_allow_html=True)
+                show(*_as_flow_inputs(source))
 
     # Add explanation
     st.markdown("""
@@ -132,12 +475,7 @@ def create_flow_visualization(family_features: dict, aero_features: dict):
     3. **Wake Region**: Area behind the vehicle
     4. **Stagnation Points**: Areas of high pressure
     
-    #### Key Differences:
-    - Initial Vehicle: Shows more turbulent flow and larger wake region
-    - Aerodynamic Vehicle: Exhibits smoother flow lines and optimized pressure distribution
+    #### Comparing Designs:
+    - A smaller low-pressure wake behind the body means less pressure drag
+    - Smoother, less deflected streamlines indicate cleaner flow attachment
     """)
-
-    # Add interactive controls in sidebar
-    st.sidebar.markdown("### Visualization Controls")
-    show_pressure = st.sidebar.checkbox("Show Pressure Distribution", True)
-    show_streamlines = st.sidebar.checkbox("Show Streamlines", True)   
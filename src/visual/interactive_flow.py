@@ -0,0 +1,405 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+from matplotlib import colormaps
+
+from src.visual.flow_visualization import FREESTREAM_VELOCITY, FlowVisualization
+from src.utils.telemetry import get_telemetry, traced
+
+# Columns of the flow grid sent to the browser; rows are strided by the same step
+INTERACTIVE_COLUMNS = 200
+# Pressure colour scale, matching the server-side contour plot
+CP_RANGE = (-3.0, 1.0)
+COMPONENT_HEIGHT = 360
+
+# Packed payloads kept in memory, keyed like the server-side render cache
+PAYLOAD_CACHE_SIZE = 64
+
+_payload_cache: "OrderedDict[str, str]" = OrderedDict()
+_payload_cache_lock = threading.Lock()
+
+
+def _pack(values: np.ndarray) -> str:
+    """Little-endian float16 bytes, base64 encoded"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype='<f2').tobytes()).decode('ascii')
+
+
+def _lut(name: str) -> str:
+    """256-entry RGB lookup table for a matplotlib colormap, base64 encoded"""
+    rgb = colormaps[name](np.linspace(0, 1, 256))[:, :3]
+    return base64.b64encode((rgb * 255).round().astype(np.uint8).tobytes()).decode('ascii')
+
+
+def downsample_flow(X: np.ndarray, Y: np.ndarray, U: np.ndarray, V: np.ndarray, P: np.ndarray,
+                    max_columns: int = INTERACTIVE_COLUMNS):
+    """
+    Stride the flow grid so it has at most ``max_columns`` columns.
+
+    Striding keeps every sample an exact solver value (and the body mask
+    sharp); rows use the same step so cells keep their shape.
+    """
+    step = max(1, -(-X.shape[1] // max_columns))
+    return tuple(F[::step, ::step] for F in (X, Y, U, V, P))
+
+
+@traced('flow_payload')
+def flow_payload(viz: FlowVisualization, features: dict, is_aerodynamic: bool = False,
+                 contour: np.ndarray = None, max_columns: int = INTERACTIVE_COLUMNS) -> str:
+    """
+    JSON payload for the in-browser flow plot.
+
+    Only U and V are sent, as float16 with NaN inside the body: the grid is
+    regular, so X and Y follow from its extent and shape, and the browser
+    derives Cp and speed from the velocities.
+    """
+    key = f"{viz._render_key(features, is_aerodynamic, contour)}:{max_columns}"
+    with _payload_cache_lock:
+        cached = _payload_cache.get(key)
+        if cached is not None:
+            _payload_cache.move_to_end(key)
+            get_telemetry().increment('cache_hits_total', cache='flow_payload')
+            return cached
+
+    X, Y, U, V, P = downsample_flow(*viz.generate_flow_data(features, is_aerodynamic, contour),
+                                    max_columns=max_columns)
+    inside = np.isnan(P)
+    outline = viz.body_outline(features, is_aerodynamic, contour)
+
+    payload = json.dumps({
+        'nx': int(X.shape[1]),
+        'ny': int(X.shape[0]),
+        'x': [float(X[0, 0]), float(X[0, -1])],
+        'y': [float(Y[0, 0]), float(Y[-1, 0])],
+        'vInf': FREESTREAM_VELOCITY,
+        'u': _pack(np.where(inside, np.nan, U)),
+        'v': _pack(np.where(inside, np.nan, V)),
+        'outline': np.round(outline, 3).tolist(),
+        'cpRange': list(CP_RANGE),
+        'pressureLut': _lut('RdBu_r'),
+        'speedLut': _lut('viridis'),
+    })
+    with _payload_cache_lock:
+        _payload_cache[key] = payload
+        while len(_payload_cache) > PAYLOAD_CACHE_SIZE:
+            _payload_cache.popitem(last=False)
+    return payload
+
+
+def interactive_flow_html(payload: str, show_pressure: bool = True,
+                          show_streamlines: bool = True) -> str:
+    """Self-contained HTML page drawing a flow payload on a canvas"""
+    options = json.dumps({'pressure': bool(show_pressure), 'streamlines': bool(show_streamlines)})
+    # The payload is embedded in a <script> block
+    return _TEMPLATE.replace('__OPTIONS__', options).replace('__DATA__', payload.replace('</', '<\\/'))
+
+
+def render_interactive_flow(payload: str, show_pressure: bool = True, show_streamlines: bool = True,
+                            height: int = COMPONENT_HEIGHT):
+    """
+    Display a flow payload in the page. Layer toggles, zoom (wheel, drag to
+    pan, double-click to reset) and the hover readout run in the browser
+    without a rerun.
+    """
+    html = interactive_flow_html(payload, show_pressure, show_streamlines)
+    if hasattr(st, 'iframe'):
+        st.iframe(html, height=height)
+    else:
+        # Streamlit releases before st.iframe
+        components.html(html, height=height)
+
+
+_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<style>
+  html, body { margin: 0; height: 100%; overflow: hidden; }
+  body { display: flex; flex-direction: column; font-family: "Source Sans Pro", sans-serif;
+         font-size: 14px; color: #31333F; }
+  .controls { display: flex; gap: 14px; align-items: center; flex-wrap: wrap; padding: 2px 0 6px; }
+  .legend { display: flex; align-items: center; gap: 4px; font-size: 12px; color: #555; }
+  .legend canvas { width: 100px; height: 10px; }
+  .readout { margin-left: auto; font-size: 12px; color: #555; font-variant-numeric: tabular-nums; }
+  #plot { flex: 1; min-height: 0; width: 100%; display: block; cursor: crosshair; }
+</style>
+</head>
+<body>
+<div class="controls">
+  <label><input type="checkbox" id="pressure"> Pressure</label>
+  <label><input type="checkbox" id="streamlines"> Streamlines</label>
+  <button id="reset">Reset view</button>
+  <span class="legend">Cp <span id="cp-min"></span><canvas id="legend" width="256" height="1"></canvas><span id="cp-max"></span></span>
+  <span class="readout" id="readout"></span>
+</div>
+<canvas id="plot"></canvas>
+<script>
+const DATA = __DATA__;
+const OPTIONS = __OPTIONS__;
+
+function decodeBytes(text) {
+  const binary = atob(text);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  return bytes;
+}
+
+function decodeHalf(text) {
+  const view = new DataView(decodeBytes(text).buffer);
+  const out = new Float32Array(view.byteLength / 2);
+  for (let i = 0; i < out.length; i++) {
+    const h = view.getUint16(2 * i, true);
+    const sign = h & 0x8000 ? -1 : 1;
+    const exponent = (h >> 10) & 0x1f;
+    const fraction = h & 0x3ff;
+    if (exponent === 0) out[i] = sign * fraction * Math.pow(2, -24);
+    else if (exponent === 31) out[i] = fraction ? NaN : sign * Infinity;
+    else out[i] = sign * (1 + fraction / 1024) * Math.pow(2, exponent - 15);
+  }
+  return out;
+}
+
+const nx = DATA.nx, ny = DATA.ny;
+const [x0, x1] = DATA.x, [y0, y1] = DATA.y;
+const dx = (x1 - x0) / (nx - 1), dy = (y1 - y0) / (ny - 1);
+const u = decodeHalf(DATA.u), v = decodeHalf(DATA.v);
+const pressureLut = decodeBytes(DATA.pressureLut), speedLut = decodeBytes(DATA.speedLut);
+const [cpLo, cpHi] = DATA.cpRange;
+
+const speed = new Float32Array(nx * ny), cp = new Float32Array(nx * ny);
+for (let k = 0; k < speed.length; k++) {
+  speed[k] = Math.hypot(u[k], v[k]);
+  cp[k] = 1 - (speed[k] * speed[k]) / (DATA.vInf * DATA.vInf);
+}
+
+function lutColor(lut, t) {
+  const i = 3 * Math.max(0, Math.min(255, Math.round(t * 255)));
+  return [lut[i], lut[i + 1], lut[i + 2]];
+}
+
+// Pressure field as an nx x ny image, top row = highest y; the body is transparent
+const field = document.createElement('canvas');
+field.width = nx;
+field.height = ny;
+(function () {
+  const ctx = field.getContext('2d');
+  const image = ctx.createImageData(nx, ny);
+  for (let j = 0; j < ny; j++) {
+    for (let i = 0; i < nx; i++) {
+      const value = cp[j * nx + i];
+      const p = 4 * ((ny - 1 - j) * nx + i);
+      if (Number.isNaN(value)) continue;
+      const [r, g, b] = lutColor(pressureLut, (value - cpLo) / (cpHi - cpLo));
+      image.data[p] = r; image.data[p + 1] = g; image.data[p + 2] = b; image.data[p + 3] = 255;
+    }
+  }
+  ctx.putImageData(image, 0, 0);
+})();
+
+// Still air inside the body for tracing, as on the server
+const uFlow = u.map((value) => Number.isNaN(value) ? 0 : value);
+const vFlow = v.map((value) => Number.isNaN(value) ? 0 : value);
+
+function velocity(px, py) {
+  const fx = Math.min(Math.max((px - x0) / dx, 0), nx - 1.001);
+  const fy = Math.min(Math.max((py - y0) / dy, 0), ny - 1.001);
+  const i = Math.floor(fx), j = Math.floor(fy), wx = fx - i, wy = fy - j;
+  const k = j * nx + i;
+  const interp = (F) => (F[k] * (1 - wx) + F[k + 1] * wx) * (1 - wy)
+                      + (F[k + nx] * (1 - wx) + F[k + nx + 1] * wx) * wy;
+  return [interp(uFlow), interp(vFlow)];
+}
+
+// Streamlines from the inlet edge: midpoint steps of one cell along the unit
+// tangent, stopping outside the domain or in still air (the body)
+const N_SEEDS = 40;
+const step = Math.max(dx, dy);
+const nSteps = Math.ceil((x1 - x0) / step * 1.5);
+const minSpeed = 1e-3 * DATA.vInf;
+const lines = [];
+let speedLo = Infinity, speedHi = -Infinity;
+for (let s = 0; s < N_SEEDS; s++) {
+  let px = x0, py = y0 + (y1 - y0) * (s + 1) / (N_SEEDS + 1);
+  const points = [], speeds = [];
+  for (let k = 0; k < nSteps; k++) {
+    const [pu, pv] = velocity(px, py);
+    const sp = Math.hypot(pu, pv);
+    if (!(sp > minSpeed) || px < x0 || px > x1 || py < y0 || py > y1) break;
+    points.push(px, py);
+    speeds.push(sp);
+    speedLo = Math.min(speedLo, sp);
+    speedHi = Math.max(speedHi, sp);
+    const [mu, mv] = velocity(px + 0.5 * step * pu / sp, py + 0.5 * step * pv / sp);
+    const ms = Math.max(Math.hypot(mu, mv), minSpeed);
+    px += step * mu / ms;
+    py += step * mv / ms;
+  }
+  lines.push({points, speeds});
+}
+
+const canvas = document.getElementById('plot');
+const ctx = canvas.getContext('2d');
+const readout = document.getElementById('readout');
+const layers = {pressure: document.getElementById('pressure'),
+                streamlines: document.getElementById('streamlines')};
+layers.pressure.checked = OPTIONS.pressure;
+layers.streamlines.checked = OPTIONS.streamlines;
+
+let view = {x0, x1, y0, y1};
+let width = 0, height = 0, dpr = 1;
+
+function sx(x) { return (x - view.x0) / (view.x1 - view.x0) * width; }
+function sy(y) { return (view.y1 - y) / (view.y1 - view.y0) * height; }
+function domainX(px) { return view.x0 + px / width * (view.x1 - view.x0); }
+function domainY(py) { return view.y1 - py / height * (view.y1 - view.y0); }
+
+function niceStep(range) {
+  const raw = range / 6, base = Math.pow(10, Math.floor(Math.log10(raw)));
+  return base * (raw / base >= 5 ? 5 : raw / base >= 2 ? 2 : 1);
+}
+
+function drawStreamlines() {
+  // One path per colour bin keeps the stroke count small
+  const BINS = 32, bins = Array.from({length: BINS}, () => new Path2D());
+  const arrows = [], arrowEvery = Math.max(1, Math.floor(nSteps / 6));
+  for (const {points, speeds} of lines) {
+    for (let k = 1; k < speeds.length; k++) {
+      const t = (speeds[k - 1] - speedLo) / Math.max(speedHi - speedLo, 1e-9);
+      const path = bins[Math.min(BINS - 1, Math.floor(t * BINS))];
+      path.moveTo(sx(points[2 * k - 2]), sy(points[2 * k - 1]));
+      path.lineTo(sx(points[2 * k]), sy(points[2 * k + 1]));
+      if (k % arrowEvery === 0) arrows.push([points[2 * k], points[2 * k + 1]]);
+    }
+  }
+  ctx.lineWidth = dpr;
+  bins.forEach((path, b) => {
+    const [r, g, bl] = lutColor(speedLut, (b + 0.5) / BINS);
+    ctx.strokeStyle = `rgb(${r},${g},${bl})`;
+    ctx.stroke(path);
+  });
+  ctx.fillStyle = '#000';
+  for (const [ax, ay] of arrows) {
+    const [au, av] = velocity(ax, ay);
+    const angle = Math.atan2(-av / (view.y1 - view.y0) * height, au / (view.x1 - view.x0) * width);
+    ctx.save();
+    ctx.translate(sx(ax), sy(ay));
+    ctx.rotate(angle);
+    ctx.beginPath();
+    ctx.moveTo(4 * dpr, 0);
+    ctx.lineTo(-3 * dpr, -3 * dpr);
+    ctx.lineTo(-3 * dpr, 3 * dpr);
+    ctx.fill();
+    ctx.restore();
+  }
+}
+
+function drawAxes() {
+  ctx.strokeStyle = '#888';
+  ctx.lineWidth = dpr;
+  ctx.strokeRect(0, 0, width, height);
+  ctx.fillStyle = '#444';
+  ctx.font = `${11 * dpr}px sans-serif`;
+  const xStep = niceStep(view.x1 - view.x0), yStep = niceStep(view.y1 - view.y0);
+  ctx.textBaseline = 'bottom';
+  for (let x = Math.ceil(view.x0 / xStep) * xStep; x <= view.x1; x += xStep) {
+    ctx.fillRect(sx(x), height - 4 * dpr, dpr, 4 * dpr);
+    ctx.fillText(`${+x.toFixed(2)}`, sx(x) + 2 * dpr, height - 4 * dpr);
+  }
+  ctx.textBaseline = 'middle';
+  for (let y = Math.ceil(view.y0 / yStep) * yStep; y <= view.y1; y += yStep) {
+    ctx.fillRect(0, sy(y), 4 * dpr, dpr);
+    ctx.fillText(`${+y.toFixed(2)}`, 6 * dpr, sy(y));
+  }
+  ctx.textBaseline = 'top';
+  ctx.fillText('m', width - 14 * dpr, 4 * dpr);
+}
+
+function draw() {
+  ctx.clearRect(0, 0, width, height);
+  ctx.fillStyle = '#fff';
+  ctx.fillRect(0, 0, width, height);
+  if (layers.pressure.checked) {
+    ctx.imageSmoothingEnabled = true;
+    // Pixel centres sit on the grid points
+    const left = sx(x0 - dx / 2), top = sy(y1 + dy / 2);
+    ctx.drawImage(field, left, top, sx(x1 + dx / 2) - left, sy(y0 - dy / 2) - top);
+  }
+  if (layers.streamlines.checked) drawStreamlines();
+  const body = new Path2D();
+  DATA.outline.forEach(([x, y], k) => k ? body.lineTo(sx(x), sy(y)) : body.moveTo(sx(x), sy(y)));
+  body.closePath();
+  ctx.fillStyle = 'lightgray';
+  ctx.fill(body);
+  ctx.strokeStyle = '#000';
+  ctx.lineWidth = 2 * dpr;
+  ctx.stroke(body);
+  drawAxes();
+}
+
+function resize() {
+  dpr = window.devicePixelRatio || 1;
+  width = canvas.width = Math.max(1, Math.round(canvas.clientWidth * dpr));
+  height = canvas.height = Math.max(1, Math.round(canvas.clientHeight * dpr));
+  draw();
+}
+
+function clampView(next) {
+  const w = Math.min(next.x1 - next.x0, x1 - x0), h = Math.min(next.y1 - next.y0, y1 - y0);
+  const left = Math.min(Math.max(next.x0, x0), x1 - w), bottom = Math.min(Math.max(next.y0, y0), y1 - h);
+  return {x0: left, x1: left + w, y0: bottom, y1: bottom + h};
+}
+
+canvas.addEventListener('wheel', (event) => {
+  event.preventDefault();
+  const factor = Math.exp(event.deltaY * 0.0015);
+  const px = domainX(event.offsetX * dpr), py = domainY(event.offsetY * dpr);
+  if ((view.x1 - view.x0) * factor < 20 * dx && factor < 1) return;
+  view = clampView({x0: px + (view.x0 - px) * factor, x1: px + (view.x1 - px) * factor,
+                    y0: py + (view.y0 - py) * factor, y1: py + (view.y1 - py) * factor});
+  draw();
+}, {passive: false});
+
+let drag = null;
+canvas.addEventListener('mousedown', (event) => { drag = {x: event.offsetX, y: event.offsetY, view}; });
+window.addEventListener('mouseup', () => { drag = null; });
+canvas.addEventListener('mousemove', (event) => {
+  if (drag) {
+    const shiftX = (event.offsetX - drag.x) * dpr / width * (drag.view.x1 - drag.view.x0);
+    const shiftY = (event.offsetY - drag.y) * dpr / height * (drag.view.y1 - drag.view.y0);
+    view = clampView({x0: drag.view.x0 - shiftX, x1: drag.view.x1 - shiftX,
+                      y0: drag.view.y0 + shiftY, y1: drag.view.y1 + shiftY});
+    draw();
+  }
+  const px = domainX(event.offsetX * dpr), py = domainY(event.offsetY * dpr);
+  const i = Math.round((px - x0) / dx), j = Math.round((py - y0) / dy);
+  if (i < 0 || i >= nx || j < 0 || j >= ny) { readout.textContent = ''; return; }
+  const k = j * nx + i;
+  readout.textContent = Number.isNaN(cp[k])
+    ? `x ${px.toFixed(2)} m, y ${py.toFixed(2)} m: inside the vehicle`
+    : `x ${px.toFixed(2)} m, y ${py.toFixed(2)} m: Cp ${cp[k].toFixed(2)}, |V| ${speed[k].toFixed(1)} m/s`;
+});
+canvas.addEventListener('mouseleave', () => { readout.textContent = ''; });
+canvas.addEventListener('dblclick', () => { view = {x0, x1, y0, y1}; draw(); });
+document.getElementById('reset').addEventListener('click', () => { view = {x0, x1, y0, y1}; draw(); });
+layers.pressure.addEventListener('change', draw);
+layers.streamlines.addEventListener('change', draw);
+
+(function legend() {
+  const lctx = document.getElementById('legend').getContext('2d');
+  const image = lctx.createImageData(256, 1);
+  for (let i = 0; i < 256; i++) {
+    image.data.set([pressureLut[3 * i], pressureLut[3 * i + 1], pressureLut[3 * i + 2], 255], 4 * i);
+  }
+  lctx.putImageData(image, 0, 0);
+  document.getElementById('cp-min').textContent = cpLo;
+  document.getElementById('cp-max').textContent = cpHi;
+})();
+
+new ResizeObserver(resize).observe(canvas);
+</script>
+</body>
+</html>
+"""
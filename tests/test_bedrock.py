@@ -0,0 +1,108 @@
+import io
+import json
+
+import pytest
+
+from src.utils import bedrock, rate_limiter
+from src.utils.bedrock import create_bedrock_client, invoke_model, invoke_model_stream
+from src.utils.llm_cache import LLMCache
+from src.utils.rate_limiter import ModelBudget, RateLimiter
+
+MODEL = 'anthropic.claude-v2'
+BODY = {'prompt': "\n\nHuman: hi\n\nAssistant:", 'max_tokens_to_sample': 10}
+
+
+class ThrottlingError(Exception):
+    response = {'Error': {'Code': 'ThrottlingException'}}
+
+
+class StubClient:
+    def __init__(self, completion: str = 'hello', throttle: int = 0):
+        self.completion = completion
+        self.throttle = throttle
+        self.calls = 0
+
+    def invoke_model(self, modelId, body, contentType, accept):
+        self.calls += 1
+        if self.calls <= self.throttle:
+            raise ThrottlingError()
+        return {
+            'body': io.BytesIO(json.dumps({'completion': self.completion}).encode('utf-8')),
+            'ResponseMetadata': {'HTTPHeaders': {'x-amzn-bedrock-input-token-count': '12',
+                                                 'x-amzn-bedrock-output-token-count': '3'}},
+        }
+
+    def invoke_model_with_response_stream(self, modelId, body, contentType, accept):
+        self.calls += 1
+        events = [{'chunk': {'bytes': json.dumps({'completion': part}).encode('utf-8')}}
+                  for part in ('hel', 'lo')]
+        return {'body': iter(events)}
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(budgets={}, default=ModelBudget(rate=1000.0, burst=100, max_concurrency=8))
+        self.slots = 0
+
+    def slot(self, model_id, timeout=None):
+        self.slots += 1
+        return super().slot(model_id, timeout)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = CountingLimiter()
+    monkeypatch.setattr(bedrock, 'get_rate_limiter', lambda: limiter)
+    return limiter
+
+
+def test_cache_miss_calls_bedrock_and_stores_the_response(tmp_path, limiter):
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'))
+    client = StubClient()
+    assert invoke_model(client, MODEL, BODY, cache=cache) == {'completion': 'hello'}
+    assert cache.get(MODEL, BODY) == {'completion': 'hello'}
+    assert (client.calls, limiter.slots) == (1, 1)
+
+
+def test_cache_hit_skips_bedrock_and_the_limiter(tmp_path, limiter):
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'))
+    cache.put(MODEL, BODY, {'completion': 'cached'})
+    client = StubClient()
+    assert invoke_model(client, MODEL, BODY, cache=cache) == {'completion': 'cached'}
+    assert (client.calls, limiter.slots) == (0, 0)
+
+
+def test_rejected_responses_are_not_cached(tmp_path, limiter):
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'))
+    invoke_model(StubClient(completion=''), MODEL, BODY, cache=cache,
+                 cache_if=lambda body: bool(body.get('completion')))
+    assert cache.get(MODEL, BODY) is None
+
+
+def test_throttled_call_is_retried_once_in_its_slot(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'THROTTLE_RETRY_DELAY', 0)
+    client = StubClient(throttle=1)
+    assert invoke_model(client, MODEL, BODY) == {'completion': 'hello'}
+    assert (client.calls, limiter.slots) == (2, 1)
+    assert limiter.limiter(MODEL).stats()['concurrency_limit'] == 4
+
+    with pytest.raises(ThrottlingError):
+        invoke_model(StubClient(throttle=2), MODEL, BODY)
+
+
+def test_stream_yields_chunks_in_order(limiter):
+    client = StubClient()
+    assert [chunk['completion'] for chunk in invoke_model_stream(client, MODEL, BODY)] == ['hel', 'lo']
+    assert limiter.slots == 1
+
+
+def test_client_config_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv('VEH_AERO_BEDROCK_POOL_SIZE', '7')
+    monkeypatch.setenv('VEH_AERO_BEDROCK_READ_TIMEOUT', '42')
+    monkeypatch.setenv('VEH_AERO_BEDROCK_REGION', 'eu-west-1')
+    config = create_bedrock_client(max_attempts=3).meta.config
+    assert config.max_pool_connections == 7
+    assert config.read_timeout == 42
+    assert config.connect_timeout == bedrock.DEFAULT_CONNECT_TIMEOUT
+    assert config.region_name == 'eu-west-1'
+    assert config.retries == {'mode': 'adaptive', 'total_max_attempts': 3}
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from src.models import design_index
+from src.models.design_index import DesignIndex, design_vector
+
+
+def _design(rng: np.random.Generator):
+    features = {
+        'aspect_ratio': rng.uniform(1.5, 3.5),
+        'curvature': rng.uniform(1.0, 1.3),
+        'ground_clearance': rng.uniform(0.0, 1.0),
+        'nose_angle': rng.uniform(0.0, 90.0),
+    }
+    shape = list(rng.normal(0.0, 0.2, 7))
+    return features, shape
+
+
+def _brute_force(vectors: dict, query: np.ndarray, max_distance: float) -> dict:
+    distances = {design_id: float(np.linalg.norm(vector - query))
+                 for design_id, vector in vectors.items()}
+    return {design_id: d for design_id, d in distances.items() if d <= max_distance}
+
+
+@pytest.fixture
+def small_merges(monkeypatch):
+    monkeypatch.setattr(design_index, 'MERGE_THRESHOLD', 50)
+
+
+def test_tolerance_queries_cover_sorted_slab_and_unmerged_tail(small_merges):
+    rng = np.random.default_rng(0)
+    index = DesignIndex(path=None)
+    vectors = {}
+    for n in range(120):
+        features, shape = _design(rng)
+        vectors[index.add(features, shape, {'cd': 0.3, 'n': n})] = design_vector(features, shape)
+
+    # Two merges into the sorted slab, the last 20 designs still in the tail
+    assert len(index._ids) == 100
+    assert len(index._tail_ids) == 20
+    assert np.all(np.diff(index._vectors[:, index._axis]) >= 0)
+
+    for design_id in rng.choice(list(vectors), 30, replace=False):
+        query = vectors[design_id] + rng.normal(0, 0.3, design_index.VECTOR_SIZE).astype(np.float32)
+        hits = index.query(query, k=len(vectors), max_distance=1.5)
+        expected = _brute_force(vectors, query, 1.5)
+        assert {hit_id for hit_id, _ in hits} == set(expected)
+        assert [d for _, d in hits] == sorted(d for _, d in hits)
+        for hit_id, distance in hits:
+            assert distance == pytest.approx(expected[hit_id], abs=1e-4)
+
+
+def test_slab_window_includes_points_at_exactly_the_tolerance():
+    index = DesignIndex(path=None)
+    base = np.zeros(design_index.VECTOR_SIZE, dtype=np.float32)
+    index._rebuild(np.array([1, 2, 3], dtype=np.int64),
+                   np.array([base, base + 0.5, base + 2.0], dtype=np.float32))
+    axis = index._axis
+
+    query = base.copy()
+    query[axis] = 0.25
+    assert [hit_id for hit_id, _ in index.query(query, k=3, max_distance=0.25)] == [1]
+
+    # Inside the window along the sorted axis, but far off on the other axes
+    query = base.copy()
+    query[axis] = 2.0
+    assert index.query(query, k=3, max_distance=0.5) == []
+
+
+def test_match_reuses_results_within_tolerance_after_reload(tmp_path):
+    rng = np.random.default_rng(1)
+    path = str(tmp_path / 'index.sqlite')
+    stored, shape = _design(rng)
+    DesignIndex(path).add(stored, shape, {'cd': 0.28, 'cl': -0.05})
+
+    # Reloaded designs sit in the sorted slab; new ones go to the tail
+    index = DesignIndex(path, tolerance=0.1)
+    assert len(index._ids) == 1
+    other, other_shape = _design(rng)
+    index.add(other, other_shape, {'cd': 0.35, 'cl': 0.1})
+    assert len(index._tail_ids) == 1
+
+    near = dict(stored, aspect_ratio=stored['aspect_ratio'] + 0.01)
+    match = index.match(near, shape)
+    assert match is not None
+    assert match.result == {'cd': 0.28, 'cl': -0.05}
+    assert match.distance <= 0.1
+
+    assert index.match(other, other_shape).result == {'cd': 0.35, 'cl': 0.1}
+    assert index.match(dict(stored, aspect_ratio=stored['aspect_ratio'] + 0.5), shape) is None
+
+
+def test_designs_without_a_shape_are_not_indexed():
+    index = DesignIndex(path=None)
+    features, _ = _design(np.random.default_rng(2))
+    assert index.add(features, None, {'cd': 0.3}) is None
+    assert index.match(features, None) is None
+    assert len(index) == 0
@@ -0,0 +1,31 @@
+import pytest
+
+from src.analysis.design_sweep import expand_template, parse_parameter_grid
+
+
+def test_grid_expands_every_combination_in_order():
+    grid = parse_parameter_grid("# comment\nspoiler: none, a wing\n\nheight: low, high\n")
+    variants = expand_template("EV with {spoiler}, {height} ride", grid)
+    assert [variant.prompt for variant in variants] == [
+        "EV with none, low ride", "EV with none, high ride",
+        "EV with a wing, low ride", "EV with a wing, high ride",
+    ]
+    assert variants[3].parameters == {'spoiler': 'a wing', 'height': 'high'}
+
+
+@pytest.mark.parametrize('template', [
+    "EV {}", "EV {0}", "EV {spoiler.name}", "EV {spoiler[0]}", "EV {spoiler!r}", "EV {spoiler:>9}",
+    "EV {spoiler", "EV spoiler}",
+])
+def test_templates_with_unsupported_fields_raise_value_error(template):
+    with pytest.raises(ValueError):
+        expand_template(template, {'spoiler': ['none']})
+
+
+def test_missing_and_unused_parameters_raise_value_error():
+    with pytest.raises(ValueError, match="without values: height"):
+        expand_template("{spoiler} {height}", {'spoiler': ['none']})
+    with pytest.raises(ValueError, match="not used in the template: height"):
+        expand_template("{spoiler}", {'spoiler': ['none'], 'height': ['low']})
+    with pytest.raises(ValueError, match="Line 1"):
+        parse_parameter_grid("spoiler none")
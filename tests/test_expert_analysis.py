@@ -0,0 +1,25 @@
+from src.analysis.expert_analysis import _build_expert_request, split_expert_sections
+
+ROWS = [
+    {'design': 'Initial', 'cd': 0.31, 'cl': 0.08, 'cd_delta_pct': 0.0, 'cl_delta_pct': 0.0},
+    {'design': 'Aero', 'cd': 0.27, 'cl': 0.02, 'cd_delta_pct': -12.9, 'cl_delta_pct': -75.0},
+    {'design': 'Failed', 'cd': None, 'cl': None, 'cd_delta_pct': None, 'cl_delta_pct': None},
+]
+
+
+def test_request_sends_the_system_prompt_before_the_first_turn():
+    prompt = _build_expert_request(ROWS, 'Initial')['prompt']
+    system, human = prompt.split("\n\nHuman: ", 1)
+    assert system.startswith("You are an expert automotive aerodynamicist")
+    assert "these 2 vehicle designs" in human
+    assert "| Initial (baseline) | 0.310 | 0.080 |" in human
+    assert "Failed" not in human
+    assert prompt.count("\n\nAssistant:") == 1
+
+
+def test_sections_split_on_partial_text():
+    text = "Intro\n2. Performance Implications\nfast"
+    sections = split_expert_sections(text)
+    assert sections['Technical Analysis'] == "Intro\n"
+    assert sections['Performance Implications'] == "\nfast"
+    assert 'Recommendations' not in sections
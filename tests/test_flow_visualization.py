@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.visual.flow_visualization import (FREESTREAM_VELOCITY, FlowVisualization,
+                                           _induced_velocity, _solve_source_panels)
+
+V = FREESTREAM_VELOCITY
+
+
+def _panels(outline: np.ndarray):
+    """Panel start/end points and outward normals of a counter-clockwise outline"""
+    z1 = outline[:, 0] + 1j * outline[:, 1]
+    z2 = np.roll(z1, -1)
+    normal = -1j * (z2 - z1) / np.abs(z2 - z1)
+    return z1, z2, normal
+
+
+@pytest.mark.parametrize('is_aerodynamic', [False, True])
+def test_flow_does_not_cross_the_body(is_aerodynamic):
+    outline = FlowVisualization().body_outline({'aspect_ratio': 2.8}, is_aerodynamic)
+    coeffs = _solve_source_panels(outline, V)
+    z1, z2, normal = _panels(outline)
+    # Just outside each panel midpoint; Re(w * n) is the normal velocity
+    control = 0.5 * (z1 + z2) + 1e-3 * np.abs(z2 - z1) * normal
+    w = V + _induced_velocity(control.real, control.imag, outline, coeffs)
+    assert np.abs(np.real(w * normal)).max() < 1e-3 * V
+
+
+def test_far_field_tends_to_the_freestream():
+    outline = FlowVisualization().body_outline({'aspect_ratio': 2.5})
+    coeffs = _solve_source_panels(outline, V)
+    far = np.array([200, -200, 200j, -200j, 150 + 150j])
+    assert np.abs(_induced_velocity(far.real, far.imag, outline, coeffs)).max() < 1e-3 * V
+
+
+def test_vectorized_velocity_matches_the_panel_sum():
+    outline = FlowVisualization().body_outline({'aspect_ratio': 2.5}, True)
+    coeffs = _solve_source_panels(outline, V)
+    z1, z2, _ = _panels(outline)
+    points = np.random.default_rng(0).uniform(-6, 6, (64, 2))
+    z = points[:, 0, None] + 1j * points[:, 1, None]
+    direct = (coeffs * np.log((z - z1) / (z - z2))).sum(axis=1)
+    fast = _induced_velocity(points[:, 0], points[:, 1], outline, coeffs)
+    assert np.abs(fast - direct).max() < 1e-4 * V
+
+
+def test_circle_surface_speed_matches_potential_flow():
+    t = np.linspace(0, 2 * np.pi, 200, endpoint=False)
+    outline = np.column_stack([np.cos(t), np.sin(t)])
+    coeffs = _solve_source_panels(outline, V)
+    # Exact speed above a cylinder: V (1 + 1/r^2)
+    r = 1.05
+    w = V + _induced_velocity(np.array([0.0]), np.array([r]), outline, coeffs)
+    assert abs(w[0]) == pytest.approx(V * (1 + 1 / r ** 2), rel=0.01)
+
+
+def test_flow_field_is_masked_inside_the_body():
+    X, Y, U, V_, P = FlowVisualization(nx=200, ny=120).generate_flow_data({'aspect_ratio': 2.5})
+    assert U.shape == V_.shape == P.shape == (120, 200)
+    centre = (np.abs(Y[:, 0]).argmin(), np.abs(X[0]).argmin())
+    assert np.isnan(P[centre]) and U[centre] == 0.0
+    # The outflow edge, 11 units behind the body, is close to the freestream
+    assert np.allclose(U[:, -1], V, rtol=0.05)
+    assert np.abs(V_[:, -1]).max() < 0.05 * V
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.utils.image_buffer import DecodedImage, as_decoded, encoded_hash
+
+
+def _bgr(width: int = 80, height: int = 40) -> np.ndarray:
+    bgr = np.full((height, width, 3), 255, np.uint8)
+    cv2.rectangle(bgr, (10, 10), (60, 30), (20, 40, 200), -1)
+    return bgr
+
+
+def test_callers_array_stays_writable():
+    array = _bgr()
+    image = DecodedImage(array)
+    array[0, 0] = 0
+    with pytest.raises(ValueError):
+        image.bgr[0, 0] = 0
+    assert not image.gray.flags.writeable
+
+
+def test_decoded_bytes_keep_their_content_hash():
+    data = cv2.imencode('.png', _bgr())[1].tobytes()
+    image = DecodedImage.from_bytes(data)
+    assert image.content_hash == encoded_hash(data)
+    assert DecodedImage.from_bytes(data, 'known').content_hash == 'known'
+    assert np.array_equal(image.bgr, _bgr())
+    with pytest.raises(ValueError):
+        DecodedImage.from_bytes(b'not an image')
+
+
+def test_pixel_hash_and_gray_are_computed_once():
+    image = DecodedImage(_bgr())
+    assert image.content_hash == DecodedImage(_bgr()).content_hash
+    assert image.content_hash != DecodedImage(_bgr(81)).content_hash
+    assert image.gray is image.gray
+    assert image.gray.shape == (40, 80)
+
+
+def test_resized_scales_the_longest_side():
+    image = DecodedImage(_bgr())
+    assert image.resized(80) is image
+    assert image.resized(160) is image
+    small = image.resized(40)
+    assert (small.width, small.height) == (40, 20)
+    large = image.resized(160, upscale=True)
+    assert (large.width, large.height) == (160, 80)
+    assert not large.bgr.flags.writeable
+
+
+def test_as_decoded_copies_arrays_and_converts_pil():
+    array = _bgr()
+    image = as_decoded(array)
+    array[:] = 0
+    assert image.bgr.max() == 255
+    assert as_decoded(image) is image
+
+    pil = Image.fromarray(cv2.cvtColor(_bgr(), cv2.COLOR_BGR2RGB))
+    assert np.array_equal(as_decoded(pil).bgr, _bgr())
+    assert np.array_equal(np.asarray(image.to_pil()), np.asarray(pil))
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+
+import cv2
+import numpy as np
+import pytest
+
+from src.output import image_store
+from src.output.image_store import MANIFEST_NAME, ImageStore
+
+
+def _png(shade: int, size: int = 64) -> bytes:
+    bgr = np.full((size, size, 3), 255, np.uint8)
+    cv2.rectangle(bgr, (8, 24), (56, 48), (shade, 40, 90), -1)
+    return cv2.imencode('.png', bgr)[1].tobytes()
+
+
+def _request(prompt: str, seed: int = 1) -> dict:
+    return {'taskType': 'TEXT_IMAGE',
+            'textToImageParams': {'text': prompt, 'negativeText': 'blurry'},
+            'imageGenerationConfig': {'width': 64, 'height': 64, 'seed': seed}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ImageStore(str(tmp_path / 'store'))
+    yield store
+    store.flush()
+
+
+def test_identical_images_are_stored_once(store):
+    data = _png(10)
+    first = store.put(data, 'key-a', 'model', _request('a'))
+    second = store.put(data, 'key-b', 'model', _request('b'))
+    store.flush()
+
+    assert first.content_hash == second.content_hash
+    assert first.path == second.path
+    assert store.stats()['images'] == 1
+    assert store.find('key-a').content_hash == store.find('key-b').content_hash
+
+
+def test_images_are_served_before_the_write_and_found_after_it(store):
+    stored = store.put(_png(20), 'key', 'model', _request('a sedan'))
+    # Returned at once, and looked up from memory until the writer is done
+    assert store.find('key') is not None
+    assert store.wait(stored.content_hash, timeout=5)
+    store.flush()
+
+    assert os.path.exists(stored.path)
+    assert stored.path.endswith('.webp')
+    found = store.find('key')
+    assert found.path == stored.path
+    assert np.array_equal(found.image.bgr, stored.image.bgr)
+    assert store.find('unknown') is None
+    assert store.stats()['pending'] == 0
+
+
+def test_manifest_records_request_features_and_analysis(store):
+    stored = store.put(_png(30), 'key', 'model', _request('a sedan', seed=42))
+    store.record_analysis(stored.content_hash, {'aspect_ratio': 2.5}, {'cd': 0.28})
+    store.flush()
+
+    conn = sqlite3.connect(os.path.join(store.root, MANIFEST_NAME))
+    prompt, negative, config = conn.execute(
+        "SELECT prompt, negative_prompt, config FROM requests WHERE request_key = 'key'").fetchone()
+    features, analysis = conn.execute(
+        "SELECT features, analysis FROM images WHERE content_hash = ?",
+        (stored.content_hash,)).fetchone()
+    assert (prompt, negative) == ('a sedan', 'blurry')
+    assert '"seed": 42' in config
+    assert features == '{"aspect_ratio": 2.5}'
+    assert analysis == '{"cd": 0.28}'
+
+
+def test_original_format_keeps_the_returned_bytes(tmp_path):
+    store = ImageStore(str(tmp_path / 'store'), image_format='original')
+    data = _png(40)
+    stored = store.put(data, 'key')
+    store.flush()
+    with open(stored.path, 'rb') as f:
+        assert f.read() == data
+
+
+def test_cleanup_removes_least_recently_used_images(store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(image_store.time, 'time', lambda: now[0])
+    paths = {}
+    for shade in range(4):
+        paths[shade] = store.put(_png(shade * 50), f"key-{shade}").path
+        store.flush()
+        now[0] += 10
+    # Touch the oldest so the second one becomes least recently used
+    store.find('key-0', load=False)
+
+    assert store.cleanup(max_images=3) == 1
+    assert not os.path.exists(paths[1])
+    assert store.find('key-1') is None
+    assert store.find('key-0') is not None
+
+    now[0] += 100
+    assert store.cleanup(max_age_seconds=50) == 3
+    assert store.stats()['images'] == 0
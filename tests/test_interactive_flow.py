@@ -0,0 +1,56 @@
+import base64
+import json
+
+import numpy as np
+
+from src.visual import interactive_flow
+from src.visual.flow_visualization import FREESTREAM_VELOCITY, FlowVisualization
+from src.visual.interactive_flow import downsample_flow, flow_payload, interactive_flow_html
+
+
+def _unpack(data: str, payload: dict) -> np.ndarray:
+    values = np.frombuffer(base64.b64decode(data), dtype='<f2')
+    return values.reshape(payload['ny'], payload['nx'])
+
+
+def test_payload_round_trips_float16_velocities():
+    viz = FlowVisualization(nx=400, ny=240)
+    features = {'aspect_ratio': 2.5}
+    payload = json.loads(flow_payload(viz, features, max_columns=100))
+
+    X, Y, U, V, P = downsample_flow(*viz.generate_flow_data(features), max_columns=100)
+    assert (payload['ny'], payload['nx']) == U.shape == (60, 100)
+    assert payload['x'] == [X[0, 0], X[0, -1]]
+    assert payload['y'] == [Y[0, 0], Y[-1, 0]]
+    assert payload['vInf'] == FREESTREAM_VELOCITY
+
+    u, v = _unpack(payload['u'], payload), _unpack(payload['v'], payload)
+    inside = np.isnan(P)
+    assert inside.any()
+    assert np.array_equal(np.isnan(u), inside) and np.array_equal(np.isnan(v), inside)
+    # float16 keeps about three significant digits
+    assert np.allclose(u[~inside], U[~inside], rtol=1e-3, atol=1e-2)
+    assert np.allclose(v[~inside], V[~inside], rtol=1e-3, atol=1e-2)
+    assert len(base64.b64decode(payload['pressureLut'])) == 256 * 3
+
+
+def test_payload_is_cached_by_render_key():
+    viz = FlowVisualization(nx=200, ny=120)
+    interactive_flow._payload_cache.clear()
+    first = flow_payload(viz, {'aspect_ratio': 2.5}, max_columns=50)
+    assert flow_payload(viz, {'aspect_ratio': 2.5}, max_columns=50) is first
+    assert flow_payload(viz, {'aspect_ratio': 3.0}, max_columns=50) != first
+
+
+def test_downsample_strides_rows_and_columns_alike():
+    grid = np.arange(240 * 400, dtype=float).reshape(240, 400)
+    strided = downsample_flow(grid, grid, grid, grid, grid, max_columns=150)
+    assert strided[0].shape == (80, 134)
+    assert strided[0][1, 1] == grid[3, 3]
+    assert downsample_flow(grid, grid, grid, grid, grid, max_columns=400)[0].shape == grid.shape
+
+
+def test_html_embeds_payload_without_closing_the_script():
+    html = interactive_flow_html('{"note": "</script>"}', show_pressure=False)
+    assert '<\\/script>' in html
+    assert '{"pressure": false, "streamlines": true}' in html
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from src.utils import llm_cache
+from src.utils.llm_cache import LLMCache
+
+MODEL = 'anthropic.claude-v2'
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock)
+    return clock
+
+
+def _body(prompt: str) -> dict:
+    return {'prompt': prompt, 'max_tokens_to_sample': 100}
+
+
+def test_hit_after_put_and_miss_for_other_requests(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'))
+    cache.put(MODEL, _body('a'), {'completion': 'A'})
+
+    assert cache.get(MODEL, _body('a')) == {'completion': 'A'}
+    assert cache.get(MODEL, _body('b')) is None
+    assert cache.get('other-model', _body('a')) is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'), ttl_seconds=60)
+    cache.put(MODEL, _body('a'), {'completion': 'A'})
+
+    clock.now += 59
+    assert cache.get(MODEL, _body('a')) is not None
+    clock.now += 2
+    assert cache.get(MODEL, _body('a')) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted_over_max_entries(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    cache.put(MODEL, _body('a'), {'completion': 'A'})
+    clock.now += 1
+    cache.put(MODEL, _body('b'), {'completion': 'B'})
+    clock.now += 1
+    cache.get(MODEL, _body('a'))
+    clock.now += 1
+    cache.put(MODEL, _body('c'), {'completion': 'C'})
+
+    assert cache.get(MODEL, _body('b')) is None
+    assert cache.get(MODEL, _body('a')) == {'completion': 'A'}
+    assert cache.get(MODEL, _body('c')) == {'completion': 'C'}
+    assert cache.stats()['entries'] == 2
+
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(tmp_path, clock):
+    response = {'completion': 'x' * 100}
+    size = len(json.dumps(response))
+    cache = LLMCache(str(tmp_path / 'cache.sqlite'), max_bytes=2 * size + size // 2)
+    for prompt in ('a', 'b', 'c'):
+        cache.put(MODEL, _body(prompt), response)
+        clock.now += 1
+
+    assert cache.get(MODEL, _body('a')) is None
+    assert cache.get(MODEL, _body('b')) == response
+    assert cache.get(MODEL, _body('c')) == response
+    assert cache.stats()['bytes'] == 2 * size
+
+
+def test_cache_persists_across_instances(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite')
+    LLMCache(path).put(MODEL, _body('a'), {'completion': 'A'})
+    assert LLMCache(path).get(MODEL, _body('a')) == {'completion': 'A'}
@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+from src.analysis.comparison import Design, analyze_design
+from src.analysis.design_sweep import SweepVariant, _run_variant
+from src.models.vehicle_generator import GenerationResult
+from src.utils.image_buffer import DecodedImage
+
+
+def _image(with_vehicle: bool) -> DecodedImage:
+    bgr = np.full((512, 512, 3), 255, np.uint8)
+    if with_vehicle:
+        cv2.rectangle(bgr, (80, 250), (430, 360), (40, 40, 40), -1)
+    return DecodedImage(bgr)
+
+
+class Store:
+    def __init__(self):
+        self.recorded = []
+
+    def record_analysis(self, digest, features=None, analysis=None):
+        self.recorded.append((digest, features, analysis))
+
+
+class Generator:
+    def __init__(self, image: DecodedImage):
+        self.image = image
+        self.store = Store()
+
+    def generate_result(self, prompt, seed=None, preview=None):
+        return GenerationResult(prompt, self.image, 'vehicle.png', content_hash='abc')
+
+
+class Analyzer:
+    def __init__(self):
+        self.calls = 0
+
+    def analyze_features(self, features, shape=None):
+        self.calls += 1
+        return {'cd': 0.3, 'cl': 0.05}
+
+
+def test_designs_without_a_contour_stop_before_analysis():
+    generator, analyzer = Generator(_image(False)), Analyzer()
+
+    result = analyze_design(generator, analyzer, Design('Blank', 'nothing'))
+    assert result.error == "extract: no vehicle contour found"
+    assert result.image is generator.image
+
+    sweep = _run_variant(generator, analyzer, SweepVariant(0, {}, 'nothing'), None, 'canny')
+    assert sweep.error == "extract: no vehicle contour found"
+    assert sweep.thumbnail is not None
+
+    assert analyzer.calls == 0
+    assert generator.store.recorded == []
+
+
+def test_analyzed_designs_are_recorded():
+    generator, analyzer = Generator(_image(True)), Analyzer()
+
+    result = analyze_design(generator, analyzer, Design('Box', 'a box'))
+    assert result.ok
+    assert result.analysis == {'cd': 0.3, 'cl': 0.05}
+
+    sweep = _run_variant(generator, analyzer, SweepVariant(0, {}, 'a box'), None, 'canny')
+    assert sweep.ok
+    assert sweep.filepath == 'vehicle.png'
+
+    assert analyzer.calls == 2
+    assert [digest for digest, _, _ in generator.store.recorded] == ['abc', 'abc']
@@ -0,0 +1,183 @@
+import threading
+import time
+
+import pytest
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import ModelBudget, ModelLimiter, RateLimiter, RateLimitTimeout
+
+# Effectively no token pacing, so only the concurrency limit applies
+FAST = dict(rate=10000.0, burst=100)
+
+
+class ThrottlingError(Exception):
+    response = {'Error': {'Code': 'ThrottlingException'}}
+
+
+def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.001)
+
+
+def test_requests_are_admitted_in_arrival_order():
+    limiter = ModelLimiter('model', ModelBudget(max_concurrency=1, **FAST))
+    held = limiter.acquire()
+    order = []
+
+    def request(index):
+        lease = limiter.acquire(timeout=5)
+        order.append(index)
+        limiter.release(lease)
+
+    threads = []
+    for index in range(5):
+        thread = threading.Thread(target=request, args=(index,))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: limiter.stats()['queue_depth'] == index + 1)
+
+    limiter.release(held)
+    for thread in threads:
+        thread.join(5)
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_requests_in_flight_never_exceed_the_concurrency_limit():
+    limiter = ModelLimiter('model', ModelBudget(max_concurrency=3, **FAST))
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+
+    def request():
+        with limiter.slot(timeout=5):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert peak[0] == 3
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_token_bucket_paces_requests_beyond_the_burst():
+    limiter = ModelLimiter('model', ModelBudget(rate=20.0, burst=2, max_concurrency=10))
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.release(limiter.acquire(timeout=5))
+    # Two from the burst, then one token every 50 ms
+    assert time.monotonic() - start >= 0.09
+
+
+def test_limit_halves_once_per_throttled_round():
+    limiter = ModelLimiter('model', ModelBudget(max_concurrency=8, **FAST))
+    leases = [limiter.acquire() for _ in range(4)]
+    for lease in leases:
+        lease.throttled = True
+        limiter.release(lease)
+    # Every request of the round was throttled, but they saw the same limit
+    assert limiter.stats()['concurrency_limit'] == 4
+
+    lease = limiter.acquire(timeout=5)
+    lease.throttled = True
+    limiter.release(lease)
+    assert limiter.stats()['concurrency_limit'] == 2
+
+
+def test_limit_never_drops_below_the_minimum_and_grows_back():
+    limiter = ModelLimiter('model', ModelBudget(max_concurrency=4, min_concurrency=1, **FAST))
+    for _ in range(5):
+        lease = limiter.acquire(timeout=5)
+        lease.throttled = True
+        limiter.release(lease)
+    assert limiter.stats()['concurrency_limit'] == 1
+
+    for _ in range(10):
+        limiter.release(limiter.acquire(timeout=5))
+    assert limiter.stats()['concurrency_limit'] == 4
+
+
+def test_throttling_error_inside_slot_is_detected():
+    limiter = ModelLimiter('model', ModelBudget(max_concurrency=8, **FAST))
+    with pytest.raises(ThrottlingError):
+        with limiter.slot():
+            raise ThrottlingError()
+    assert limiter.stats()['concurrency_limit'] == 4
+
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError("not throttling")
+    assert limiter.stats()['concurrency_limit'] == 4
+
+
+def test_queue_timeout_raises_and_leaves_the_queue():
+    limiter = ModelLimiter('model', ModelBudget(max_concurrency=1, **FAST))
+    held = limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(timeout=0.05)
+    assert limiter.stats()['queue_depth'] == 0
+
+    limiter.release(held)
+    limiter.release(limiter.acquire(timeout=1))
+
+
+def test_budgets_match_the_longest_model_id_prefix():
+    narrow = ModelBudget(rate=1.0, burst=1, max_concurrency=1)
+    wide = ModelBudget(rate=2.0, burst=2, max_concurrency=2)
+    limiter = RateLimiter(budgets={'anthropic.': wide, 'anthropic.claude-v2': narrow})
+    assert limiter.limiter('anthropic.claude-v2:1').budget is narrow
+    assert limiter.limiter('anthropic.claude-3').budget is wide
+    assert limiter.limiter('amazon.titan').budget is limiter.default
+
+
+def test_throttling_halves_the_limit_but_keeps_the_tokens():
+    limiter = ModelLimiter('model', ModelBudget(rate=0.001, burst=10, max_concurrency=8))
+    lease = limiter.acquire()
+    lease.throttled = True
+    limiter.release(lease)
+    stats = limiter.stats()
+    assert stats['concurrency_limit'] == 4
+    assert stats['tokens'] == pytest.approx(9, abs=0.01)
+
+
+def test_lease_retries_a_throttled_call_once(monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'THROTTLE_RETRY_DELAY', 0)
+    limiter = ModelLimiter('model', ModelBudget(max_concurrency=8, **FAST))
+    calls = []
+
+    def throttled_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ThrottlingError()
+        return 'ok'
+
+    with limiter.slot() as lease:
+        assert lease.call(throttled_once) == 'ok'
+    assert len(calls) == 2
+    assert limiter.stats()['concurrency_limit'] == 4
+
+    def always_throttled():
+        raise ThrottlingError()
+
+    with pytest.raises(ThrottlingError):
+        with limiter.slot() as lease:
+            lease.call(always_throttled)
+
+    def failing():
+        calls.append(1)
+        raise ValueError("server error")
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        with limiter.slot() as lease:
+            lease.call(failing)
+    assert len(calls) == 1
+    assert not lease.throttled
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.models import surrogate
+from src.models.surrogate import CoefficientSurrogate
+
+
+def _features(aspect_ratio: float) -> dict:
+    return {'aspect_ratio': aspect_ratio, 'curvature': 1.1, 'ground_clearance': 0.5,
+            'nose_angle': 30.0}
+
+
+def _trained(path=None, cds=None) -> CoefficientSurrogate:
+    model = CoefficientSurrogate(path, min_samples=5)
+    for n, cd in enumerate(cds if cds is not None else [0.30] * 10):
+        model.add(_features(2.0 + 0.01 * n), cd, 0.05, save=False)
+    return model
+
+
+def test_confident_when_close_neighbours_agree():
+    prediction = _trained().predict(_features(2.02))
+    assert prediction.cd == pytest.approx(0.30)
+    assert prediction.cl == pytest.approx(0.05)
+    assert prediction.neighbours == 5
+    assert prediction.confident
+
+
+def test_one_exact_match_does_not_make_a_noisy_sample_confident():
+    model = _trained(cds=[0.30, 0.34, 0.26, 0.31, 0.36])
+    prediction = model.predict(_features(2.0))
+    # The exact match dominates the estimate but not the uncertainty
+    assert prediction.cd == pytest.approx(0.30, abs=1e-3)
+    assert prediction.uncertainty > model.max_uncertainty
+    assert not prediction.confident
+
+
+def test_far_designs_are_not_confident():
+    prediction = _trained().predict(_features(4.0))
+    assert prediction is not None
+    assert not prediction.confident
+
+
+def test_min_samples_gates_confidence():
+    model = CoefficientSurrogate(None, min_samples=10)
+    for n in range(9):
+        model.add(_features(2.0 + 0.01 * n), 0.30, 0.05)
+    assert not model.predict(_features(2.02)).confident
+    model.add(_features(2.09), 0.30, 0.05)
+    assert model.predict(_features(2.02)).confident
+
+
+def test_missing_features_and_duplicates():
+    model = CoefficientSurrogate(None)
+    assert model.predict(_features(2.0)) is None
+    model.add({'aspect_ratio': 2.0}, 0.3, 0.05)
+    model.add(_features(2.0), 0.3, 0.05)
+    model.add(_features(2.0), 0.3, 0.05)
+    assert len(model) == 1
+    assert model.predict({'aspect_ratio': 2.0}) is None
+
+
+def test_results_are_saved_in_batches_and_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(surrogate, 'SAVE_BATCH', 4)
+    path = str(tmp_path / 'surrogate.npz')
+    model = CoefficientSurrogate(path)
+    for n in range(3):
+        model.add(_features(2.0 + 0.01 * n), 0.30 + 0.01 * n, 0.05)
+    assert len(CoefficientSurrogate(path)) == 0
+
+    model.add(_features(2.03), 0.33, 0.05)
+    assert len(CoefficientSurrogate(path)) == 4
+
+    model.add(_features(2.04), 0.34, 0.05)
+    model.flush()
+    reloaded = CoefficientSurrogate(path)
+    assert len(reloaded) == 5
+    assert np.allclose(reloaded._Y[:, 0], [0.30, 0.31, 0.32, 0.33, 0.34])
+    assert reloaded.predict(_features(2.04)).cd == pytest.approx(0.34, abs=1e-3)
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from src.utils.task_graph import TaskGraph
+
+
+def test_dependents_receive_results_in_listed_order():
+    graph = TaskGraph(max_workers=4)
+    graph.add('a', lambda: 1)
+    graph.add('b', lambda: 2)
+    graph.add('sum', lambda b, a: (b, a), deps=['b', 'a'])
+    assert graph.run() == {'a': 1, 'b': 2, 'sum': (2, 1)}
+
+
+def test_task_starts_only_after_its_dependencies_finish():
+    release = threading.Event()
+    started = []
+
+    def slow():
+        release.wait(5)
+        started.append('slow')
+        return 'slow'
+
+    def dependent(value):
+        started.append('dependent')
+        return value.upper()
+
+    graph = TaskGraph(max_workers=4)
+    graph.add('slow', slow)
+    graph.add('fast', lambda: 'fast')
+    graph.add('dependent', dependent, deps=['slow'])
+
+    results = {}
+    for name, result in graph.as_completed():
+        results[name] = result
+        if name == 'fast':
+            release.set()
+
+    assert list(results) == ['fast', 'slow', 'dependent']
+    assert started == ['slow', 'dependent']
+    assert results['dependent'] == 'SLOW'
+
+
+def test_unknown_or_duplicate_tasks_are_rejected():
+    graph = TaskGraph()
+    graph.add('a', lambda: 1)
+    with pytest.raises(ValueError):
+        graph.add('a', lambda: 2)
+    with pytest.raises(ValueError):
+        graph.add('b', lambda value: value, deps=['missing'])
+
+
+def test_task_exception_propagates_and_skips_dependents():
+    ran = []
+
+    def fail():
+        raise RuntimeError('boom')
+
+    graph = TaskGraph(max_workers=2)
+    graph.add('fail', fail)
+    graph.add('after', lambda value: ran.append(value), deps=['fail'])
+
+    with pytest.raises(RuntimeError, match='boom'):
+        graph.run()
+    assert ran == []
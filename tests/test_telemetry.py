@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from src.utils.telemetry import Telemetry, summarize_spans
+
+
+def test_nested_spans_finish_inner_first_and_record_errors():
+    telemetry = Telemetry()
+    mark = telemetry.mark()
+    with telemetry.span('outer', label='a') as outer:
+        with telemetry.span('inner') as inner:
+            inner.attributes['bytes'] = 10
+        with pytest.raises(ValueError):
+            with telemetry.span('failing'):
+                raise ValueError("boom")
+
+    spans = telemetry.spans_since(mark)
+    assert [span.name for span in spans] == ['inner', 'failing', 'outer']
+    assert spans[0].attributes == {'bytes': 10}
+    assert spans[1].error == "ValueError: boom"
+    assert outer.attributes == {'label': 'a'}
+    assert outer.duration >= inner.duration
+    assert telemetry.spans_since(telemetry.mark()) == []
+
+    summary = {row['stage']: row for row in summarize_spans(spans)}
+    assert summary['failing']['errors'] == 1
+    assert summary['outer']['calls'] == 1
+
+
+def test_counters_accumulate_by_labels():
+    telemetry = Telemetry()
+    telemetry.increment('cache_hits_total', cache='llm')
+    telemetry.increment('cache_hits_total', 2, cache='llm')
+    telemetry.increment('cache_hits_total', cache='flow_payload')
+    telemetry.record_bedrock('model', 100, 200, input_tokens=5, cached=False)
+
+    counters = telemetry.counters()
+    assert counters[('cache_hits_total', (('cache', 'llm'),))] == 3
+    assert counters[('cache_hits_total', (('cache', 'flow_payload'),))] == 1
+    assert counters[('bedrock_requests_total', (('cached', 'false'), ('model', 'model')))] == 1
+    assert counters[('bedrock_input_tokens_total', (('model', 'model'),))] == 5
+    assert ('bedrock_output_tokens_total', (('model', 'model'),)) not in counters
+
+
+def test_prometheus_text_format(tmp_path):
+    telemetry = Telemetry()
+    with telemetry.span('extract'):
+        pass
+    telemetry.increment('fallbacks_total', stage='kpis "quoted"')
+    telemetry.set_gauge('rate_limit_in_flight', 3, model='m')
+    telemetry.set_gauge('rate_limit_in_flight', 2, model='m')
+
+    text = telemetry.prometheus_text()
+    lines = text.splitlines()
+    assert '# TYPE veh_aero_span_seconds summary' in lines
+    assert 'veh_aero_span_seconds_count{span="extract"} 1' in lines
+    assert any(line.startswith('veh_aero_span_seconds_sum{span="extract"} ') for line in lines)
+    assert '# TYPE veh_aero_fallbacks_total counter' in lines
+    assert 'veh_aero_fallbacks_total{stage="kpis \\"quoted\\""} 1' in lines
+    assert '# TYPE veh_aero_rate_limit_in_flight gauge' in lines
+    assert 'veh_aero_rate_limit_in_flight{model="m"} 2' in lines
+    # Every sample follows its family's HELP and TYPE lines
+    assert lines.index('# TYPE veh_aero_span_seconds summary') < lines.index(
+        'veh_aero_span_seconds_count{span="extract"} 1')
+
+    path = tmp_path / 'metrics' / 'veh_aero.prom'
+    telemetry.write_prometheus(str(path))
+    assert path.read_text() == text
+
+
+def test_spans_are_appended_to_jsonl(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    telemetry = Telemetry(jsonl_path=str(path))
+    with telemetry.span('a', model='m'):
+        pass
+    with telemetry.span('b'):
+        pass
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record['name'] for record in records] == ['a', 'b']
+    assert records[0]['attributes'] == {'model': 'm'}
+
+
+def test_span_buffer_is_bounded():
+    telemetry = Telemetry(max_spans=3)
+    mark = telemetry.mark()
+    for index in range(5):
+        with telemetry.span(f"s{index}"):
+            pass
+    assert [span.name for span in telemetry.spans_since(mark)] == ['s2', 's3', 's4']
+    assert telemetry.counters()[('span_seconds_count', (('span', 's0'),))] == 1
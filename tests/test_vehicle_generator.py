@@ -0,0 +1,134 @@
+import base64
+import io
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from src.models import vehicle_generator
+from src.models.vehicle_generator import FULL_SIZE, PreviewOptions, VehicleImageGenerator
+from src.output.image_store import ImageStore, content_hash
+from src.utils.image_buffer import DecodedImage
+from src.utils.silhouette import score_silhouette
+
+
+def _png(size: int, shade: int) -> bytes:
+    """A dark box on white; ``shade`` makes every image distinct"""
+    bgr = np.full((size, size, 3), 255, np.uint8)
+    cv2.rectangle(bgr, (size // 8, size // 2), (7 * size // 8, 3 * size // 4), (shade,) * 3, -1)
+    return cv2.imencode('.png', bgr)[1].tobytes()
+
+
+def _candidate(size: int, box) -> bytes:
+    """A white render with a dark box at ``box`` (fractions of the side), or blank"""
+    bgr = np.full((size, size, 3), 255, np.uint8)
+    if box is not None:
+        x0, y0, x1, y1 = (round(v * size) for v in box)
+        cv2.rectangle(bgr, (x0, y0), (x1, y1), (30, 30, 30), -1)
+    return cv2.imencode('.png', bgr)[1].tobytes()
+
+
+class StubClient:
+    """Answers Nova Canvas requests with queued images, or new ones when none are queued"""
+
+    def __init__(self):
+        self.requests = []
+        self.queued = []
+
+    def invoke_model(self, modelId, body, contentType, accept):
+        request = json.loads(body)
+        self.requests.append(request)
+        config = request['imageGenerationConfig']
+        images = self.queued.pop(0) if self.queued else [
+            _png(config['width'], len(self.requests) * 10 + n)
+            for n in range(config['numberOfImages'])]
+        payload = {'images': [base64.b64encode(data).decode('ascii') for data in images]}
+        return {'body': io.BytesIO(json.dumps(payload).encode('utf-8'))}
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.setenv('VEH_AERO_RATE_LIMIT', '0')
+    client, store = StubClient(), ImageStore(str(tmp_path / 'store'))
+    monkeypatch.setattr(vehicle_generator, 'get_bedrock_client', lambda: client)
+    monkeypatch.setattr(vehicle_generator, 'get_image_store', lambda: store)
+    yield VehicleImageGenerator()
+    store.flush()
+
+
+def test_seeded_requests_reuse_the_stored_image(generator):
+    first = generator.generate_result("a sedan", seed=7)
+    generator.store.flush()
+    again = generator.generate_result("a sedan", seed=7)
+    other_seed = generator.generate_result("a sedan", seed=8)
+
+    assert first.ok and again.ok and other_seed.ok
+    assert again.content_hash == first.content_hash
+    assert other_seed.content_hash != first.content_hash
+    assert len(generator.client.requests) == 2
+    assert generator.client.requests[0]['imageGenerationConfig']['seed'] == 7
+
+
+def test_unseeded_requests_are_always_generated(generator):
+    first = generator.generate_result("a sedan")
+    generator.store.flush()
+    again = generator.generate_result("a sedan")
+
+    assert again.content_hash != first.content_hash
+    assert len(generator.client.requests) == 2
+    assert 'seed' not in generator.client.requests[0]['imageGenerationConfig']
+
+
+# A blank render, a square blob running off the frame and a side-view box
+BLANK = None
+OFF_FRAME = (0.0, 0.2, 0.6, 0.8)
+SIDE_VIEW = (0.1, 0.4, 0.9, 0.73)
+
+
+def test_preview_keeps_the_best_silhouette_and_enlarges_it(generator):
+    candidates = [_candidate(320, box) for box in (BLANK, SIDE_VIEW, OFF_FRAME)]
+    generator.client.queued.append(candidates)
+    result = generator.generate_result("a sedan", seed=3,
+                                       preview=PreviewOptions(candidates=3, size=320))
+
+    assert result.ok
+    request = generator.client.requests[0]['imageGenerationConfig']
+    assert (request['numberOfImages'], request['width']) == (3, 320)
+    assert result.content_hash == content_hash(candidates[1])
+    assert result.score.total == pytest.approx(
+        score_silhouette(DecodedImage.from_bytes(candidates[1])).total)
+    winner = DecodedImage.from_bytes(candidates[1]).bgr
+    assert np.array_equal(result.image.bgr, cv2.resize(winner, (FULL_SIZE, FULL_SIZE),
+                                                       interpolation=cv2.INTER_CUBIC))
+
+    # Only the winner is stored
+    generator.store.flush()
+    assert generator.store.stats()['images'] == 1
+    assert generator.store.find(generator._request_key(generator.client.requests[0])) is not None
+
+
+def test_refine_re_renders_the_winner(generator):
+    candidates = [_candidate(320, box) for box in (OFF_FRAME, SIDE_VIEW)]
+    refined = _candidate(FULL_SIZE, SIDE_VIEW)
+    generator.client.queued += [candidates, [refined]]
+    result = generator.generate_result("a sedan", seed=3,
+                                       preview=PreviewOptions(candidates=2, size=320, refine=True))
+
+    assert result.ok
+    variation = generator.client.requests[1]
+    assert variation['taskType'] == 'IMAGE_VARIATION'
+    source = DecodedImage.from_bytes(base64.b64decode(variation['imageVariationParams']['images'][0]))
+    assert np.array_equal(source.bgr, DecodedImage.from_bytes(candidates[1]).bgr)
+    assert variation['imageGenerationConfig']['width'] == FULL_SIZE
+
+    assert result.content_hash == content_hash(refined)
+    assert result.score.total == pytest.approx(
+        score_silhouette(DecodedImage.from_bytes(candidates[1])).total)
+
+    # The same seeded preview is served from the store without calling Nova Canvas
+    generator.store.flush()
+    again = generator.generate_result("a sedan", seed=3,
+                                      preview=PreviewOptions(candidates=2, size=320, refine=True))
+    assert again.content_hash == result.content_hash
+    assert len(generator.client.requests) == 2